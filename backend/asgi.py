@@ -1,16 +1,30 @@
-# asgi.py
+"""
+ASGI config for backend project.
+
+HTTP : application Django habituelle ; WebSocket : Channels (ws/tickets/,
+authentification JWT), voir support/consumers.py.
+"""
 import os
 
 from django.core.asgi import get_asgi_application
 
-
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
-# asgi.py classique Django (sans Channels)
-
-
+# Initialise Django (apps, modèles) avant d'importer les consumers
+django_asgi_app = get_asgi_application()
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ton_projet.settings')
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from django.conf import settings  # noqa: E402
 
-application = get_asgi_application()
+from support.consumers import ClientOriginValidator, JWTAuthMiddleware  # noqa: E402
+from support.routing import websocket_urlpatterns  # noqa: E402
 
+application = ProtocolTypeRouter({
+    "http": django_asgi_app,
+    # Même liste d'origines autorisées que l'API REST (front Angular) ; sans Origin
+    # (application mobile, CLI), seul le jeton JWT est exigé
+    "websocket": ClientOriginValidator(
+        JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
+        settings.CORS_ALLOWED_ORIGINS,
+    ),
+})
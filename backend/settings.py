@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
+import json
 import os
 from pathlib import Path
 from datetime import timedelta
@@ -44,6 +45,15 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL')  # stocké en .env ou variables d'env
 
+# Envoi des SMS (support/sms.py) : support.sms.LocmemSmsBackend pour les tests
+SMS_BACKEND = config('SMS_BACKEND', default='support.sms.TwilioSmsBackend')
+# Débit maximal d'envoi des SMS (SMS/s) ; 0 : limite par défaut du backend (1/s pour Twilio).
+# Limite appliquée par processus worker : avec N run_notification_worker, régler
+# SMS_RATE_LIMIT à la limite du fournisseur divisée par N
+SMS_RATE_LIMIT = config('SMS_RATE_LIMIT', default=0, cast=float)
+# Fenêtre (secondes) de fusion des notifications de mise à jour d'un même ticket ; 0 pour désactiver
+NOTIFICATION_COALESCE_WINDOW = config('NOTIFICATION_COALESCE_WINDOW', default=60, cast=int)
+
 SENDGRID_SANDBOX_MODE_IN_DEBUG = False  # False pour envoyer réellement les mails
 SENDGRID_ECHO_TO_STDOUT = False
 
@@ -69,6 +79,7 @@ INSTALLED_APPS = [
     'django_extensions',
     'rest_framework',
     'corsheaders',
+    'channels',
     'whitenoise.runserver_nostatic',
     'support',  # Notre application principale
 
@@ -140,6 +151,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'  #
+# WebSocket (Channels) : servir backend.asgi avec daphne
+ASGI_APPLICATION = 'backend.asgi.application'
 
 
 
@@ -150,6 +163,51 @@ DATABASES = {
     'default': dj_database_url.config(default=config('DATABASE_URL'))
 }
 
+# Cache (statistiques) : Redis en production si REDIS_URL est défini, mémoire locale sinon (dev / tests)
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Diffusion WebSocket des tickets (support/realtime.py) : Redis entre les processus en production,
+# couche en mémoire (un seul processus) en dev / tests
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+
+# Durée de vie (secondes) des statistiques en cache pour les périodes en cours
+STATS_CACHE_TIMEOUT = config('STATS_CACHE_TIMEOUT', default=300, cast=int)
+# ... et pour les périodes écoulées (rarement modifiées, mais une écriture les rend obsolètes)
+STATS_CACHE_PAST_TIMEOUT = config('STATS_CACHE_PAST_TIMEOUT', default=86400, cast=int)
+
+# Assignation des nouveaux tickets (support/assignment.py) : least_load, weighted_round_robin ou intent
+TICKET_ASSIGNMENT_STRATEGY = config('TICKET_ASSIGNMENT_STRATEGY', default='least_load')
+# Poids du tourniquet, en JSON : {"email de l'agent": poids} (1 par défaut)
+TICKET_ASSIGNMENT_WEIGHTS = config('TICKET_ASSIGNMENT_WEIGHTS', default='{}', cast=json.loads)
+# Compétences par intention, en JSON : {"titre": ["email de l'agent", ...]}
+TICKET_ASSIGNMENT_SKILLS = config('TICKET_ASSIGNMENT_SKILLS', default='{}', cast=json.loads)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -20,7 +20,8 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 from support.views import CustomTokenObtainPairView, UtilisateurViewSet, TicketViewSet, MessageViewSet, \
     agent_dashboard_stats, admin_agent_stats, admin_global_stats, generate_agents_report_data, PasswordResetConfirmView, \
-    PasswordResetRequestView
+    PasswordResetRequestView, admin_cache_stats, admin_intent_stats, admin_status_flow_stats, export_agents_report, \
+    export_tickets
 
 # Création d'un router pour gérer automatiquement les routes des ViewSets
 router = DefaultRouter()
@@ -38,6 +39,11 @@ urlpatterns = [
     path('api/admin/agent-stats/<int:agent_id>/', admin_agent_stats, name='agent-stats'),
     path('api/admin/global-stats/', admin_global_stats, name='admin-stats'),
     path('api/admin/rapport-agents/', generate_agents_report_data, name='generate_agents_report'),
+    path('api/admin/intents/', admin_intent_stats, name='admin-intent-stats'),
+    path('api/admin/status-flow/', admin_status_flow_stats, name='admin-status-flow'),
+    path('api/admin/cache-stats/', admin_cache_stats, name='admin-cache-stats'),
+    path('api/admin/export/tickets/', export_tickets, name='export-tickets'),
+    path('api/admin/export/rapport-agents/', export_agents_report, name='export-agents-report'),
     path('api/reset-password/request/', PasswordResetRequestView.as_view(), name='reset-password-request'),
     path('api/reset-password/confirm/', PasswordResetConfirmView.as_view(), name='reset-password-confirm'),
 
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class SupportConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'support'
+
+    def ready(self):
+        # Branche la mise à jour incrémentale du cumul TicketDailyStat, l'invalidation du cache,
+        # l'index de recherche plein texte et la liste des agents de l'assignation
+        from . import assignment, rollup, search, stats_cache  # noqa: F401
+        # Diffusion WebSocket des changements de tickets : après rollup, dont elle lit l'état avant écriture
+        from . import realtime  # noqa: F401
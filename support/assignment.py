@@ -0,0 +1,246 @@
+"""
+Choix de l'agent d'un nouveau ticket, par stratégie interchangeable
+(settings.TICKET_ASSIGNMENT_STRATEGY) :
+
+- least_load : agent actif ayant le moins de tickets ouverts (AgentLoad) ;
+- weighted_round_robin : tourniquet pondéré (settings.TICKET_ASSIGNMENT_WEIGHTS),
+  position partagée par un compteur atomique du cache ;
+- intent : agents compétents pour le titre du ticket
+  (settings.TICKET_ASSIGNMENT_SKILLS), le moins chargé d'entre eux.
+
+La charge de chaque agent est lue dans AgentLoad, tenu à jour par
+support/rollup.py, et la liste des agents actifs est gardée en cache : aucun
+agrégat n'est calculé par ticket, quelle que soit la taille de l'historique.
+"""
+import heapq
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AgentLoad, Utilisateur
+
+ROSTER_KEY = 'assignment:roster'
+ROSTER_TIMEOUT = 300
+ROUND_ROBIN_KEY = 'assignment:round-robin'
+
+
+def least_loaded_agent(agent_ids=None):
+    """
+    Agent actif ayant le moins de tickets ouverts (parmi agent_ids si donné), ou None.
+
+    À appeler dans la transaction qui crée le ticket : la ligne AgentLoad
+    choisie reste verrouillée jusqu'au commit et les créations concurrentes
+    la sautent (SKIP LOCKED) pour prendre l'agent suivant, au lieu de toutes
+    viser le même agent.
+    """
+    loads = AgentLoad.objects.filter(agent__role='agent', agent__is_active=True) \
+        .select_related('agent').order_by('tickets_ouverts', 'agent_id')
+    if agent_ids is not None:
+        loads = loads.filter(agent_id__in=agent_ids)
+
+    features = connection.features
+    if features.has_select_for_update_skip_locked and features.has_select_for_update_of:
+        load = loads.select_for_update(skip_locked=True, of=('self',)).first()
+        if load is not None:
+            return load.agent
+    # Base sans SKIP LOCKED, ou toutes les lignes verrouillées par des créations en cours
+    load = loads.first()
+    return load.agent if load else None
+
+
+def locked_loads(agent_ids=None):
+    """
+    Charges {agent_id: tickets ouverts} des agents actifs, lignes verrouillées
+    jusqu'au commit (dans l'ordre des ids, sans interblocage entre deux lots).
+    """
+    loads = AgentLoad.objects.filter(agent__role='agent', agent__is_active=True).order_by('agent_id')
+    if agent_ids is not None:
+        loads = loads.filter(agent_id__in=agent_ids)
+    if connection.features.has_select_for_update_of:
+        loads = loads.select_for_update(of=('self',))
+    return dict(loads.values_list('agent_id', 'tickets_ouverts'))
+
+
+def _agents_by_id(agent_ids):
+    agents = Utilisateur.objects.in_bulk(set(agent_ids) - {None})
+    return [agents.get(agent_id) for agent_id in agent_ids]
+
+
+def roster():
+    """Agents actifs {email: id}, gardés en cache jusqu'à la modification d'un agent."""
+    agents = cache.get(ROSTER_KEY)
+    if agents is None:
+        agents = dict(
+            Utilisateur.objects.filter(role='agent', is_active=True).order_by('id').values_list('email', 'id')
+        )
+        cache.set(ROSTER_KEY, agents, timeout=ROSTER_TIMEOUT)
+    return agents
+
+
+@lru_cache(maxsize=32)
+def smooth_sequence(weights):
+    """
+    Ordre de passage du tourniquet pondéré « lisse » (à la nginx) pour
+    weights = ((agent_id, poids), ...) : chaque agent apparaît poids fois,
+    réparti régulièrement sur la séquence au lieu d'être servi en rafale.
+    """
+    total = sum(weight for _, weight in weights)
+    current = {agent_id: 0 for agent_id, _ in weights}
+    sequence = []
+    for _ in range(total):
+        for agent_id, weight in weights:
+            current[agent_id] += weight
+        chosen = max(weights, key=lambda item: (current[item[0]], -item[0]))[0]
+        current[chosen] -= total
+        sequence.append(chosen)
+    return tuple(sequence)
+
+
+def _next_position(count=1):
+    """Réserve count positions du tourniquet ; retourne la dernière (la première vaut 1)."""
+    try:
+        return cache.incr(ROUND_ROBIN_KEY, count)
+    except ValueError:
+        if cache.add(ROUND_ROBIN_KEY, count, timeout=None):
+            return count
+        return cache.incr(ROUND_ROBIN_KEY, count)
+
+
+class AssignmentStrategy:
+    name = None
+
+    def choose(self, titre):
+        """Agent du nouveau ticket de titre `titre`, ou None si aucun agent n'est disponible."""
+        raise NotImplementedError
+
+    def choose_many(self, titres):
+        """Agents d'un lot de nouveaux tickets, dans l'ordre de titres, en une passe."""
+        return [self.choose(titre) for titre in titres]
+
+
+def _least_loaded_pass(titres, candidates, loads):
+    """
+    Affectation d'un lot au moins chargé, sur des charges tenues en mémoire :
+    candidates(titre) donne les agents possibles (None : tous). Un tas
+    (charge, agent_id) sert les tickets sans candidats particuliers.
+    """
+    heap = [(load, agent_id) for agent_id, load in loads.items()]
+    heapq.heapify(heap)
+    chosen = []
+    for titre in titres:
+        agent_ids = [agent_id for agent_id in candidates(titre) or [] if agent_id in loads]
+        if agent_ids:
+            agent_id = min(agent_ids, key=lambda pk: (loads[pk], pk))
+        elif heap:
+            # Entrées périmées du tas (charge modifiée depuis) ignorées au passage
+            while heap[0][0] != loads[heap[0][1]]:
+                heapq.heappop(heap)
+            agent_id = heap[0][1]
+        else:
+            chosen.append(None)
+            continue
+        loads[agent_id] += 1
+        heapq.heappush(heap, (loads[agent_id], agent_id))
+        chosen.append(agent_id)
+    return _agents_by_id(chosen)
+
+
+class LeastOpenLoadStrategy(AssignmentStrategy):
+    name = 'least_load'
+
+    def choose(self, titre):
+        return least_loaded_agent()
+
+    def choose_many(self, titres):
+        return _least_loaded_pass(titres, lambda titre: None, locked_loads())
+
+
+class WeightedRoundRobinStrategy(AssignmentStrategy):
+    name = 'weighted_round_robin'
+
+    def sequence(self):
+        weights = getattr(settings, 'TICKET_ASSIGNMENT_WEIGHTS', {})
+        agents = tuple(
+            (agent_id, max(1, int(weights.get(email, 1))))
+            for email, agent_id in sorted(roster().items(), key=lambda item: item[1])
+        )
+        return smooth_sequence(agents) if agents else ()
+
+    def choose(self, titre):
+        sequence = self.sequence()
+        if not sequence:
+            return None
+        agent_id = sequence[(_next_position() - 1) % len(sequence)]
+        agent = Utilisateur.objects.filter(pk=agent_id, role='agent', is_active=True).first()
+        # Agent désactivé depuis la mise en cache de la liste : repli sur la charge
+        return agent or least_loaded_agent()
+
+    def choose_many(self, titres):
+        sequence = self.sequence()
+        if not sequence or not titres:
+            return [None] * len(titres)
+        # Réserve len(titres) positions consécutives d'un seul incrément
+        last = _next_position(len(titres))
+        agent_ids = [sequence[position % len(sequence)] for position in range(last - len(titres), last)]
+        agents = _agents_by_id(agent_ids)
+        active = [agent for agent in agents if agent and agent.role == 'agent' and agent.is_active]
+        if len(active) == len(agents):
+            return agents
+        return LeastOpenLoadStrategy().choose_many(titres)
+
+
+class IntentRoutingStrategy(AssignmentStrategy):
+    name = 'intent'
+
+    def skilled_agents(self, titre):
+        skills = getattr(settings, 'TICKET_ASSIGNMENT_SKILLS', {})
+        agents = roster()
+        return [agents[email] for email in skills.get(titre, []) if email in agents]
+
+    def choose_many(self, titres):
+        return _least_loaded_pass(titres, self.skilled_agents, locked_loads())
+
+    def choose(self, titre):
+        agent_ids = self.skilled_agents(titre)
+        if agent_ids:
+            agent = least_loaded_agent(agent_ids)
+            if agent is not None:
+                return agent
+        # Intention sans agent compétent disponible : n'importe quel agent
+        return least_loaded_agent()
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (LeastOpenLoadStrategy, WeightedRoundRobinStrategy, IntentRoutingStrategy)
+}
+
+
+def get_strategy(name=None):
+    name = name or getattr(settings, 'TICKET_ASSIGNMENT_STRATEGY', LeastOpenLoadStrategy.name)
+    try:
+        return STRATEGIES[name]()
+    except KeyError:
+        raise ImproperlyConfigured(f"Stratégie d'assignation inconnue : {name}")
+
+
+def assign_agent(titre):
+    """Agent du nouveau ticket selon la stratégie configurée (dans la transaction de création)."""
+    return get_strategy().choose(titre)
+
+
+def assign_agents(titres):
+    """Agents d'un lot de nouveaux tickets, en une passe (dans la transaction de création)."""
+    return get_strategy().choose_many(titres)
+
+
+@receiver(post_save, sender=Utilisateur)
+@receiver(post_delete, sender=Utilisateur)
+def invalidate_roster(sender, instance, raw=False, **kwargs):
+    if not raw and instance.role == 'agent':
+        transaction.on_commit(lambda: cache.delete(ROSTER_KEY))
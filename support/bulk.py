@@ -0,0 +1,107 @@
+"""
+Opérations en masse sur les tickets : création par lot, réaffectation,
+changement de statut, suppression.
+
+Les écritures passent par un seul INSERT / UPDATE (bulk_create() et
+QuerySet.update() n'émettent pas les signaux de save()) : les cumuls, le
+journal des statuts, l'invalidation du cache et l'index de recherche sont
+donc reportés ici, regroupés par rollup.batch(), ainsi que la diffusion
+WebSocket (un message par groupe pour tout le lot).
+"""
+from django.utils.timezone import now
+
+from . import realtime, rollup, search
+from .models import Ticket
+
+BULK_ACTIONS = ['reassign', 'statut', 'delete']
+MAX_BULK_TICKETS = 1000
+MAX_BATCH_CREATE = 500
+
+
+def lock_tickets(ids):
+    """Tickets demandés, verrouillés jusqu'à la fin de la transaction (à appeler dans rollup.batch())."""
+    return list(
+        Ticket.objects.select_for_update(of=('self',))
+        .select_related('client', 'agent')
+        .filter(pk__in=ids)
+        .order_by('pk')
+    )
+
+
+def bulk_create_tickets(tickets):
+    """Insère des tickets non enregistrés en une requête (à appeler dans rollup.batch())."""
+    for ticket in tickets:
+        ticket.track_resolution()
+    created = Ticket.objects.bulk_create(tickets)
+    for ticket in created:
+        current = ticket.stat_contribution()
+        rollup.record_ticket_change(None, current)
+        rollup.invalidate(current)
+        ticket._stat_snapshot = current
+        ticket._intent_snapshot = ticket.intent_contribution()
+        rollup.record_intent_change(None, ticket._intent_snapshot)
+
+    rollup.record_status_events([(ticket, None) for ticket in created])
+    search.index_tickets(ticket.pk for ticket in created)
+    realtime.publish('created', created)
+    return created
+
+
+def _apply(tickets, apply, **changes):
+    """
+    UPDATE unique des tickets, puis report de chaque changement sur l'instance
+    (apply) et dans les cumuls. Retourne les tickets modifiés.
+    """
+    if not tickets:
+        return []
+    moment = now()
+    if 'statut' in changes:
+        # Les tickets du lot changent tous de statut : même règle que Ticket.track_resolution()
+        changes['date_resolution'] = moment if changes['statut'] == 'Résolu' else None
+    Ticket.objects.filter(pk__in=[ticket.pk for ticket in tickets]).update(date_modification=moment, **changes)
+
+    status_changes = []
+    previous_agents = {}
+    for ticket in tickets:
+        previous = ticket._stat_snapshot
+        previous_agents[ticket.pk] = previous[0] if previous else None
+        previous_statut = ticket.statut
+        apply(ticket)
+        ticket.date_modification = moment
+        ticket.track_resolution(moment)
+        current = ticket.stat_contribution()
+        rollup.record_ticket_change(previous, current)
+        rollup.invalidate(previous, current)
+        rollup.record_reassignment(ticket, previous_agents[ticket.pk])
+        ticket._stat_snapshot = current
+        if ticket.statut != previous_statut:
+            status_changes.append((ticket, previous_statut))
+
+    rollup.record_status_events(status_changes)
+    realtime.publish('updated', tickets, previous_agents)
+    return tickets
+
+
+def bulk_reassign(tickets, agent):
+    tickets = [ticket for ticket in tickets if ticket.agent_id != agent.pk]
+
+    def apply(ticket):
+        ticket.agent = agent
+
+    return _apply(tickets, apply, agent=agent)
+
+
+def bulk_change_status(tickets, statut):
+    tickets = [ticket for ticket in tickets if ticket.statut != statut]
+
+    def apply(ticket):
+        ticket.statut = statut
+
+    return _apply(tickets, apply, statut=statut)
+
+
+def bulk_delete(tickets):
+    # Les signaux post_delete sont émis par ticket ; leurs écritures de cumul sont regroupées par batch()
+    Ticket.objects.filter(pk__in=[ticket.pk for ticket in tickets]).delete()
+    realtime.publish('deleted', tickets)
+    return tickets
@@ -0,0 +1,45 @@
+"""
+Requêtes conditionnelles (ETag) pour les endpoints interrogés en boucle.
+
+L'ETag est calculé sans sérialiser la réponse : si le client renvoie un
+If-None-Match toujours valable, on répond 304 Not Modified sans exécuter la
+requête principale. Pas de Last-Modified : une date à la seconde ne voit ni
+deux modifications dans la même seconde ni les suppressions.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def conditional_response(request, etag, build):
+    """
+    Retourne 304 si l'If-None-Match de la requête correspond, sinon la réponse
+    construite par build(). L'en-tête ETag est ajouté dans les deux cas ; le
+    client doit revalider à chaque fois.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def ticket_list_etag(request, queryset, *parts):
+    """
+    ETag d'une liste de tickets, dérivé de Max('date_modification') (à la
+    microseconde) et du nombre de lignes du queryset filtré (une requête
+    d'agrégat indexée), plus les parts données (génération de la liste des
+    agents, dont le nom figure dans la liste). Une création, une modification,
+    une suppression ou la sortie d'un ticket de la fenêtre active le change.
+    """
+    state = queryset.order_by().aggregate(last_modified=Max('date_modification'), count=Count('id'))
+    return make_etag(request.user.pk, request.get_full_path(), state['last_modified'], state['count'], *parts)
@@ -0,0 +1,92 @@
+"""
+WebSocket ws/tickets/ : changements des tickets de l'utilisateur connecté.
+
+Authentification par le jeton d'accès JWT (le même que l'API REST), passé
+dans l'URL (ws/tickets/?token=<access>, les navigateurs ne permettant pas
+d'en-têtes sur un WebSocket) ou dans un en-tête Authorization: Bearer.
+
+Les navigateurs envoient toujours un en-tête Origin, vérifié contre
+CORS_ALLOWED_ORIGINS ; les clients natifs (mobile, CLI) n'en envoient pas et
+sont acceptés sur la seule foi de leur jeton (TicketConsumer refuse les
+connexions non authentifiées).
+"""
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.security.websocket import OriginValidator
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from .realtime import user_groups
+
+
+@database_sync_to_async
+def user_from_token(raw_token):
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+def _raw_token(scope):
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+    if token:
+        return token[0]
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode().split()
+            if len(parts) == 2 and parts[0].lower() == 'bearer':
+                return parts[1]
+    return None
+
+
+class ClientOriginValidator(OriginValidator):
+    """OriginValidator qui laisse passer les connexions sans Origin (clients hors navigateur)."""
+
+    def valid_origin(self, parsed_origin):
+        # Un navigateur envoie toujours Origin : son absence n'expose pas au détournement cross-site
+        return parsed_origin is None or super().valid_origin(parsed_origin)
+
+
+class JWTAuthMiddleware:
+    """Renseigne scope['user'] à partir du jeton JWT de la connexion."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        raw_token = _raw_token(scope)
+        scope = dict(scope, user=await user_from_token(raw_token) if raw_token else AnonymousUser())
+        return await self.app(scope, receive, send)
+
+
+class TicketConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Envoie au client {"events": [{"action": ..., "ticket": {...}}, ...]} pour
+    chaque changement de ses tickets (voir support/realtime.py).
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated or not user.is_active:
+            # Refus de la poignée de main (HTTP 403)
+            await self.close()
+            return
+        self.ticket_groups = user_groups(user)
+        for group in self.ticket_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        for group in getattr(self, 'ticket_groups', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Flux descendant uniquement : les modifications passent par l'API REST
+        pass
+
+    async def ticket_events(self, event):
+        await self.send_json({'events': event['events']})
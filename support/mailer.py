@@ -0,0 +1,130 @@
+"""
+Envoi des emails sur une connexion SMTP réutilisée.
+
+Chaque send_mail() ouvre sa propre session SMTP (connexion, EHLO, STARTTLS,
+authentification) pour un seul message. MailDispatcher garde une connexion
+get_connection() ouverte et y envoie les messages par lots, chacun par
+send_messages() sur la même session (pour savoir lequel échoue) ; une
+connexion coupée (timeout du serveur, erreur réseau) est rouverte et le
+message réessayé une fois. Chaque lot est journalisé avec son débit.
+
+Le worker de l'outbox utilise son propre dispatcher ; les envois hors outbox
+(code de réinitialisation) passent par dispatcher(), partagé par le processus.
+"""
+import logging
+import smtplib
+import threading
+import time
+from collections import deque, namedtuple
+
+from django.core.mail import get_connection
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+# Derniers lots conservés dans MailDispatcher.reports
+REPORTS_KEPT = 100
+
+# Erreurs propres au message (destinataire refusé, ...) : la connexion reste utilisable
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+BatchReport = namedtuple('BatchReport', ['messages', 'sent', 'failed', 'reconnections', 'seconds'])
+
+
+class MailDispatcher:
+    def __init__(self, batch_size=BATCH_SIZE, **connection_kwargs):
+        self.batch_size = batch_size
+        self.connection_kwargs = connection_kwargs
+        self.connection = None
+        self.reports = deque(maxlen=REPORTS_KEPT)
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self):
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False, **self.connection_kwargs)
+            self.connection.open()
+        return self.connection
+
+    def close(self):
+        with self._lock:
+            if self.connection is not None:
+                try:
+                    self.connection.close()
+                except Exception:
+                    pass
+                self.connection = None
+
+    def send(self, messages):
+        """
+        Envoie les messages par lots de batch_size sur la connexion ouverte.
+        Retourne, dans l'ordre des messages, None (envoyé) ou l'exception levée.
+        """
+        messages = list(messages)
+        errors = []
+        with self._lock:
+            for start in range(0, len(messages), self.batch_size):
+                errors.extend(self._send_batch(messages[start:start + self.batch_size]))
+        return errors
+
+    def _send_batch(self, batch):
+        started = time.perf_counter()
+        errors = []
+        reconnections = 0
+        for message in batch:
+            error, reconnected = self._send_one(message)
+            errors.append(error)
+            reconnections += reconnected
+
+        failed = sum(error is not None for error in errors)
+        report = BatchReport(len(batch), len(batch) - failed, failed, reconnections, time.perf_counter() - started)
+        self.reports.append(report)
+        logger.info(
+            "Lot de %d emails : %d envoyés, %d en échec, %d reconnexion(s), %.2f s (%.1f emails/s)",
+            report.messages, report.sent, report.failed, report.reconnections, report.seconds,
+            report.sent / report.seconds if report.seconds else 0,
+        )
+        return errors
+
+    def _send_one(self, message):
+        """Envoie un message ; en cas de coupure, rouvre la connexion et réessaie une fois."""
+        reconnected = 0
+        for attempt in (1, 2):
+            try:
+                self._connect().send_messages([message])
+                return None, reconnected
+            except MESSAGE_ERRORS as e:
+                return e, reconnected
+            except Exception as e:
+                logger.warning("Connexion SMTP perdue (%s), reconnexion", e)
+                self.close()
+                if attempt == 2:
+                    return e, reconnected
+                reconnected = 1
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def dispatcher():
+    """Dispatcher partagé par le processus (connexion gardée ouverte entre les envois)."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = MailDispatcher()
+        return _dispatcher
+
+
+@receiver(setting_changed)
+def reset_dispatcher(sender, setting, **kwargs):
+    # override_settings(EMAIL_BACKEND=...) : ne pas garder la connexion de l'ancien backend
+    if setting.startswith('EMAIL_') and _dispatcher is not None:
+        _dispatcher.close()
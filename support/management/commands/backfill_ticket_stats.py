@@ -0,0 +1,103 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear, TruncDate
+
+from support.models import (
+    OPEN_STATUTS, AgentLoad, IntentCounter, ResolutionSketch, Ticket, TicketDailyStat, Utilisateur,
+)
+from support.rollup import sketch_sample
+from support.sketch import DDSketch
+from support.stats import RESOLUTION_DURATION
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit les cumuls TicketDailyStat, IntentCounter, les sketches "
+        "ResolutionSketch et les charges AgentLoad à partir de l'historique des tickets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Nombre de lignes insérées par bulk_create.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        rows = Ticket.objects.annotate(jour=TruncDate('date_creation')) \
+            .order_by().values('agent_id', 'jour', 'statut') \
+            .annotate(
+                nombre_tickets=Count('id'),
+                duree_resolution=Sum(RESOLUTION_DURATION, filter=Q(statut='Résolu')),
+            )
+
+        created = 0
+        with transaction.atomic():
+            TicketDailyStat.objects.all().delete()
+
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                duree = row['duree_resolution']
+                batch.append(TicketDailyStat(
+                    agent_id=row['agent_id'],
+                    jour=row['jour'],
+                    statut=row['statut'],
+                    nombre_tickets=row['nombre_tickets'],
+                    secondes_resolution=duree.total_seconds() if duree else 0,
+                ))
+                if len(batch) >= batch_size:
+                    TicketDailyStat.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                TicketDailyStat.objects.bulk_create(batch)
+                created += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"{created} lignes TicketDailyStat reconstruites."))
+
+        intents = Ticket.objects.annotate(
+            annee=ExtractYear('date_creation'),
+            mois=ExtractMonth('date_creation'),
+        ).order_by().values('titre', 'annee', 'mois').annotate(nombre_tickets=Count('id'))
+
+        with transaction.atomic():
+            IntentCounter.objects.all().delete()
+            counters = IntentCounter.objects.bulk_create(
+                (IntentCounter(**row) for row in intents.iterator(chunk_size=batch_size)),
+                batch_size=batch_size,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(counters)} lignes IntentCounter reconstruites."))
+
+        # Durées de résolution des tickets actuellement résolus, calculées comme les signaux
+        sketches = defaultdict(DDSketch)
+        resolus = Ticket.objects.filter(statut='Résolu').only(*Ticket.STAT_FIELDS)
+        for ticket in resolus.iterator(chunk_size=batch_size):
+            (agent_id, annee, mois), secondes = sketch_sample(ticket.stat_contribution())
+            sketches[agent_id, annee, mois].add(secondes)
+
+        with transaction.atomic():
+            ResolutionSketch.objects.all().delete()
+            ResolutionSketch.objects.bulk_create(
+                (
+                    ResolutionSketch(agent_id=agent_id, annee=annee, mois=mois, sketch=sketch.to_bytes())
+                    for (agent_id, annee, mois), sketch in sketches.items()
+                ),
+                batch_size=batch_size,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(sketches)} sketches ResolutionSketch reconstruits."))
+
+        agents = Utilisateur.objects.filter(role='agent').annotate(
+            ouverts=Count('tickets_agent', filter=Q(tickets_agent__statut__in=OPEN_STATUTS)),
+        )
+        with transaction.atomic():
+            AgentLoad.objects.all().delete()
+            loads = AgentLoad.objects.bulk_create(
+                (AgentLoad(agent_id=agent.pk, tickets_ouverts=agent.ouverts) for agent in agents),
+                batch_size=batch_size,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(loads)} charges AgentLoad reconstruites."))
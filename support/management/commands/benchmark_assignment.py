@@ -0,0 +1,122 @@
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from support.assignment import STRATEGIES
+from support.models import Ticket, Utilisateur
+from support.views import TicketViewSet
+
+BENCHMARK_TITLE = "Benchmark assignation"
+
+# Cache, diffusion WebSocket et envoi des notifications isolés de ceux du service
+ISOLATED_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'CHANNEL_LAYERS': {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée des tickets en parallèle via create_ticket_chatbot et mesure, pour "
+        "une stratégie d'assignation : débit, latences p50 / p99 et équilibre de "
+        "charge entre agents. Le benchmark tourne sur une base de test créée pour "
+        "l'occasion (comme manage.py test), avec son client et ses agents, puis "
+        "détruite : les données, les cumuls et le cache du service ne sont pas "
+        "touchés. SQLite sérialise les écritures : mesurer la concurrence sur PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=2000, help="Nombre de tickets à créer.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Nombre de créations simultanées.")
+        parser.add_argument('--strategy', choices=sorted(STRATEGIES), help="Stratégie (par défaut : celle des settings).")
+        parser.add_argument('--titles', nargs='+', default=['Paiement', 'Livraison', 'Retard', 'Compte'],
+                            help="Titres (intentions) utilisés à tour de rôle.")
+        parser.add_argument('--agents', type=int, default=10, help="Nombre d'agents de test.")
+
+    def handle(self, *args, **options):
+        overrides = dict(ISOLATED_SETTINGS)
+        if options['strategy']:
+            overrides['TICKET_ASSIGNMENT_STRATEGY'] = options['strategy']
+
+        with override_settings(**overrides):
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+            try:
+                client = self.create_fixtures(options['agents'])
+                latencies, errors, elapsed = self.run(client, options)
+                per_agent = Counter(
+                    Ticket.objects.filter(client=client, description=BENCHMARK_TITLE).values_list('agent_id', flat=True)
+                )
+                self.report(options, latencies, errors, elapsed, per_agent)
+            finally:
+                connection.close()
+                teardown_databases(old_config, verbosity=0)
+
+    def create_fixtures(self, agents):
+        for i in range(agents):
+            Utilisateur.objects.create_user(
+                f'benchmark-agent-{i}@yafi.test', nom=f'Agent benchmark {i}', telephone='', role='agent',
+            )
+        return Utilisateur.objects.create_user('benchmark-client@yafi.test', nom='Client benchmark', telephone='')
+
+    def run(self, client, options):
+        factory = APIRequestFactory()
+        view = TicketViewSet.as_view({'post': 'create_ticket_chatbot'})
+        titles = options['titles']
+        errors = Counter()
+        lock = threading.Lock()
+
+        def create(index):
+            request = factory.post(
+                '/api/tickets/create/',
+                {'titre': titles[index % len(titles)], 'description': BENCHMARK_TITLE},
+                format='json',
+            )
+            force_authenticate(request, user=client)
+            start = time.perf_counter()
+            try:
+                response = view(request)
+                status = response.status_code
+            except Exception as e:  # verrous SQLite, etc. : comptés comme erreurs
+                status = type(e).__name__
+            finally:
+                connection.close()
+            latency = time.perf_counter() - start
+            if status != 200:
+                with lock:
+                    errors[status] += 1
+            return latency
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            latencies = list(pool.map(create, range(options['tickets'])))
+        return latencies, errors, time.perf_counter() - start
+
+    def report(self, options, latencies, errors, elapsed, per_agent):
+        latencies = sorted(latencies)
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+        counts = list(per_agent.values()) or [0]
+        mean = statistics.mean(counts)
+        self.stdout.write(
+            f"{options['tickets']} créations, {options['concurrency']} en parallèle : "
+            f"{options['tickets'] / elapsed:,.0f} tickets/s, "
+            f"p50 {percentile(0.5):.1f} ms, p99 {percentile(0.99):.1f} ms"
+        )
+        if errors:
+            self.stdout.write(self.style.WARNING(f"Erreurs : {dict(errors)}"))
+        self.stdout.write(
+            f"Répartition sur {len(per_agent)} agents : min {min(counts)}, max {max(counts)}, "
+            f"écart-type {statistics.pstdev(counts):.1f} "
+            f"(coefficient de variation {statistics.pstdev(counts) / mean if mean else 0:.2f})"
+        )
+
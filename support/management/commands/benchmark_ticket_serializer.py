@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from rest_framework.renderers import JSONRenderer
+
+from support.management.commands.benchmark_assignment import ISOLATED_SETTINGS
+from support.models import Ticket, Utilisateur
+from support.serializers import TicketSerializer, ticket_list_data, ticket_list_values
+
+
+class QueryCounter:
+    """Compte les requêtes exécutées (sans la limite de connection.queries)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit (lignes/s) de TicketSerializer et du chemin de lecture "
+        "rapide des listes de tickets. Le benchmark tourne sur une base de test "
+        "créée pour l'occasion (comme manage.py test), avec ses agents et ses "
+        "tickets, puis détruite : les données du service ne sont pas touchées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000],
+                            help="Tailles de liste à mesurer.")
+        parser.add_argument('--agents', type=int, default=10, help="Nombre d'agents de test.")
+
+    def handle(self, *args, **options):
+        with override_settings(**ISOLATED_SETTINGS):
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+            try:
+                agents = [
+                    Utilisateur.objects.create_user(
+                        f'benchmark-agent-{i}@yafi.test', nom=f'Agent benchmark {i}', telephone='', role='agent',
+                    )
+                    for i in range(options['agents'])
+                ]
+                for rows in options['rows']:
+                    self.benchmark(rows, agents)
+            finally:
+                connection.close()
+                teardown_databases(old_config, verbosity=0)
+
+    def benchmark(self, rows, agents):
+        # Un titre par taille : chaque mesure ne lit que ses propres tickets
+        titre = f"Benchmark {rows}"
+        Ticket.objects.bulk_create(
+            (
+                Ticket(titre=titre, description="x" * 200, statut='Assigné', agent=agents[i % len(agents)])
+                for i in range(rows)
+            ),
+            batch_size=5000,
+        )
+        tickets = Ticket.objects.filter(titre=titre).order_by('-date_creation', '-id')
+
+        serializer_queries = QueryCounter()
+        with connection.execute_wrapper(serializer_queries):
+            start = time.perf_counter()
+            serializer_json = JSONRenderer().render(TicketSerializer(tickets, many=True).data)
+            serializer_time = time.perf_counter() - start
+
+        fast_queries = QueryCounter()
+        with connection.execute_wrapper(fast_queries):
+            start = time.perf_counter()
+            fast_json = JSONRenderer().render(ticket_list_data(ticket_list_values(tickets)))
+            fast_time = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{rows} tickets : "
+            f"TicketSerializer {rows / serializer_time:,.0f} lignes/s ({serializer_queries.count} requêtes), "
+            f"lecture rapide {rows / fast_time:,.0f} lignes/s ({fast_queries.count} requêtes), "
+            f"x{serializer_time / fast_time:.1f}, "
+            f"sortie identique : {'oui' if serializer_json == fast_json else 'NON'}"
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from support.models import Ticket, TicketDailyStat, Utilisateur
+
+
+class Command(BaseCommand):
+    help = "Affiche le plan d'exécution (EXPLAIN) des requêtes de tickets les plus fréquentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--client', type=int, help="Id du client (par défaut : le premier client).")
+        parser.add_argument('--agent', type=int, help="Id de l'agent (par défaut : le premier agent).")
+        parser.add_argument('--analyze', action='store_true',
+                            help="EXPLAIN ANALYZE (PostgreSQL uniquement) : exécute réellement les requêtes.")
+
+    def handle(self, *args, **options):
+        client_id = options['client'] or Utilisateur.objects.filter(role='client') \
+            .values_list('id', flat=True).first()
+        agent_id = options['agent'] or Utilisateur.objects.filter(role='agent') \
+            .values_list('id', flat=True).first()
+
+        queries = {
+            'mes_tickets (client)': Ticket.objects.filter(client_id=client_id).active_window()
+                .order_by('-date_creation', '-id')[:51],
+            'tickets_agent (agent)': Ticket.objects.filter(agent_id=agent_id).active_window()
+                .order_by('-date_creation', '-id')[:51],
+            'list (tous)': Ticket.objects.active_window().order_by('-date_creation', '-id')[:51],
+            'changer_statut / retrieve': Ticket.objects.select_related('agent').filter(pk=1),
+            'agent_dashboard_stats (cumul)': TicketDailyStat.objects.filter(agent_id=agent_id),
+        }
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+
+        for name, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}"))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
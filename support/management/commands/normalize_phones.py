@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from support.models import Utilisateur
+from support.phones import normalize_phone
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcule Utilisateur.telephone_e164 pour les utilisateurs existants, par "
+        "lots (parcours par id, une requête UPDATE groupée par lot). La migration "
+        "0021 remplit la colonne ; à relancer si les règles de support/phones.py "
+        "changent. Les enregistrements suivants tiennent la colonne à jour."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Utilisateurs par lot.")
+        parser.add_argument('--dry-run', action='store_true', help="Compter sans rien écrire.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = invalid = 0
+
+        while True:
+            users = list(
+                Utilisateur.objects.filter(pk__gt=last_id).order_by('pk')
+                .only('pk', 'telephone', 'telephone_e164')[:batch_size]
+            )
+            if not users:
+                break
+            last_id = users[-1].pk
+
+            changed = []
+            for user in users:
+                number = normalize_phone(user.telephone)
+                if not number and user.telephone:
+                    invalid += 1
+                if number != user.telephone_e164:
+                    user.telephone_e164 = number
+                    changed.append(user)
+            if changed and not options['dry_run']:
+                Utilisateur.objects.bulk_update(changed, ['telephone_e164'])
+            updated += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{updated} numéro(s) {'à normaliser' if options['dry_run'] else 'normalisé(s)'}, "
+            f"{invalid} numéro(s) non reconnu(s) (pas de SMS pour ces utilisateurs)."
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from support import search
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des tickets (titre, description, messages)."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"{count} tickets indexés (moteur : {search.backend()})."))
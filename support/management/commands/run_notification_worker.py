@@ -0,0 +1,87 @@
+import logging
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from support import mailer, outbox
+from support.mailer import MailDispatcher
+from support.notifications import email_message
+from support.sms import SmsDispatcher
+
+logger = logging.getLogger(__name__)
+
+# Intervalle (secondes) entre deux reprises des notifications d'un worker arrêté en cours d'envoi
+RELEASE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Envoie les notifications (emails, SMS) de l'outbox : réclame les "
+        "notifications dues par lots, les envoie, et réessaie les échecs avec un "
+        "délai exponentiel jusqu'à --max-attempts. Plusieurs workers peuvent "
+        "tourner en parallèle (SELECT ... FOR UPDATE SKIP LOCKED sur PostgreSQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Vider la file une fois puis s'arrêter.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Notifications réclamées par lot.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Envois de SMS simultanés.")
+        parser.add_argument('--smtp-batch-size', type=int, default=mailer.BATCH_SIZE,
+                            help="Emails par lot sur la connexion SMTP.")
+        parser.add_argument('--max-attempts', type=int, default=outbox.MAX_ATTEMPTS,
+                            help="Tentatives avant abandon (statut 'echec').")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Attente (secondes) quand la file est vide.")
+
+    def release_stale(self):
+        released = outbox.release_stale()
+        if released:
+            self.stdout.write(f"{released} notification(s) abandonnée(s) par un worker remise(s) en attente.")
+
+    def handle(self, *args, **options):
+        self.release_stale()
+        last_release = time.monotonic()
+
+        # Emails : une session SMTP gardée ouverte pour toute la durée du worker ;
+        # SMS : client du fournisseur partagé, envois parallèles sous sa limite de débit
+        with MailDispatcher(batch_size=options['smtp_batch_size']) as mail, \
+                SmsDispatcher(concurrency=options['concurrency']) as sms:
+            while True:
+                close_old_connections()
+                # Un autre worker a pu s'arrêter entre-temps avec des notifications réclamées
+                if time.monotonic() - last_release >= RELEASE_INTERVAL:
+                    self.release_stale()
+                    last_release = time.monotonic()
+                notifications = outbox.claim_batch(options['batch_size'])
+                if notifications:
+                    self.process(mail, sms, notifications, options['max_attempts'])
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+    def process(self, mail, sms, notifications, max_attempts):
+        start = time.perf_counter()
+        emails = [n for n in notifications if n.canal == 'email']
+        texts = [n for n in notifications if n.canal != 'email']
+
+        sms_errors = sms.submit((n.destinataire, n.contenu) for n in texts)
+        email_errors = mail.send(email_message(n) for n in emails)
+        results = list(zip(emails, email_errors)) + list(zip(texts, sms_errors))
+
+        sent = failed = 0
+        for notification, error in results:
+            if error is None:
+                outbox.mark_sent(notification)
+                sent += 1
+            else:
+                logger.warning("Échec de la notification %s : %s", notification.pk, error)
+                outbox.mark_failed(notification, error, max_attempts)
+                failed += 1
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Lot de {len(notifications)} ({len(emails)} emails, {len(texts)} SMS) : "
+            f"{sent} envoyée(s), {failed} en échec, {elapsed:.2f} s "
+            f"({sent / elapsed if elapsed else 0:,.1f} notifications/s)"
+        )
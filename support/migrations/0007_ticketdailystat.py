@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0006_resetpasswordcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jour', models.DateField()),
+                ('statut', models.CharField(max_length=20)),
+                ('nombre_tickets', models.IntegerField(default=0)),
+                ('secondes_resolution', models.FloatField(default=0)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['jour', 'statut'], name='support_tic_jour_48f33c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('agent', 'jour', 'statut'), name='unique_ticket_daily_stat')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0007_ticketdailystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntentCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('titre', models.CharField(max_length=255)),
+                ('annee', models.PositiveSmallIntegerField()),
+                ('mois', models.PositiveSmallIntegerField()),
+                ('nombre_tickets', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('annee', 'mois', 'titre'), name='unique_intent_counter')],
+            },
+        ),
+    ]
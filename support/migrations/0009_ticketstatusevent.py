@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0008_intentcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statut_precedent', models.CharField(blank=True, max_length=20, null=True)),
+                ('statut', models.CharField(max_length=20)),
+                ('date_evenement', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duree_statut_precedent', models.FloatField(default=0)),
+                ('duree_depuis_creation', models.FloatField(default=0)),
+                ('premiere_reponse', models.BooleanField(default=False)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_events', to=settings.AUTH_USER_MODEL)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='support.ticket')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['agent', 'statut', 'date_evenement'], name='support_tic_agent_i_fe81ba_idx'), models.Index(fields=['ticket', 'date_evenement'], name='support_tic_ticket__1efe81_idx')],
+            },
+        ),
+    ]
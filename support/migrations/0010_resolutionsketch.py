@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0009_ticketstatusevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResolutionSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('annee', models.PositiveSmallIntegerField()),
+                ('mois', models.PositiveSmallIntegerField()),
+                ('sketch', models.BinaryField(default=bytes)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resolution_sketches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['annee', 'mois'], name='support_res_annee_40b610_idx')],
+                'constraints': [models.UniqueConstraint(fields=('agent', 'annee', 'mois'), name='unique_resolution_sketch')],
+            },
+        ),
+    ]
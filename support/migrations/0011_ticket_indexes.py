@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0010_resolutionsketch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['client', 'statut', 'date_modification'], name='ticket_client_statut_modif'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['agent', 'statut', 'date_creation'], name='ticket_agent_statut_creation'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('statut__in', ['Assigné', 'En cours'])), fields=['client', '-date_creation', '-id'], name='ticket_client_ouverts'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('statut__in', ['Assigné', 'En cours'])), fields=['agent', '-date_creation', '-id'], name='ticket_agent_ouverts'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['-date_creation', '-id'], name='ticket_creation_id'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0011_ticket_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket_id', models.BigIntegerField()),
+                ('date_suppression', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['date_modification', 'id'], name='ticket_modification_id'),
+        ),
+        migrations.AddField(
+            model_name='tickettombstone',
+            name='agent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tickettombstone',
+            name='client',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tickettombstone',
+            index=models.Index(fields=['date_suppression', 'ticket_id'], name='support_tic_date_su_468881_idx'),
+        ),
+    ]
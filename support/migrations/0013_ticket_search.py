@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:40
+
+import django.contrib.postgres.search
+from django.db import migrations
+from django.db.utils import OperationalError
+
+POSTGRES_DOCUMENT = """
+    setweight(to_tsvector('french', coalesce(t.titre, '')), 'A')
+    || setweight(to_tsvector('french', coalesce(t.description, '')), 'B')
+    || setweight(to_tsvector('french', coalesce(
+        (SELECT string_agg(m.contenu, ' ') FROM support_message m WHERE m.ticket_id = t.id), ''
+    )), 'C')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE INDEX ticket_search_vector ON support_ticket USING gin (search_vector)")
+        schema_editor.execute(f"UPDATE support_ticket t SET search_vector = {POSTGRES_DOCUMENT}")
+    elif connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE support_ticket_fts USING fts5("
+                "titre, description, messages, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            return  # SQLite compilé sans FTS5 : la recherche se replie sur icontains
+        schema_editor.execute(
+            "INSERT INTO support_ticket_fts (rowid, titre, description, messages) "
+            "SELECT t.id, t.titre, t.description, COALESCE((SELECT group_concat(m.contenu, ' ') "
+            "FROM support_message m WHERE m.ticket_id = t.id), '') FROM support_ticket t"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS ticket_search_vector")
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS support_ticket_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0012_ticket_tombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_agent_loads(apps, schema_editor):
+    Utilisateur = apps.get_model('support', 'Utilisateur')
+    AgentLoad = apps.get_model('support', 'AgentLoad')
+    agents = Utilisateur.objects.filter(role='agent').annotate(
+        ouverts=Count('tickets_agent', filter=Q(tickets_agent__statut__in=['Assigné', 'En cours'])),
+    )
+    AgentLoad.objects.bulk_create(AgentLoad(agent_id=agent.pk, tickets_ouverts=agent.ouverts) for agent in agents)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0013_ticket_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentLoad',
+            fields=[
+                ('agent', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='charge', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('tickets_ouverts', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tickets_ouverts', 'agent'], name='support_age_tickets_508eb4_idx')],
+            },
+        ),
+        migrations.RunPython(fill_agent_loads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0014_agentload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('canal', models.CharField(choices=[('email', 'Email'), ('sms', 'SMS')], max_length=10)),
+                ('destinataire', models.CharField(max_length=254)),
+                ('action', models.CharField(max_length=20)),
+                ('ticket_id', models.BigIntegerField(blank=True, null=True)),
+                ('sujet', models.CharField(blank=True, max_length=255)),
+                ('contenu', models.TextField()),
+                ('contenu_html', models.TextField(blank=True)),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', "En cours d'envoi"), ('envoye', 'Envoyé'), ('echec', 'Échec définitif')], default='en_attente', max_length=20)),
+                ('tentatives', models.PositiveIntegerField(default=0)),
+                ('prochaine_tentative', models.DateTimeField(default=django.utils.timezone.now)),
+                ('derniere_erreur', models.TextField(blank=True)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_verrou', models.DateTimeField(blank=True, null=True)),
+                ('date_envoi', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['statut', 'prochaine_tentative'], name='support_not_statut_d46f84_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0015_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='utilisateur',
+            name='telephone_e164',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=16),
+        ),
+    ]
@@ -0,0 +1,80 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear, TruncDate
+from django.utils.timezone import localdate
+
+from support.sketch import DDSketch
+
+
+def fill_ticket_rollups(apps, schema_editor):
+    """
+    Remplit les cumuls à partir des tickets existants, comme la commande
+    backfill_ticket_stats : sans cela, les statistiques liraient des tables
+    vides jusqu'à son exécution manuelle.
+    """
+    Ticket = apps.get_model('support', 'Ticket')
+    TicketDailyStat = apps.get_model('support', 'TicketDailyStat')
+    IntentCounter = apps.get_model('support', 'IntentCounter')
+    ResolutionSketch = apps.get_model('support', 'ResolutionSketch')
+    TicketStatusEvent = apps.get_model('support', 'TicketStatusEvent')
+
+    duree = ExpressionWrapper(F('date_modification') - F('date_creation'), output_field=DurationField())
+
+    rows = Ticket.objects.annotate(jour=TruncDate('date_creation')) \
+        .order_by().values('agent_id', 'jour', 'statut') \
+        .annotate(nombre_tickets=Count('id'), duree_resolution=Sum(duree, filter=Q(statut='Résolu')))
+    TicketDailyStat.objects.all().delete()
+    TicketDailyStat.objects.bulk_create(
+        (
+            TicketDailyStat(
+                agent_id=row['agent_id'],
+                jour=row['jour'],
+                statut=row['statut'],
+                nombre_tickets=row['nombre_tickets'],
+                secondes_resolution=row['duree_resolution'].total_seconds() if row['duree_resolution'] else 0,
+            )
+            for row in rows.iterator(chunk_size=1000)
+        ),
+        batch_size=1000,
+    )
+
+    intents = Ticket.objects.annotate(annee=ExtractYear('date_creation'), mois=ExtractMonth('date_creation')) \
+        .order_by().values('titre', 'annee', 'mois').annotate(nombre_tickets=Count('id'))
+    IntentCounter.objects.all().delete()
+    IntentCounter.objects.bulk_create(
+        (IntentCounter(**row) for row in intents.iterator(chunk_size=1000)),
+        batch_size=1000,
+    )
+
+    sketches = defaultdict(DDSketch)
+    events = TicketStatusEvent.objects.filter(statut='Résolu', statut_precedent__isnull=False) \
+        .values_list('agent_id', 'ticket__date_creation', 'duree_depuis_creation')
+    legacy = Ticket.objects.filter(statut='Résolu').exclude(status_events__statut='Résolu') \
+        .annotate(duree=duree).values_list('agent_id', 'date_creation', 'duree')
+    for agent_id, date_creation, secondes in events.iterator(chunk_size=1000):
+        jour = localdate(date_creation)
+        sketches[(agent_id, jour.year, jour.month)].add(secondes)
+    for agent_id, date_creation, duree_resolution in legacy.iterator(chunk_size=1000):
+        jour = localdate(date_creation)
+        sketches[(agent_id, jour.year, jour.month)].add(duree_resolution.total_seconds())
+    ResolutionSketch.objects.all().delete()
+    ResolutionSketch.objects.bulk_create(
+        (
+            ResolutionSketch(agent_id=agent_id, annee=annee, mois=mois, sketch=sketch.to_bytes())
+            for (agent_id, annee, mois), sketch in sketches.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0016_utilisateur_telephone_e164'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_ticket_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+
+
+def fill_date_resolution(apps, schema_editor):
+    """
+    Fige la date de résolution des tickets déjà résolus : date de création plus
+    la durée du dernier passage à 'Résolu' du journal, sinon date_modification
+    (tickets antérieurs au journal). Les cumuls TicketDailyStat sont recalculés
+    avec cette durée.
+    """
+    Ticket = apps.get_model('support', 'Ticket')
+    TicketDailyStat = apps.get_model('support', 'TicketDailyStat')
+    TicketStatusEvent = apps.get_model('support', 'TicketStatusEvent')
+
+    dernier_passage = TicketStatusEvent.objects.filter(ticket=OuterRef('pk'), statut='Résolu') \
+        .order_by('-date_evenement', '-id').values('duree_depuis_creation')[:1]
+    resolus = Ticket.objects.filter(statut='Résolu').annotate(duree=Subquery(dernier_passage)) \
+        .only('id', 'date_creation', 'date_modification')
+    batch = []
+    for ticket in resolus.iterator(chunk_size=1000):
+        if ticket.duree is None:
+            ticket.date_resolution = ticket.date_modification
+        else:
+            ticket.date_resolution = ticket.date_creation + timedelta(seconds=ticket.duree)
+        batch.append(ticket)
+        if len(batch) == 1000:
+            Ticket.objects.bulk_update(batch, ['date_resolution'])
+            batch = []
+    Ticket.objects.bulk_update(batch, ['date_resolution'])
+
+    duree = ExpressionWrapper(F('date_resolution') - F('date_creation'), output_field=DurationField())
+    rows = Ticket.objects.annotate(jour=TruncDate('date_creation')) \
+        .order_by().values('agent_id', 'jour', 'statut') \
+        .annotate(nombre_tickets=Count('id'), duree_resolution=Sum(duree, filter=Q(statut='Résolu')))
+    TicketDailyStat.objects.all().delete()
+    TicketDailyStat.objects.bulk_create(
+        (
+            TicketDailyStat(
+                agent_id=row['agent_id'],
+                jour=row['jour'],
+                statut=row['statut'],
+                nombre_tickets=row['nombre_tickets'],
+                secondes_resolution=row['duree_resolution'].total_seconds() if row['duree_resolution'] else 0,
+            )
+            for row in rows.iterator(chunk_size=1000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0017_fill_ticket_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='date_resolution',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_date_resolution, migrations.RunPython.noop),
+    ]
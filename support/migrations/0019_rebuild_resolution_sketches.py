@@ -0,0 +1,41 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.utils.timezone import localdate
+
+from support.sketch import DDSketch
+
+
+def rebuild_resolution_sketches(apps, schema_editor):
+    """
+    Les sketches ne comptent plus que les tickets actuellement résolus : on les
+    reconstruit à partir de leur durée de résolution, comme backfill_ticket_stats.
+    """
+    Ticket = apps.get_model('support', 'Ticket')
+    ResolutionSketch = apps.get_model('support', 'ResolutionSketch')
+
+    sketches = defaultdict(DDSketch)
+    resolus = Ticket.objects.filter(statut='Résolu').values_list('agent_id', 'date_creation', 'date_resolution')
+    for agent_id, date_creation, date_resolution in resolus.iterator(chunk_size=1000):
+        jour = localdate(date_creation)
+        secondes = (date_resolution - date_creation).total_seconds() if date_resolution else 0.0
+        sketches[(agent_id, jour.year, jour.month)].add(secondes)
+    ResolutionSketch.objects.all().delete()
+    ResolutionSketch.objects.bulk_create(
+        (
+            ResolutionSketch(agent_id=agent_id, annee=annee, mois=mois, sketch=sketch.to_bytes())
+            for (agent_id, annee, mois), sketch in sketches.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0018_ticket_date_resolution'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_resolution_sketches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    TicketTombstone.client / agent deviennent des identifiants sans clé
+    étrangère : les colonnes client_id / agent_id et leurs index sont conservés,
+    seule la contrainte est supprimée.
+    """
+
+    dependencies = [
+        ('support', '0019_rebuild_resolution_sketches'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.AlterField(
+                    model_name='tickettombstone',
+                    name='client',
+                    field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='tickettombstone',
+                    name='agent',
+                    field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='tickettombstone',
+                    name='client',
+                ),
+                migrations.RemoveField(
+                    model_name='tickettombstone',
+                    name='agent',
+                ),
+                migrations.AddField(
+                    model_name='tickettombstone',
+                    name='client_id',
+                    field=models.BigIntegerField(db_index=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='tickettombstone',
+                    name='agent_id',
+                    field=models.BigIntegerField(blank=True, db_index=True, null=True),
+                ),
+            ],
+        ),
+    ]
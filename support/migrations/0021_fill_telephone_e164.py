@@ -0,0 +1,33 @@
+from django.db import migrations
+
+from support.phones import normalize_phone
+
+
+def fill_telephone_e164(apps, schema_editor):
+    """
+    Calcule telephone_e164 des utilisateurs existants : sans cela, la colonne
+    ajoutée par 0016 reste vide et les SMS ne partent plus jusqu'à l'exécution
+    manuelle de normalize_phones.
+    """
+    Utilisateur = apps.get_model('support', 'Utilisateur')
+    batch = []
+    for user in Utilisateur.objects.only('pk', 'telephone', 'telephone_e164').iterator(chunk_size=1000):
+        number = normalize_phone(user.telephone)
+        if number != user.telephone_e164:
+            user.telephone_e164 = number
+            batch.append(user)
+        if len(batch) == 1000:
+            Utilisateur.objects.bulk_update(batch, ['telephone_e164'])
+            batch = []
+    Utilisateur.objects.bulk_update(batch, ['telephone_e164'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0020_tickettombstone_plain_ids'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_telephone_e164, migrations.RunPython.noop),
+    ]
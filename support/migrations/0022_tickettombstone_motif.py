@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0021_fill_telephone_e164'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickettombstone',
+            name='motif',
+            field=models.CharField(choices=[('suppression', 'Suppression'), ('reaffectation', 'Réaffectation')], default='suppression', max_length=20),
+        ),
+    ]
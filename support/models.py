@@ -1,6 +1,13 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.contrib.postgres.search import SearchVectorField
+from datetime import timedelta
+
 from django.db import models
-from django.utils.timezone import now
+from django.db.models import Q
+from django.utils.timezone import localdate, now
+
+from .phones import normalize_phone
+from .sketch import DDSketch
 
 # Définition des rôles possibles
 ROLES = (
@@ -28,10 +35,19 @@ class UtilisateurManager(BaseUserManager):
 
         return self.create_user(email, password, **extra_fields)
 
+    def with_phone(self, number):
+        """Utilisateurs dont le numéro (quel que soit son format de saisie) correspond à `number`."""
+        number = normalize_phone(number)
+        if not number:
+            return self.none()
+        return self.filter(telephone_e164=number)
+
 class Utilisateur(AbstractBaseUser, PermissionsMixin):
     nom = models.CharField(max_length=255)
     email = models.EmailField(unique=True)
     telephone = models.CharField(max_length=20)
+    # Forme E.164 de telephone, calculée à l'enregistrement ('' si non reconnue)
+    telephone_e164 = models.CharField(max_length=16, blank=True, default='', db_index=True, editable=False)
     password = models.CharField(max_length=128)
     role = models.CharField(max_length=10, choices=ROLES, default='client')  # Différenciation des rôles
     last_login = models.DateTimeField(default=now)
@@ -53,11 +69,37 @@ class Utilisateur(AbstractBaseUser, PermissionsMixin):
 
     def save(self, *args, **kwargs):
         # Supprime la logique de hachage ici (déjà gérée par create_user/set_password)
+        self.telephone_e164 = normalize_phone(self.telephone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'telephone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'telephone_e164'}
         super().save(*args, **kwargs)
 
 
 
 
+# Statuts « ouverts » (toujours listés) et « clos » (listés pendant ACTIVE_WINDOW_DAYS jours)
+OPEN_STATUTS = ['Assigné', 'En cours']
+CLOSED_STATUTS = ['Résolu', 'Rejeté']
+ACTIVE_WINDOW_DAYS = 10
+
+
+class TicketQuerySet(models.QuerySet):
+    def active_window(self, days=ACTIVE_WINDOW_DAYS):
+        """Tickets ouverts, plus les tickets clos modifiés depuis moins de `days` jours."""
+        seuil = now() - timedelta(days=days)
+        return self.filter(
+            Q(statut__in=OPEN_STATUTS) |
+            Q(statut__in=CLOSED_STATUTS, date_modification__gte=seuil)
+        )
+
+
+class TicketManager(models.Manager.from_queryset(TicketQuerySet)):
+    def get_queryset(self):
+        # search_vector n'est lu que par la recherche : ne pas le charger ni le réécrire à chaque save()
+        return super().get_queryset().defer('search_vector')
+
+
 class Ticket(models.Model):
     STATUTS = [
         ('ASSIGNÉ', 'Assigné'),
@@ -85,6 +127,287 @@ class Ticket(models.Model):
     )
     date_creation = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
+    # Passage à 'Résolu', figé à la transition (None hors de ce statut) : une modification
+    # ultérieure du ticket ne change pas sa durée de résolution
+    date_resolution = models.DateTimeField(null=True, blank=True, editable=False)
+    # Recherche plein texte (PostgreSQL) : titre, description et messages, tenu à jour par support.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = TicketManager()
+
+    class Meta:
+        indexes = [
+            # Listes filtrées sur la fenêtre active, par client ou par agent
+            models.Index(fields=['client', 'statut', 'date_modification'], name='ticket_client_statut_modif'),
+            models.Index(fields=['agent', 'statut', 'date_creation'], name='ticket_agent_statut_creation'),
+            # Index partiels des tickets ouverts, dans l'ordre de pagination (-date_creation, -id)
+            models.Index(
+                fields=['client', '-date_creation', '-id'],
+                condition=Q(statut__in=OPEN_STATUTS),
+                name='ticket_client_ouverts',
+            ),
+            models.Index(
+                fields=['agent', '-date_creation', '-id'],
+                condition=Q(statut__in=OPEN_STATUTS),
+                name='ticket_agent_ouverts',
+            ),
+            models.Index(fields=['-date_creation', '-id'], name='ticket_creation_id'),
+            # Synchronisation différentielle (/api/tickets/changes/)
+            models.Index(fields=['date_modification', 'id'], name='ticket_modification_id'),
+        ]
+
+    # Champs nécessaires pour calculer les contributions aux cumuls TicketDailyStat / IntentCounter
+    STAT_FIELDS = {'agent_id', 'titre', 'statut', 'date_creation', 'date_resolution'}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Mémorise la contribution chargée pour mettre à jour le cumul de façon incrémentale
+        if cls.STAT_FIELDS.issubset(field_names):
+            instance._stat_snapshot = instance.stat_contribution()
+            instance._intent_snapshot = instance.intent_contribution()
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.track_resolution()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'statut' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'date_resolution'}
+        super().save(*args, **kwargs)
+
+    def track_resolution(self, moment=None):
+        """Fixe date_resolution au passage à 'Résolu', l'efface à la sortie de ce statut."""
+        if self.statut != 'Résolu':
+            self.date_resolution = None
+        elif self.date_resolution is None:
+            self.date_resolution = moment or now()
+
+    def stat_contribution(self):
+        """
+        Contribution du ticket au cumul TicketDailyStat :
+        (agent_id, jour de création, statut, secondes de résolution).
+        """
+        if self.date_creation is None:
+            return None
+        secondes = 0.0
+        if self.statut == 'Résolu' and self.date_resolution:
+            secondes = (self.date_resolution - self.date_creation).total_seconds()
+        return self.agent_id, localdate(self.date_creation), self.statut, secondes
+
+    def intent_contribution(self):
+        """Contribution du ticket au compteur IntentCounter : (titre, année, mois)."""
+        if self.date_creation is None:
+            return None
+        jour = localdate(self.date_creation)
+        return self.titre, jour.year, jour.month
+
+
+class TicketTombstone(models.Model):
+    """
+    Trace d'un ticket supprimé, pour que la synchronisation différentielle
+    (/api/tickets/changes/) signale la suppression aux clients. Une
+    réaffectation laisse aussi une trace (motif 'reaffectation', agent_id :
+    l'ancien agent) : le ticket sort du périmètre de l'agent dessaisi.
+
+    client_id / agent_id sont de simples identifiants, sans clé étrangère : la
+    trace est écrite pendant la suppression en cascade des tickets d'un
+    utilisateur, avant la suppression de l'utilisateur lui-même.
+    """
+    MOTIFS = [
+        ('suppression', 'Suppression'),
+        ('reaffectation', 'Réaffectation'),
+    ]
+
+    ticket_id = models.BigIntegerField()
+    client_id = models.BigIntegerField(null=True, db_index=True)
+    agent_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    motif = models.CharField(max_length=20, choices=MOTIFS, default='suppression')
+    date_suppression = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_suppression', 'ticket_id']),
+        ]
+
+    def __str__(self):
+        return f"Ticket {self.ticket_id} supprimé le {self.date_suppression}"
+
+
+class TicketDailyStat(models.Model):
+    """
+    Cumul journalier des tickets par (agent, jour de création, statut), maintenu
+    de façon incrémentale par support/rollup.py et reconstruit par la commande
+    backfill_ticket_stats. Les tableaux de bord lisent ce cumul plutôt que Ticket.
+    """
+    agent = models.ForeignKey(
+        Utilisateur,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='daily_stats'
+    )
+    jour = models.DateField()
+    statut = models.CharField(max_length=20)
+    nombre_tickets = models.IntegerField(default=0)
+    secondes_resolution = models.FloatField(default=0)  # somme des durées de résolution
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['agent', 'jour', 'statut'], name='unique_ticket_daily_stat'),
+        ]
+        indexes = [
+            models.Index(fields=['jour', 'statut']),
+        ]
+
+    def __str__(self):
+        return f"{self.jour} {self.statut} agent={self.agent_id} : {self.nombre_tickets}"
+
+
+class TicketStatusEvent(models.Model):
+    """
+    Journal (en ajout seul) des changements de statut des tickets, écrit par
+    support/rollup.py à la création et à chaque transition (changer_statut,
+    perform_update). Les durées sont figées au moment de la transition pour que
+    les métriques se lisent par parcours d'index, sans rejouer l'historique.
+    """
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='status_events')
+    agent = models.ForeignKey(
+        Utilisateur,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='status_events'
+    )
+    statut_precedent = models.CharField(max_length=20, null=True, blank=True)  # None à la création
+    statut = models.CharField(max_length=20)
+    date_evenement = models.DateTimeField(default=now)
+    duree_statut_precedent = models.FloatField(default=0)  # secondes passées dans statut_precedent
+    duree_depuis_creation = models.FloatField(default=0)  # secondes depuis la création du ticket
+    premiere_reponse = models.BooleanField(default=False)  # première transition après la création
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['agent', 'statut', 'date_evenement']),
+            models.Index(fields=['ticket', 'date_evenement']),
+        ]
+
+    def __str__(self):
+        return f"Ticket {self.ticket_id} : {self.statut_precedent} -> {self.statut} ({self.date_evenement})"
+
+
+class ResolutionSketch(models.Model):
+    """
+    Sketch de quantiles (DDSketch, voir support/sketch.py) des durées de
+    résolution en secondes, par agent et par mois de création du ticket.
+    Ne compte que les tickets actuellement résolus, comme TicketDailyStat : la
+    durée y entre au passage à 'Résolu' et en sort à la réouverture, à la
+    réaffectation ou à la suppression du ticket. Les sketches se fusionnent
+    pour obtenir les percentiles d'une équipe ou d'une année.
+    """
+    agent = models.ForeignKey(
+        Utilisateur,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='resolution_sketches'
+    )
+    annee = models.PositiveSmallIntegerField()
+    mois = models.PositiveSmallIntegerField()
+    sketch = models.BinaryField(default=bytes)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['agent', 'annee', 'mois'], name='unique_resolution_sketch'),
+        ]
+        indexes = [
+            models.Index(fields=['annee', 'mois']),
+        ]
+
+    def load(self):
+        return DDSketch.from_bytes(self.sketch) if self.sketch else DDSketch()
+
+    def store(self, sketch):
+        self.sketch = sketch.to_bytes()
+
+    def __str__(self):
+        return f"Sketch agent={self.agent_id} {self.mois}/{self.annee}"
+
+
+class IntentCounter(models.Model):
+    """
+    Nombre de tickets par intention (titre) et par mois de création, maintenu
+    par support/rollup.py : la fréquence des intentions se lit en quelques lignes.
+    """
+    titre = models.CharField(max_length=255)
+    annee = models.PositiveSmallIntegerField()
+    mois = models.PositiveSmallIntegerField()
+    nombre_tickets = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['annee', 'mois', 'titre'], name='unique_intent_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.titre} ({self.mois}/{self.annee}) : {self.nombre_tickets}"
+
+
+class AgentLoad(models.Model):
+    """
+    Nombre de tickets ouverts (OPEN_STATUTS) assignés à chaque agent, maintenu
+    par support/rollup.py : l'assignation lit la charge sans compter les tickets.
+    """
+    agent = models.OneToOneField(Utilisateur, on_delete=models.CASCADE, primary_key=True, related_name='charge')
+    tickets_ouverts = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tickets_ouverts', 'agent']),
+        ]
+
+    def __str__(self):
+        return f"{self.agent_id} : {self.tickets_ouverts} tickets ouverts"
+
+
+class NotificationOutbox(models.Model):
+    """
+    Notification (email ou SMS) à envoyer, écrite dans la même transaction que
+    la modification du ticket puis envoyée par la commande run_notification_worker.
+    """
+    CANAUX = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ]
+    STATUTS = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours d\'envoi'),
+        ('envoye', 'Envoyé'),
+        ('echec', 'Échec définitif'),
+    ]
+
+    canal = models.CharField(max_length=10, choices=CANAUX)
+    destinataire = models.CharField(max_length=254)
+    action = models.CharField(max_length=20)
+    ticket_id = models.BigIntegerField(null=True, blank=True)
+    sujet = models.CharField(max_length=255, blank=True)
+    contenu = models.TextField()
+    contenu_html = models.TextField(blank=True)
+
+    statut = models.CharField(max_length=20, choices=STATUTS, default='en_attente')
+    tentatives = models.PositiveIntegerField(default=0)
+    prochaine_tentative = models.DateTimeField(default=now)
+    derniere_erreur = models.TextField(blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_verrou = models.DateTimeField(null=True, blank=True)
+    date_envoi = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['statut', 'prochaine_tentative']),
+        ]
+
+    def __str__(self):
+        return f"{self.canal} {self.action} -> {self.destinataire} ({self.statut})"
 
 
 class Message(models.Model):
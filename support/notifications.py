@@ -1,130 +1,167 @@
-from django.core.mail import send_mail
+from collections import defaultdict
+
+from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 import logging
 
+from . import outbox
+from .mailer import dispatcher
+from .models import NotificationOutbox
+
 logger = logging.getLogger(__name__)
 
-def send_ticket_email(action, ticket):
+TICKET_TEMPLATES = {
+    'created': ("[YaFi] Nouveau ticket créé : {ticket.titre}", "emails/ticket_created.html"),
+    'updated': ("[YaFi] Ticket mis à jour : {ticket.titre} (Statut: {ticket.statut})", "emails/ticket_updated.html"),
+    'deleted': ("[YaFi] Ticket supprimé : {ticket.titre}", "emails/ticket_deleted.html"),
+}
+
+TICKET_SMS = {
+    'created': "🎫 Nouveau ticket YaFi service client : '{ticket.titre}' créé avec succès.",
+    'updated': "✏️ Ticket YaFi service client '{ticket.titre}' mis à jour. Statut : {ticket.statut}",
+    'deleted': "🗑️ Votre ticket YaFi service client '{ticket.titre}' a été supprimé.",
+}
+
+
+def ticket_notifications(action, ticket):
     """
-    Envoie un email en fonction de l'action sur le ticket.
+    Notifications (non enregistrées) d'une action sur un ticket :
+    un email au client et à l'agent (au client seulement pour 'deleted'),
+    un SMS au client s'il a un numéro.
     action : 'created', 'updated', 'deleted'
-    ticket : instance Ticket
     """
-
-    subject = None
-    html_message = None
-    recipient_list = []
-
-    client_email = ticket.client.email if ticket.client else None
-    agent_email = ticket.agent.email if ticket.agent else None
-
-    # Construire le sujet et message selon l'action
-    if action == "created":
-        subject = f"[YaFi] Nouveau ticket créé : {ticket.titre}"
-        html_message = render_to_string("emails/ticket_created.html", {"ticket": ticket})
-        recipient_list = [client_email, agent_email]
-    elif action == "updated":
-        subject = f"[YaFi] Ticket mis à jour : {ticket.titre} (Statut: {ticket.statut})"
-        html_message = render_to_string("emails/ticket_updated.html", {"ticket": ticket})
-        recipient_list = [client_email, agent_email]
-    elif action == "deleted":
-        subject = f"[YaFi] Ticket supprimé : {ticket.titre}"
-        html_message = render_to_string("emails/ticket_deleted.html", {"ticket": ticket})
-        # On n'envoie l'info qu'au client (pas à l'agent)
-        recipient_list = [client_email]
-    else:
+    if action not in TICKET_TEMPLATES:
         logger.warning(f"Action email inconnue : {action}")
-        return
+        return []
+
+    subject, template = TICKET_TEMPLATES[action]
+    html_message = render_to_string(template, {"ticket": ticket})
+    recipients = [ticket.client] if action == 'deleted' else [ticket.client, ticket.agent]
+    # Filtrer les emails valides (non None), sans doublon
+    emails = list(dict.fromkeys(user.email for user in recipients if user and user.email))
+
+    notifications = [
+        NotificationOutbox(
+            canal='email',
+            destinataire=email,
+            action=action,
+            ticket_id=ticket.pk,
+            sujet=subject.format(ticket=ticket),
+            contenu=strip_tags(html_message),
+            contenu_html=html_message,
+        )
+        for email in emails
+    ]
+    if not emails:
+        logger.warning(f"Aucun destinataire valide pour l'email ticket {ticket.pk} action {action}")
+
+    # SMS au client uniquement (s'il a un numéro reconnu)
+    if ticket.client and ticket.client.telephone_e164:
+        notifications.append(NotificationOutbox(
+            canal='sms',
+            destinataire=ticket.client.telephone_e164,
+            action=action,
+            ticket_id=ticket.pk,
+            contenu=TICKET_SMS[action].format(ticket=ticket),
+        ))
+    return notifications
+
+
+BULK_SUBJECTS = {
+    'created': "[YaFi] {count} nouveau(x) ticket(s) créé(s)",
+    'updated': "[YaFi] {count} ticket(s) mis à jour",
+    'deleted': "[YaFi] {count} ticket(s) supprimé(s)",
+}
+
+
+def bulk_ticket_notifications(action, tickets):
+    """
+    Notifications (non enregistrées) d'une opération en masse : un seul email
+    par destinataire (et un seul SMS par client) listant tous ses tickets
+    concernés, au lieu d'un envoi par ticket. Mêmes destinataires que
+    ticket_notifications.
+    action : 'created', 'updated' ou 'deleted'
+    """
+    if action not in BULK_SUBJECTS:
+        logger.warning(f"Action email groupée inconnue : {action}")
+        return []
+
+    by_email = defaultdict(list)
+    by_phone = defaultdict(list)
+    for ticket in tickets:
+        recipients = [ticket.client]
+        if action != 'deleted':
+            recipients.append(ticket.agent)
+        for user in recipients:
+            if user and user.email:
+                by_email[user.email].append(ticket)
+        # Clé E.164 : un même numéro saisi sous plusieurs formes ne reçoit qu'un SMS
+        if ticket.client and ticket.client.telephone_e164:
+            by_phone[ticket.client.telephone_e164].append(ticket)
+
+    notifications = []
+    for email, recipient_tickets in by_email.items():
+        html_message = render_to_string("emails/tickets_bulk.html", {"action": action, "tickets": recipient_tickets})
+        notifications.append(NotificationOutbox(
+            canal='email',
+            destinataire=email,
+            action=action,
+            ticket_id=recipient_tickets[0].pk if len(recipient_tickets) == 1 else None,
+            sujet=BULK_SUBJECTS[action].format(count=len(recipient_tickets)),
+            contenu=strip_tags(html_message),
+            contenu_html=html_message,
+        ))
+
+    for number, recipient_tickets in by_phone.items():
+        if action == 'created':
+            sms_message = f"🎫 {len(recipient_tickets)} nouveau(x) ticket(s) YaFi service client créé(s) avec succès."
+        elif action == 'updated':
+            sms_message = f"✏️ {len(recipient_tickets)} ticket(s) YaFi service client mis à jour."
+        else:
+            sms_message = f"🗑️ {len(recipient_tickets)} de vos tickets YaFi service client ont été supprimés."
+        notifications.append(NotificationOutbox(
+            canal='sms',
+            destinataire=number,
+            action=action,
+            ticket_id=recipient_tickets[0].pk if len(recipient_tickets) == 1 else None,
+            contenu=sms_message,
+        ))
+    return notifications
+
+
+def enqueue_ticket_notification(action, ticket):
+    """
+    Met en file (outbox) les notifications d'une action sur un ticket, dans la
+    transaction en cours : elles ne partent que si la modification est commitée.
+    Les mises à jour rapprochées sont fusionnées (outbox.enqueue_update).
+    """
+    notifications = ticket_notifications(action, ticket)
+    if action == 'updated':
+        return outbox.enqueue_update(ticket.pk, notifications)
+    if action == 'deleted':
+        outbox.drop_pending_updates([ticket.pk])
+    return outbox.enqueue(notifications)
 
-    # Nettoyer le message texte pour fallback
-    message = strip_tags(html_message)
 
-    # Filtrer les emails valides (non None)
-    recipient_list = [email for email in recipient_list if email]
+def enqueue_bulk_ticket_notification(action, tickets):
+    if action == 'deleted':
+        outbox.drop_pending_updates(ticket.pk for ticket in tickets)
+    return outbox.enqueue(bulk_ticket_notifications(action, tickets))
 
-    if not recipient_list:
-        logger.warning(f"Aucun destinataire valide pour l'email ticket {ticket.id} action {action}")
-        return
 
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipient_list,
-            html_message=html_message,
-            fail_silently=False,
-        )
-        logger.info(f"Email envoyé pour ticket {ticket.id}, action {action} aux : {recipient_list}")
-    except Exception as e:
-        logger.error(f"Erreur envoi email ticket {ticket.id}, action {action} : {e}")
-
-        # -- contenu SMS simple --
-    sms_message = None
-
-    if action == "created":
-        ...
-        sms_message = f"🎫 Nouveau ticket YaFi service client : '{ticket.titre}' créé avec succès."
-    elif action == "updated":
-        ...
-        sms_message = f"✏️ Ticket YaFi service client '{ticket.titre}' mis à jour. Statut : {ticket.statut}"
-    elif action == "deleted":
-        ...
-        sms_message = f"🗑️ Votre ticket YaFi service client '{ticket.titre}' a été supprimé."
-
-
-
-    def format_telephone_cameroon(phone_number: str) -> str:
-            phone_number = phone_number.strip()
-
-            # Supprime les espaces, tirets ou parenthèses
-            for ch in [' ', '-', '(', ')']:
-                phone_number = phone_number.replace(ch, '')
-
-            # Si déjà au format international
-            if phone_number.startswith('+237'):
-                return phone_number
-
-            # Si commence par 237 sans le +
-            if phone_number.startswith('237'):
-                return f'+{phone_number}'
-
-            # Si commence par 6 ou autre (numéro local au Cameroun)
-            if phone_number.startswith('6') and len(phone_number) == 9:
-                return f'+237{phone_number}'
-
-            # Sinon, retourne tel quel (ou ajoutez une exception selon votre logique)
-            return phone_number
-
-    # Envoi SMS au client uniquement (s'il a un numéro)
-    if hasattr(ticket.client, "telephone") and ticket.client.telephone:
-        formatted_number = format_telephone_cameroon(ticket.client.telephone)
-        send_sms(formatted_number, sms_message)
-
-from twilio.rest import Client
-import os
-
-def send_sms(to_number, message):
-    account_sid = os.environ.get("TWILIO_ACCOUNT_SID")
-    auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
-    from_number = os.environ.get("TWILIO_PHONE_NUMBER")
-
-    if not (account_sid and auth_token and from_number):
-        logger.warning("Configuration Twilio manquante")
-        return
-
-    try:
-        client = Client(account_sid, auth_token)
-        client.messages.create(
-            body=message,
-            from_=from_number,
-            to=to_number,
-        )
-        logger.info(f"SMS envoyé à {to_number}")
-    except Exception as e:
-        logger.error(f"Erreur lors de l'envoi du SMS : {e}")
+def email_message(notification):
+    message = EmailMultiAlternatives(
+        subject=notification.sujet,
+        body=notification.contenu,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[notification.destinataire],
+    )
+    if notification.contenu_html:
+        message.attach_alternative(notification.contenu_html, "text/html")
+    return message
+
 
 def envoyer_code_reinit(user, code):
         """
@@ -135,18 +172,17 @@ def envoyer_code_reinit(user, code):
             "user": user,
             "code": code
         })
-        message = strip_tags(html_message)
-        recipient_list = [user.email]
-
-        try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=recipient_list,
-                html_message=html_message,
-                fail_silently=False,
-            )
+        message = EmailMultiAlternatives(
+            subject=subject,
+            body=strip_tags(html_message),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[user.email],
+        )
+        message.attach_alternative(html_message, "text/html")
+
+        # Connexion SMTP partagée : pas de nouvelle session (TLS, authentification) par code envoyé
+        error, = dispatcher().send([message])
+        if error is None:
             logger.info(f"Email de code de réinitialisation envoyé à {user.email}")
-        except Exception as e:
-            logger.error(f"Erreur lors de l'envoi de l'email de réinitialisation : {e}")
\ No newline at end of file
+        else:
+            logger.error(f"Erreur lors de l'envoi de l'email de réinitialisation : {error}")
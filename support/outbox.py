@@ -0,0 +1,141 @@
+"""
+Outbox transactionnelle des notifications (emails et SMS).
+
+Les vues écrivent les notifications dans NotificationOutbox, dans la même
+transaction que la modification du ticket : une requête ne dépend plus de la
+latence SMTP / Twilio, et une notification n'est envoyée que si la
+modification a été commitée. La commande run_notification_worker les réclame
+par lots (SELECT ... FOR UPDATE SKIP LOCKED, plusieurs workers possibles),
+les envoie et enregistre le résultat ; un échec est réessayé avec un délai
+exponentiel, puis passe en 'echec' (dead letter) après MAX_ATTEMPTS.
+
+Les notifications 'updated' d'un ticket sont différées de
+settings.NOTIFICATION_COALESCE_WINDOW secondes : pendant cette fenêtre, une
+nouvelle modification remplace le contenu de la notification en attente du
+même destinataire (état final) au lieu d'en ajouter une, et une suppression
+du ticket annule ses mises à jour encore en attente.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.timezone import now
+
+from .models import NotificationOutbox
+
+MAX_ATTEMPTS = 5
+# Délai avant la n-ième nouvelle tentative : RETRY_BASE * 2^(n-1), plafonné à RETRY_MAX (secondes)
+RETRY_BASE = 30
+RETRY_MAX = 3600
+# Une notification 'en_cours' depuis plus longtemps appartient à un worker arrêté
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+
+def coalesce_window():
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 60))
+
+
+def enqueue(notifications):
+    """Enregistre des notifications non enregistrées (dans la transaction en cours)."""
+    return NotificationOutbox.objects.bulk_create(notifications)
+
+
+def enqueue_update(ticket_id, notifications):
+    """
+    Met en file les notifications 'updated' d'un ticket en les fusionnant avec
+    celles encore en attente dans la fenêtre (clé : ticket, canal, destinataire).
+    """
+    window = coalesce_window()
+    if not window:
+        return enqueue(notifications)
+
+    moment = now()
+    pending = {
+        (notification.canal, notification.destinataire): notification.pk
+        for notification in NotificationOutbox.objects.filter(
+            ticket_id=ticket_id, action='updated', statut='en_attente',
+            tentatives=0, prochaine_tentative__gt=moment,
+        ).only('pk', 'canal', 'destinataire')
+    }
+    new = []
+    for notification in notifications:
+        pk = pending.get((notification.canal, notification.destinataire))
+        # Le statut est revérifié : un worker a pu réclamer la notification entre-temps
+        if pk and NotificationOutbox.objects.filter(pk=pk, statut='en_attente').update(
+            sujet=notification.sujet, contenu=notification.contenu, contenu_html=notification.contenu_html,
+        ):
+            continue
+        notification.prochaine_tentative = moment + window
+        new.append(notification)
+    return enqueue(new)
+
+
+def drop_pending_updates(ticket_ids):
+    """Annule les mises à jour encore en attente de tickets supprimés."""
+    return NotificationOutbox.objects.filter(
+        ticket_id__in=list(ticket_ids), action='updated', statut='en_attente',
+    ).delete()[0]
+
+
+def claim_batch(size):
+    """
+    Réclame jusqu'à `size` notifications dues et les passe en 'en_cours'.
+    Les lignes déjà verrouillées par un autre worker sont sautées.
+    """
+    moment = now()
+    with transaction.atomic():
+        notifications = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(statut='en_attente', prochaine_tentative__lte=moment)
+            .order_by('prochaine_tentative', 'id')[:size]
+        )
+        if notifications:
+            NotificationOutbox.objects.filter(pk__in=[n.pk for n in notifications]) \
+                .update(statut='en_cours', date_verrou=moment)
+    for notification in notifications:
+        notification.statut = 'en_cours'
+        notification.date_verrou = moment
+    return notifications
+
+
+def release_stale():
+    """Remet en attente les notifications réclamées par un worker qui n'a pas terminé."""
+    return NotificationOutbox.objects.filter(
+        statut='en_cours', date_verrou__lt=now() - LOCK_TIMEOUT,
+    ).update(statut='en_attente', date_verrou=None)
+
+
+def retry_delay(attempts):
+    delay = min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+    # Jitter : des échecs simultanés ne sont pas tous réessayés au même instant
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def mark_sent(notification):
+    notification.statut = 'envoye'
+    notification.tentatives += 1
+    notification.date_envoi = now()
+    notification.date_verrou = None
+    notification.save(update_fields=['statut', 'tentatives', 'date_envoi', 'date_verrou'])
+
+
+def mark_failed(notification, error, max_attempts=MAX_ATTEMPTS):
+    """
+    Enregistre un échec : nouvelle tentative différée, ou 'echec' définitif après
+    max_attempts (ou tout de suite si le canal n'est pas configuré).
+    """
+    notification.tentatives += 1
+    notification.derniere_erreur = f"{type(error).__name__}: {error}"
+    notification.date_verrou = None
+    if notification.tentatives >= max_attempts or isinstance(error, ImproperlyConfigured):
+        notification.statut = 'echec'
+    else:
+        notification.statut = 'en_attente'
+        notification.prochaine_tentative = now() + retry_delay(notification.tentatives)
+    notification.save(update_fields=['statut', 'tentatives', 'derniere_erreur', 'date_verrou', 'prochaine_tentative'])
+
+
+def pending_count():
+    return NotificationOutbox.objects.filter(statut='en_attente').count()
@@ -0,0 +1,122 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class TicketCursorPagination(BasePagination):
+    """
+    Pagination par curseur (keyset) sur (-date_creation, -id).
+
+    Le curseur encode la position (date_creation, id) du dernier (ou premier)
+    ticket de la page : la page suivante est un simple
+    WHERE (date_creation, id) < position ORDER BY ... LIMIT n,
+    sans COUNT(*) ni OFFSET, et reste stable si de nouveaux tickets arrivent.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = "Curseur invalide."
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def position(ticket):
+        """(date_creation, id) d'un ticket, instance ou dict issu de .values()."""
+        if isinstance(ticket, dict):
+            return ticket['date_creation'], ticket['id']
+        return ticket.date_creation, ticket.pk
+
+    def encode_cursor(self, ticket, reverse):
+        date_creation, pk = self.position(ticket)
+        raw = f"{date_creation.isoformat()}|{pk}|{'p' if reverse else 'n'}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            date_creation, pk, direction = base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+            return datetime.fromisoformat(date_creation), int(pk), direction == 'p'
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            reverse = False
+            tickets = queryset.order_by('-date_creation', '-id')
+        else:
+            date_creation, pk, reverse = cursor
+            if reverse:
+                # Page précédente : tickets plus récents que la position, lus en ordre croissant
+                tickets = queryset.filter(
+                    Q(date_creation__gt=date_creation) | Q(date_creation=date_creation, id__gt=pk)
+                ).order_by('date_creation', 'id')
+            else:
+                tickets = queryset.filter(
+                    Q(date_creation__lt=date_creation) | Q(date_creation=date_creation, id__lt=pk)
+                ).order_by('-date_creation', '-id')
+
+        page = list(tickets[:self.page_size_value + 1])
+        has_more = len(page) > self.page_size_value
+        page = page[:self.page_size_value]
+
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = page
+        return page
+
+    def _link(self, ticket, reverse):
+        url = self.request.build_absolute_uri()
+        if ticket is None:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(ticket, reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return self._link(None, reverse=True)
+        return self._link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
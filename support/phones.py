@@ -0,0 +1,32 @@
+"""
+Normalisation des numéros de téléphone au format E.164 (+237XXXXXXXXX).
+
+Utilisateur.telephone garde le numéro tel que saisi ; sa forme E.164 est
+calculée une fois à l'enregistrement (Utilisateur.telephone_e164, indexée)
+et c'est elle que lisent les notifications SMS et les recherches par numéro.
+"""
+import re
+
+CAMEROON_PREFIX = '+237'
+
+_SEPARATORS = re.compile(r'[\s\-().]')
+_E164 = re.compile(r'^\+[1-9]\d{7,14}$')
+
+
+def normalize_phone(number):
+    """Numéro au format E.164, ou '' s'il n'est pas reconnu."""
+    if not number:
+        return ''
+    number = _SEPARATORS.sub('', number)
+
+    # Préfixe international 00 -> +
+    if number.startswith('00'):
+        number = f'+{number[2:]}'
+    # Indicatif 237 sans le +
+    elif number.startswith('237') and len(number) == 12:
+        number = f'+{number}'
+    # Numéro local camerounais à 9 chiffres (mobile 6..., fixe 2...)
+    elif len(number) == 9 and number[0] in '26':
+        number = f'{CAMEROON_PREFIX}{number}'
+
+    return number if _E164.match(number) else ''
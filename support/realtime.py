@@ -0,0 +1,114 @@
+"""
+Diffusion des changements de tickets aux clients WebSocket (Channels).
+
+Chaque utilisateur connecté à ws/tickets/ rejoint son groupe
+(tickets.user.<id>) ; les administrateurs rejoignent aussi tickets.admin.
+Une création, modification ou suppression de ticket est envoyée, après le
+commit, au client propriétaire, à l'agent assigné et aux administrateurs ;
+l'agent à qui un ticket est retiré reçoit 'unassigned'. Le client met sa
+liste à jour sans interroger mes-tickets / tickets/agent en boucle.
+
+Les opérations en masse (support/bulk.py) publient leurs tickets en un seul
+message par groupe.
+"""
+import logging
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Ticket
+
+logger = logging.getLogger(__name__)
+
+ADMIN_GROUP = 'tickets.admin'
+ADMIN_ROLES = ('admin', 'superadmin')
+EVENT_TYPE = 'ticket.events'
+
+
+def user_group(user_id):
+    return f'tickets.user.{user_id}'
+
+
+def user_groups(user):
+    groups = [user_group(user.pk)]
+    if user.role in ADMIN_ROLES:
+        groups.append(ADMIN_GROUP)
+    return groups
+
+
+def ticket_data(ticket):
+    # Même format que les listes de tickets (TicketSerializer)
+    from .serializers import TicketSerializer
+
+    return dict(TicketSerializer(ticket).data)
+
+
+def _events_by_group(action, tickets, previous_agents):
+    by_group = defaultdict(list)
+    for ticket in tickets:
+        event = {
+            'action': action,
+            'ticket': {'id': ticket.pk} if action == 'deleted' else ticket_data(ticket),
+        }
+        groups = {ADMIN_GROUP}
+        groups.update(user_group(user_id) for user_id in (ticket.client_id, ticket.agent_id) if user_id)
+        for group in groups:
+            by_group[group].append(event)
+
+        previous_agent = previous_agents.get(ticket.pk)
+        if previous_agent and previous_agent != ticket.agent_id:
+            by_group[user_group(previous_agent)].append({'action': 'unassigned', 'ticket': {'id': ticket.pk}})
+    return by_group
+
+
+def _send(by_group):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    for group, events in by_group.items():
+        try:
+            async_to_sync(layer.group_send)(group, {'type': EVENT_TYPE, 'events': events})
+        except Exception as e:
+            # La modification est commitée : une diffusion perdue ne doit pas faire échouer la requête
+            logger.error(f"Erreur de diffusion WebSocket au groupe {group} : {e}")
+
+
+def publish(action, tickets, previous_agents=None):
+    """
+    Diffuse l'action ('created', 'updated', 'deleted') sur les tickets après le
+    commit de la transaction en cours. previous_agents : {ticket_id: agent_id}
+    avant modification, pour prévenir l'agent dessaisi.
+    """
+    if not tickets:
+        return
+    # Sérialisé tout de suite : après le commit, les instances peuvent avoir changé
+    by_group = _events_by_group(action, tickets, previous_agents or {})
+    transaction.on_commit(lambda: _send(by_group))
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_agent(sender, instance, raw=False, **kwargs):
+    # _stat_snapshot (rollup) : état en base avant l'écriture
+    snapshot = getattr(instance, '_stat_snapshot', None)
+    instance._previous_agent_id = snapshot[0] if snapshot else None
+
+
+@receiver(post_save, sender=Ticket)
+def publish_saved_ticket(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous_agent = getattr(instance, '_previous_agent_id', None)
+    publish('created' if created else 'updated', [instance], {instance.pk: previous_agent})
+
+
+@receiver(post_delete, sender=Ticket)
+def publish_deleted_ticket(sender, instance, origin=None, **kwargs):
+    # Suppression en masse (QuerySet.delete()) : publiée en un seul message par bulk.bulk_delete()
+    if isinstance(origin, QuerySet) and origin.model is Ticket:
+        return
+    publish('deleted', [instance])
@@ -0,0 +1,443 @@
+"""
+Maintenance incrémentale des cumuls TicketDailyStat et IntentCounter, du
+journal des transitions de statut TicketStatusEvent, des sketches de
+percentiles ResolutionSketch et des traces de suppression TicketTombstone.
+
+Chaque ticket contribue pour 1 à la ligne (agent, jour de création, statut)
+et, s'il est résolu, pour sa durée de résolution en secondes ; il contribue
+aussi pour 1 au compteur (titre, année, mois) et, s'il est ouvert, pour 1 à
+la charge AgentLoad de son agent. À chaque création /
+modification / suppression on retire l'ancienne contribution et on ajoute la
+nouvelle, via des UPDATE ... SET x = x + n (F()). Chaque création ou
+changement de statut ajoute une ligne au journal TicketStatusEvent. Un ticket
+résolu contribue aussi pour sa durée de résolution au sketch de l'agent / mois
+de création, retirée de la même façon que sa contribution au cumul.
+
+Les opérations en masse (QuerySet.update(), suppression de centaines de
+tickets) s'exécutent dans batch() : les contributions y sont additionnées par
+clé et écrites une seule fois à la sortie du bloc.
+"""
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from .models import (
+    OPEN_STATUTS, AgentLoad, IntentCounter, ResolutionSketch, Ticket, TicketDailyStat, TicketStatusEvent,
+    TicketTombstone, Utilisateur,
+)
+from .stats_cache import invalidate_ticket
+
+
+_batch = ContextVar('rollup_batch', default=None)
+
+
+class RollupBatch:
+    """Écritures de cumul différées, additionnées par clé."""
+
+    def __init__(self):
+        self.stats = defaultdict(lambda: [0, 0.0])
+        self.intents = Counter()
+        self.loads = Counter()
+        self.contributions = set()
+        self.sketches = defaultdict(Counter)
+        self.tombstones = []
+
+    def add_contribution(self, contribution, sign):
+        if contribution is None:
+            return
+        agent_id, jour, statut, secondes = contribution
+        totals = self.stats[agent_id, jour, statut]
+        totals[0] += sign
+        totals[1] += sign * secondes
+        agent_id = open_agent(contribution)
+        if agent_id is not None:
+            self.loads[agent_id] += sign
+        sample = sketch_sample(contribution)
+        if sample is not None:
+            key, secondes = sample
+            self.sketches[key][secondes] += sign
+
+    def add_intent(self, contribution, sign):
+        if contribution is not None:
+            self.intents[contribution] += sign
+
+    def flush(self):
+        self.flush_stats()
+        for contribution, nombre in self.intents.items():
+            if nombre:
+                apply_intent(contribution, nombre)
+        for agent_id in sorted(self.loads):
+            if self.loads[agent_id]:
+                apply_load(agent_id, self.loads[agent_id])
+        # Ordre fixe des sketches verrouillés, comme pour AgentLoad
+        for key in sorted(self.sketches, key=lambda key: (key[0] or 0, key[1], key[2])):
+            update_sketch(*key, self.sketches[key])
+        TicketTombstone.objects.bulk_create(self.tombstones)
+        invalidate_ticket(*self.contributions)
+
+    def flush_stats(self):
+        """
+        Applique les deltas TicketDailyStat en trois requêtes : lecture verrouillée
+        des lignes existantes, bulk_update, bulk_create des lignes manquantes.
+        """
+        deltas = {key: totals for key, totals in self.stats.items() if totals[0] or totals[1]}
+        if not deltas:
+            return
+        agent_ids = {agent_id for agent_id, _, _ in deltas}
+        agents = Q(agent_id__in=agent_ids - {None})
+        if None in agent_ids:
+            agents |= Q(agent__isnull=True)
+        # Ordre fixe des lignes verrouillées : pas d'interblocage entre deux lots concurrents
+        rows = TicketDailyStat.objects.select_for_update().filter(
+            agents,
+            jour__in={jour for _, jour, _ in deltas},
+            statut__in={statut for _, _, statut in deltas},
+        ).order_by('pk')
+        existing = {}
+        for row in rows:
+            existing.setdefault((row.agent_id, row.jour, row.statut), row)
+
+        updated, created = [], []
+        for key, (nombre, secondes) in deltas.items():
+            row = existing.get(key)
+            if row is None:
+                agent_id, jour, statut = key
+                created.append(TicketDailyStat(
+                    agent_id=agent_id, jour=jour, statut=statut,
+                    nombre_tickets=nombre, secondes_resolution=secondes,
+                ))
+            else:
+                row.nombre_tickets += nombre
+                row.secondes_resolution += secondes
+                updated.append(row)
+
+        TicketDailyStat.objects.bulk_update(updated, ['nombre_tickets', 'secondes_resolution'], batch_size=500)
+        try:
+            with transaction.atomic():
+                TicketDailyStat.objects.bulk_create(created, batch_size=500)
+        except IntegrityError:
+            # Lignes créées entre-temps par une requête concurrente : repli ligne par ligne
+            for row in created:
+                apply_delta(row.agent_id, row.jour, row.statut, row.nombre_tickets, row.secondes_resolution)
+
+
+@contextmanager
+def batch():
+    """
+    Regroupe les mises à jour de cumul des tickets modifiés dans le bloc.
+    Le bloc s'exécute dans une transaction ; les écritures sont faites à la sortie.
+    """
+    if _batch.get() is not None:
+        yield _batch.get()
+        return
+    with transaction.atomic():
+        current = RollupBatch()
+        token = _batch.set(current)
+        try:
+            yield current
+        finally:
+            _batch.reset(token)
+        current.flush()
+
+
+def apply_contribution(contribution, sign):
+    """Ajoute (sign=1) ou retire (sign=-1) une contribution au cumul."""
+    if contribution is None:
+        return
+    agent_id, jour, statut, secondes = contribution
+    apply_delta(agent_id, jour, statut, sign, sign * secondes)
+
+
+def apply_delta(agent_id, jour, statut, nombre, secondes):
+    """Ajoute nombre tickets et secondes de résolution à la ligne (agent, jour, statut)."""
+    rows = TicketDailyStat.objects.filter(agent_id=agent_id, jour=jour, statut=statut)
+    delta = {
+        'nombre_tickets': F('nombre_tickets') + nombre,
+        'secondes_resolution': F('secondes_resolution') + secondes,
+    }
+
+    if agent_id is None:
+        # Plusieurs lignes sans agent peuvent coexister (agent supprimé) : on n'en modifie qu'une
+        pk = rows.values_list('pk', flat=True).first()
+        if pk is not None:
+            TicketDailyStat.objects.filter(pk=pk).update(**delta)
+            return
+    elif rows.update(**delta):
+        return
+
+    try:
+        with transaction.atomic():
+            TicketDailyStat.objects.create(
+                agent_id=agent_id,
+                jour=jour,
+                statut=statut,
+                nombre_tickets=nombre,
+                secondes_resolution=secondes,
+            )
+    except IntegrityError:
+        # Ligne créée entre-temps par une requête concurrente
+        rows.update(**delta)
+
+
+def apply_intent(contribution, sign):
+    """Ajoute (sign=1) ou retire (sign=-1) un ticket au compteur d'intention."""
+    if contribution is None:
+        return
+    titre, annee, mois = contribution
+    rows = IntentCounter.objects.filter(titre=titre, annee=annee, mois=mois)
+    if rows.update(nombre_tickets=F('nombre_tickets') + sign):
+        return
+    try:
+        with transaction.atomic():
+            IntentCounter.objects.create(titre=titre, annee=annee, mois=mois, nombre_tickets=sign)
+    except IntegrityError:
+        rows.update(nombre_tickets=F('nombre_tickets') + sign)
+
+
+def open_agent(contribution):
+    """Agent dont la charge compte ce ticket (None si le ticket est clos ou sans agent)."""
+    if contribution is None or contribution[2] not in OPEN_STATUTS:
+        return None
+    return contribution[0]
+
+
+def apply_load(agent_id, delta):
+    """Ajoute delta à la charge (tickets ouverts) de l'agent."""
+    rows = AgentLoad.objects.filter(agent_id=agent_id)
+    if rows.update(tickets_ouverts=F('tickets_ouverts') + delta):
+        return
+    try:
+        with transaction.atomic():
+            AgentLoad.objects.create(agent_id=agent_id, tickets_ouverts=delta)
+    except IntegrityError:
+        rows.update(tickets_ouverts=F('tickets_ouverts') + delta)
+
+
+def record_load_change(previous, current):
+    previous_agent, current_agent = open_agent(previous), open_agent(current)
+    if previous_agent == current_agent:
+        return
+    # Ordre fixe : pas d'interblocage entre deux réaffectations croisées
+    for agent_id, delta in sorted([(previous_agent, -1), (current_agent, 1)], key=lambda item: item[0] or 0):
+        if agent_id is not None:
+            apply_load(agent_id, delta)
+
+
+def record_ticket_change(previous, current):
+    """Remplace la contribution previous par current (l'une ou l'autre peut être None)."""
+    if previous == current:
+        return
+    pending = _batch.get()
+    if pending is not None:
+        pending.add_contribution(previous, -1)
+        pending.add_contribution(current, 1)
+        return
+    with transaction.atomic():
+        apply_contribution(previous, -1)
+        apply_contribution(current, 1)
+        record_load_change(previous, current)
+        record_sketch_change(previous, current)
+
+
+def record_intent_change(previous, current):
+    if previous == current:
+        return
+    pending = _batch.get()
+    if pending is not None:
+        pending.add_intent(previous, -1)
+        pending.add_intent(current, 1)
+        return
+    with transaction.atomic():
+        apply_intent(previous, -1)
+        apply_intent(current, 1)
+
+
+def sketch_sample(contribution):
+    """((agent, année, mois de création), secondes de résolution) d'un ticket résolu, None sinon."""
+    if contribution is None or contribution[2] != 'Résolu':
+        return None
+    agent_id, jour, _, secondes = contribution
+    return (agent_id, jour.year, jour.month), secondes
+
+
+def record_sketch_change(previous, current):
+    """Remplace la durée de résolution de previous par celle de current dans les sketches."""
+    samples = defaultdict(Counter)
+    for contribution, sign in ((previous, -1), (current, 1)):
+        sample = sketch_sample(contribution)
+        if sample is not None:
+            key, secondes = sample
+            samples[key][secondes] += sign
+    for key, weights in samples.items():
+        update_sketch(*key, weights)
+
+
+def update_sketch(agent_id, annee, mois, weights):
+    """
+    Applique au sketch (agent, annee, mois) les durées de weights ({secondes: n}) :
+    ajoutées si n > 0, retirées si n < 0 ; en une lecture / écriture.
+    """
+    weights = {secondes: n for secondes, n in weights.items() if n}
+    if not weights:
+        return
+    with transaction.atomic():
+        rows = ResolutionSketch.objects.select_for_update() \
+            .filter(agent_id=agent_id, annee=annee, mois=mois)
+        row = rows.first()
+        if row is None:
+            try:
+                with transaction.atomic():
+                    row = ResolutionSketch.objects.create(agent_id=agent_id, annee=annee, mois=mois)
+            except IntegrityError:
+                row = rows.first()
+        sketch = row.load()
+        for secondes, n in weights.items():
+            if n > 0:
+                sketch.add(secondes, n)
+            else:
+                sketch.remove(secondes, -n)
+        row.store(sketch)
+        row.save(update_fields=['sketch'])
+
+
+def _status_event(ticket, previous_statut, last_events):
+    """
+    Événement previous_statut -> ticket.statut ; last_events : les deux derniers
+    événements du ticket (date_evenement, statut_precedent), du plus récent au plus ancien.
+    """
+    # Passage à 'Résolu' : date figée sur le ticket, la durée du journal est celle des statistiques
+    if ticket.statut == 'Résolu' and ticket.date_resolution:
+        moment = ticket.date_resolution
+    else:
+        moment = ticket.date_modification or now()
+    depuis = last_events[0][0] if last_events else ticket.date_creation
+
+    return TicketStatusEvent(
+        ticket=ticket,
+        agent_id=ticket.agent_id,
+        statut_precedent=previous_statut,
+        statut=ticket.statut,
+        date_evenement=moment,
+        duree_statut_precedent=(moment - depuis).total_seconds() if previous_statut else 0,
+        duree_depuis_creation=(moment - ticket.date_creation).total_seconds(),
+        # Les tickets antérieurs au journal (sans événement de création) ne comptent pas
+        premiere_reponse=(
+            previous_statut is not None
+            and len(last_events) == 1 and last_events[0][1] is None
+        ),
+    )
+
+
+def record_status_event(ticket, previous_statut):
+    """Ajoute la transition previous_statut -> ticket.statut au journal."""
+    # Deux derniers événements : date du dernier, et s'il s'agit seulement de la création
+    last_events = list(
+        ticket.status_events.order_by('-date_evenement', '-id')
+        .values_list('date_evenement', 'statut_precedent')[:2]
+    )
+    _status_event(ticket, previous_statut, last_events).save()
+
+
+def record_status_events(changes):
+    """
+    Version ensembliste de record_status_event pour une liste de
+    (ticket, previous_statut) : une lecture de l'historique et un bulk_create.
+    """
+    if not changes:
+        return
+    last_events = defaultdict(list)
+    history = TicketStatusEvent.objects.filter(ticket_id__in=[ticket.pk for ticket, _ in changes]) \
+        .order_by('ticket_id', '-date_evenement', '-id') \
+        .values_list('ticket_id', 'date_evenement', 'statut_precedent')
+    for ticket_id, date_evenement, statut_precedent in history:
+        if len(last_events[ticket_id]) < 2:
+            last_events[ticket_id].append((date_evenement, statut_precedent))
+
+    events = [_status_event(ticket, previous, last_events[ticket.pk]) for ticket, previous in changes]
+    TicketStatusEvent.objects.bulk_create(events)
+
+
+def record_tombstone(tombstone):
+    pending = _batch.get()
+    if pending is None:
+        tombstone.save()
+    else:
+        pending.tombstones.append(tombstone)
+
+
+def record_reassignment(ticket, previous_agent_id):
+    """Trace du retrait du ticket du périmètre de son ancien agent (synchronisation de l'agent)."""
+    if previous_agent_id is not None and previous_agent_id != ticket.agent_id:
+        record_tombstone(TicketTombstone(ticket_id=ticket.pk, agent_id=previous_agent_id, motif='reaffectation'))
+
+
+def invalidate(*contributions):
+    """invalidate_ticket(), regroupé à la sortie de batch() s'il est actif."""
+    pending = _batch.get()
+    if pending is None:
+        invalidate_ticket(*contributions)
+    else:
+        pending.contributions.update(c for c in contributions if c is not None)
+
+
+@receiver(pre_save, sender=Ticket)
+def snapshot_ticket_stats(sender, instance, raw=False, **kwargs):
+    # Instance construite hors from_db() (ou chargée partiellement) : on relit l'état en base
+    if raw or instance.pk is None or hasattr(instance, '_stat_snapshot'):
+        return
+    stored = Ticket.objects.filter(pk=instance.pk).first()
+    instance._stat_snapshot = stored.stat_contribution() if stored else None
+    instance._intent_snapshot = stored.intent_contribution() if stored else None
+
+
+@receiver(post_save, sender=Ticket)
+def update_ticket_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_stat_snapshot', None)
+    current = instance.stat_contribution()
+
+    if created:
+        record_status_event(instance, None)
+    elif previous is not None and previous[2] != instance.statut:
+        record_status_event(instance, previous[2])
+    if previous is not None:
+        record_reassignment(instance, previous[0])
+
+    record_ticket_change(previous, current)
+    invalidate(previous, current)
+    instance._stat_snapshot = current
+
+    previous_intent = None if created else getattr(instance, '_intent_snapshot', None)
+    current_intent = instance.intent_contribution()
+    record_intent_change(previous_intent, current_intent)
+    instance._intent_snapshot = current_intent
+
+
+@receiver(post_delete, sender=Ticket)
+def remove_ticket_stats(sender, instance, **kwargs):
+    previous = getattr(instance, '_stat_snapshot', None) or instance.stat_contribution()
+    record_ticket_change(previous, None)
+    invalidate(previous)
+    record_intent_change(getattr(instance, '_intent_snapshot', None) or instance.intent_contribution(), None)
+    record_tombstone(TicketTombstone(
+        ticket_id=instance.pk,
+        client_id=instance.client_id,
+        agent_id=instance.agent_id,
+    ))
+
+
+@receiver(post_save, sender=Utilisateur)
+def create_agent_load(sender, instance, created, raw=False, **kwargs):
+    # Un nouvel agent (ou un utilisateur promu agent) entre dans l'assignation avec sa charge réelle
+    if raw or instance.role != 'agent':
+        return
+    if not AgentLoad.objects.filter(agent_id=instance.pk).exists():
+        ouverts = Ticket.objects.filter(agent_id=instance.pk, statut__in=OPEN_STATUTS).count()
+        AgentLoad.objects.get_or_create(agent_id=instance.pk, defaults={'tickets_ouverts': ouverts})
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import TicketConsumer
+
+websocket_urlpatterns = [
+    path('ws/tickets/', TicketConsumer.as_asgi()),
+]
@@ -0,0 +1,179 @@
+"""
+Recherche plein texte des tickets (titre, description et contenu des messages).
+
+- PostgreSQL : colonne Ticket.search_vector (tsvector pondéré A/B/C, config
+  'french') avec un index GIN, classement par ts_rank.
+- SQLite (dev / tests) : table virtuelle FTS5 support_ticket_fts dont le rowid
+  est l'id du ticket, classement par bm25.
+- Autres bases : repli sur des icontains (sans index), classés par date.
+
+L'index est tenu à jour ticket par ticket depuis les signaux de Ticket et de
+Message ; la commande rebuild_search_index le reconstruit entièrement.
+"""
+import re
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Message, Ticket
+
+SEARCH_CONFIG = 'french'
+FTS_TABLE = 'support_ticket_fts'
+# Poids bm25 (FTS5) des colonnes titre, description, messages
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def backend():
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite' and _fts_available():
+        return 'fts5'
+    return 'basic'
+
+
+@lru_cache(maxsize=None)
+def _fts_available():
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def _search_vector():
+    from django.contrib.postgres.aggregates import StringAgg
+    from django.contrib.postgres.search import SearchVector
+
+    messages = Message.objects.filter(ticket=OuterRef('pk')).order_by() \
+        .values('ticket').annotate(contenu=StringAgg('contenu', ' ')).values('contenu')
+    return (
+        SearchVector('titre', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(
+            Coalesce(Subquery(messages, output_field=TextField()), Value('')),
+            weight='C', config=SEARCH_CONFIG,
+        )
+    )
+
+
+def _fts_insert_sql(where=''):
+    return (
+        f"INSERT INTO {FTS_TABLE} (rowid, titre, description, messages) "
+        f"SELECT t.id, t.titre, t.description, "
+        f"COALESCE((SELECT group_concat(m.contenu, ' ') FROM {Message._meta.db_table} m "
+        f"WHERE m.ticket_id = t.id), '') "
+        f"FROM {Ticket._meta.db_table} t {where}"
+    )
+
+
+def index_ticket(ticket_id):
+    """Recalcule le document de recherche d'un ticket (une ou deux requêtes)."""
+    index_tickets([ticket_id])
+
+
+def index_tickets(ticket_ids):
+    """Recalcule les documents de recherche d'un lot de tickets, en une ou deux requêtes."""
+    ticket_ids = list(ticket_ids)
+    if not ticket_ids:
+        return
+    engine = backend()
+    if engine == 'postgresql':
+        Ticket.objects.filter(pk__in=ticket_ids).update(search_vector=_search_vector())
+    elif engine == 'fts5':
+        placeholders = ', '.join(['%s'] * len(ticket_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", ticket_ids)
+            cursor.execute(_fts_insert_sql(f'WHERE t.id IN ({placeholders})'), ticket_ids)
+
+
+def unindex_ticket(ticket_id):
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [ticket_id])
+
+
+def rebuild_index():
+    """Reconstruit l'index de tous les tickets, en une requête ensembliste."""
+    engine = backend()
+    if engine == 'postgresql':
+        return Ticket.objects.update(search_vector=_search_vector())
+    if engine == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(_fts_insert_sql())
+            return cursor.rowcount
+    return 0
+
+
+def _fts_query(terms):
+    # Chaque mot entre guillemets : la syntaxe FTS5 (AND, NEAR, *, ...) n'est pas exposée
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def search_ticket_ids(tickets, query, offset, limit):
+    """
+    Ids des tickets de `tickets` (queryset déjà restreint au périmètre de
+    l'utilisateur) correspondant à `query`, du plus pertinent au moins
+    pertinent, tranche [offset, offset + limit[.
+    """
+    terms = _WORD.findall(query)
+    if not terms:
+        return []
+
+    engine = backend()
+    if engine == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return list(
+            tickets.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-id')
+            .values_list('id', flat=True)[offset:offset + limit]
+        )
+
+    if engine == 'fts5':
+        scope_sql, scope_params = tickets.order_by().values('id').query.sql_with_params()
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({scope_sql}) "
+                f"ORDER BY bm25({FTS_TABLE}, {weights}), rowid DESC "
+                f"LIMIT %s OFFSET %s",
+                [_fts_query(terms), *scope_params, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(titre__icontains=term) | Q(description__icontains=term) | Q(message__contenu__icontains=term)
+    return list(
+        tickets.filter(id__in=Ticket.objects.filter(condition).values('id'))
+        .order_by('-date_creation', '-id')
+        .values_list('id', flat=True)[offset:offset + limit]
+    )
+
+
+@receiver(post_save, sender=Ticket)
+def index_saved_ticket(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created or update_fields is None or {'titre', 'description'} & set(update_fields):
+        index_ticket(instance.pk)
+
+
+@receiver(post_delete, sender=Ticket)
+def unindex_deleted_ticket(sender, instance, **kwargs):
+    unindex_ticket(instance.pk)
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def index_message_ticket(sender, instance, raw=False, origin=None, **kwargs):
+    # Messages supprimés en cascade avec leur ticket : rien à réindexer
+    if raw or getattr(origin, 'model', type(origin)) is Ticket:
+        return
+    index_ticket(instance.ticket_id)
@@ -35,7 +35,8 @@ class UtilisateurSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Utilisateur
-        fields = ['id', 'email', 'nom', 'password', 'telephone', 'role']
+        fields = ['id', 'email', 'nom', 'password', 'telephone', 'telephone_e164', 'role']
+        read_only_fields = ['telephone_e164']
         extra_kwargs = {
             'password': {'write_only': True, 'required': False}  # ← important ici
         }
@@ -52,6 +53,7 @@ class UtilisateurSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+from django.db.models import F
 from rest_framework import serializers
 from .models import Ticket
 
@@ -67,6 +69,45 @@ class TicketSerializer(serializers.ModelSerializer):
         return obj.agent.nom if obj.agent else None
 
 
+class TicketBatchItemSerializer(serializers.Serializer):
+    """Un ticket du lot envoyé par le chatbot (POST /api/tickets/create/batch/)."""
+    titre = serializers.CharField(max_length=255)
+    description = serializers.CharField()
+
+
+# Colonnes lues par le chemin de lecture rapide des listes de tickets
+TICKET_LIST_FIELDS = ['id', 'titre', 'description', 'statut', 'date_creation', 'date_modification']
+
+
+def ticket_list_values(queryset):
+    """
+    Restreint un queryset de tickets aux colonnes sérialisées, plus le nom de
+    l'agent via un JOIN : une seule requête, quelle que soit la taille de la liste.
+    """
+    return queryset.values(*TICKET_LIST_FIELDS, agent_nom=F('agent__nom'))
+
+
+def ticket_list_data(rows):
+    """
+    Sérialise des lignes de ticket_list_values() en dicts simples.
+    Sortie identique à TicketSerializer(many=True).data, sans instancier de
+    modèles ni exécuter la mécanique des champs du ModelSerializer par ligne.
+    """
+    to_datetime = serializers.DateTimeField().to_representation
+    return [
+        {
+            'id': row['id'],
+            'titre': row['titre'],
+            'description': row['description'],
+            'statut': row['statut'],
+            'agent_nom': row['agent_nom'],
+            'date_creation': to_datetime(row['date_creation']) if row['date_creation'] else None,
+            'date_modification': to_datetime(row['date_modification']) if row['date_modification'] else None,
+        }
+        for row in rows
+    ]
+
+
 class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
@@ -0,0 +1,118 @@
+"""
+DDSketch minimal (Masson et al., 2019) pour les percentiles de durée de résolution.
+
+Les valeurs sont rangées dans des seaux logarithmiques de raison
+gamma = (1 + a) / (1 - a) : tout percentile est estimé avec une erreur
+relative d'au plus `a`. Deux sketches de même précision se fusionnent en
+additionnant leurs seaux, ce qui permet de passer d'un agent / mois à une
+équipe / année sans relire les tickets. La taille est bornée par max_bins.
+"""
+import math
+import struct
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BINS = 2048
+MIN_VALUE = 1e-9  # en dessous, la valeur est comptée comme nulle
+
+_HEADER = struct.Struct('<dIQ')  # précision relative, nombre de seaux, compteur des zéros
+_BIN = struct.Struct('<iI')  # index du seau, effectif
+
+
+class DDSketch:
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY, max_bins=DEFAULT_MAX_BINS):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.bins.values())
+
+    def _index(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index):
+        # Milieu (au sens de l'erreur relative) du seau ]gamma^(i-1), gamma^i]
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value, weight=1):
+        """Ajoute une valeur (en O(1), hors compaction)."""
+        if value < MIN_VALUE:
+            self.zero_count += weight
+            return
+        index = self._index(value)
+        self.bins[index] = self.bins.get(index, 0) + weight
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def remove(self, value, weight=1):
+        """
+        Retire une valeur ajoutée auparavant. Si son seau a été fusionné par
+        _collapse(), elle est retirée du seau qui l'a absorbé (le plus proche au-dessus).
+        """
+        if value < MIN_VALUE:
+            self.zero_count = max(self.zero_count - weight, 0)
+            return
+        index = self._index(value)
+        if index not in self.bins:
+            index = min((i for i in self.bins if i > index), default=None)
+            if index is None:
+                return
+        self.bins[index] -= weight
+        if self.bins[index] <= 0:
+            del self.bins[index]
+
+    def _collapse(self):
+        # Fusionne les seaux les plus bas : seule la précision des petits percentiles se dégrade
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.bins[target] += self.bins.pop(index)
+
+    def merge(self, other):
+        """Fusionne other dans ce sketch (même précision relative requise)."""
+        if not math.isclose(other.relative_accuracy, self.relative_accuracy):
+            raise ValueError("Impossible de fusionner des sketches de précisions différentes.")
+        self.zero_count += other.zero_count
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        return self
+
+    def quantile(self, q):
+        """Estimation du quantile q (0 <= q <= 1), None si le sketch est vide."""
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.bins))
+
+    def to_bytes(self):
+        parts = [_HEADER.pack(self.relative_accuracy, len(self.bins), self.zero_count)]
+        parts.extend(_BIN.pack(index, count) for index, count in sorted(self.bins.items()))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data, max_bins=DEFAULT_MAX_BINS):
+        data = bytes(data)
+        relative_accuracy, nb_bins, zero_count = _HEADER.unpack_from(data)
+        sketch = cls(relative_accuracy, max_bins)
+        sketch.zero_count = zero_count
+        offset = _HEADER.size
+        for _ in range(nb_bins):
+            index, count = _BIN.unpack_from(data, offset)
+            sketch.bins[index] = count
+            offset += _BIN.size
+        return sketch
@@ -0,0 +1,182 @@
+"""
+Envoi des SMS par backend interchangeable (settings.SMS_BACKEND), sur le
+modèle des backends email de Django :
+
+- TwilioSmsBackend : envoi réel via l'API Twilio ;
+- LocmemSmsBackend : SMS conservés en mémoire (LocmemSmsBackend.outbox), pour les tests.
+
+send() lève une exception en cas d'échec : c'est l'appelant (worker de
+l'outbox) qui décide de réessayer.
+
+Le backend est instancié une fois par processus (get_sms_backend()) : le client
+Twilio et sa session HTTP (connexions keep-alive) sont réutilisés d'un SMS à
+l'autre. SmsDispatcher envoie un lot de SMS en parallèle (nombre d'envois
+simultanés borné), sous la limite de débit du fournisseur, et réessaie les
+erreurs transitoires (429, 5xx, réseau).
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCY = 4
+MAX_RETRIES = 2
+RETRY_DELAY = 1.0
+
+
+class BaseSmsBackend:
+    # Débit maximal accepté par le fournisseur (SMS/s) ; None : pas de limite
+    rate_limit = None
+
+    def send(self, to_number, message):
+        raise NotImplementedError
+
+    def is_retryable(self, error):
+        """Vrai si l'erreur est transitoire et l'envoi peut être réessayé tout de suite."""
+        return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class TwilioSmsBackend(BaseSmsBackend):
+    # Limite par défaut d'un numéro long Twilio
+    rate_limit = 1
+
+    def __init__(self):
+        self.account_sid = os.environ.get("TWILIO_ACCOUNT_SID")
+        self.auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
+        self.from_number = os.environ.get("TWILIO_PHONE_NUMBER")
+        self.rate_limit = getattr(settings, 'SMS_RATE_LIMIT', None) or self.rate_limit
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Client et session HTTP créés au premier envoi, puis partagés
+        with self._lock:
+            if self._client is None:
+                from twilio.http.http_client import TwilioHttpClient
+                from twilio.rest import Client
+
+                self._client = Client(
+                    self.account_sid, self.auth_token,
+                    http_client=TwilioHttpClient(pool_connections=True, timeout=10),
+                )
+            return self._client
+
+    def send(self, to_number, message):
+        if not (self.account_sid and self.auth_token and self.from_number):
+            raise ImproperlyConfigured("Configuration Twilio manquante")
+        self.client.messages.create(
+            body=message,
+            from_=self.from_number,
+            to=to_number,
+        )
+
+    def is_retryable(self, error):
+        from requests import RequestException
+        from twilio.base.exceptions import TwilioRestException
+
+        if isinstance(error, TwilioRestException):
+            return error.status == 429 or error.status >= 500
+        return isinstance(error, RequestException) or super().is_retryable(error)
+
+
+class LocmemSmsBackend(BaseSmsBackend):
+    outbox = []
+
+    def send(self, to_number, message):
+        LocmemSmsBackend.outbox.append((to_number, message))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_sms_backend():
+    """Backend SMS partagé par le processus."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(getattr(settings, 'SMS_BACKEND', 'support.sms.TwilioSmsBackend'))()
+        return _backend
+
+
+@receiver(setting_changed)
+def reset_sms_backend(sender, setting, **kwargs):
+    global _backend
+    if setting in ('SMS_BACKEND', 'SMS_RATE_LIMIT'):
+        _backend = None
+
+
+class RateLimiter:
+    """
+    Seau à jetons : au plus `rate` acquisitions par seconde, tous threads du
+    processus confondus (chaque worker a sa propre limite).
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            moment = time.monotonic()
+            slot = max(self.next_slot, moment)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - moment))
+
+
+class SmsDispatcher:
+    """
+    Envoi de lots de SMS : au plus `concurrency` envois simultanés, débit
+    limité à backend.rate_limit, erreurs transitoires réessayées
+    `max_retries` fois (délai RETRY_DELAY doublé à chaque tentative).
+    """
+
+    def __init__(self, backend=None, concurrency=CONCURRENCY, max_retries=MAX_RETRIES):
+        self.backend = backend or get_sms_backend()
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(self.backend.rate_limit)
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='sms')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    def _send(self, to_number, message):
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                self.backend.send(to_number, message)
+                return None
+            except Exception as e:
+                if attempt == self.max_retries or not self.backend.is_retryable(e):
+                    return e
+                logger.warning("Erreur transitoire d'envoi de SMS à %s (%s), nouvelle tentative", to_number, e)
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+
+    def submit(self, messages):
+        """
+        Lance l'envoi des SMS [(numéro, texte), ...] sans attendre. Retourne un
+        itérateur donnant, dans l'ordre, None (envoyé) ou l'exception levée.
+        """
+        return self.pool.map(lambda item: self._send(*item), messages)
+
+    def send(self, messages):
+        return list(self.submit(messages))
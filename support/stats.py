@@ -0,0 +1,295 @@
+from datetime import datetime
+
+from django.db.models import (
+    Case, Count, DurationField, ExpressionWrapper, F, IntegerField, Max, Min, Q, Sum, When,
+)
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+from django.utils.timezone import make_aware
+
+from .models import IntentCounter, TicketDailyStat, TicketStatusEvent
+from .sketch import DDSketch
+
+# Compteurs par statut exposés par les tableaux de bord (clé de réponse -> statut)
+STATUT_COUNTS = {
+    'en_cours': 'En cours',
+    'resolus': 'Résolu',
+    'rejetes': 'Rejeté',
+}
+
+
+def resolution_rate(resolved, total):
+    """Pourcentage de tickets résolus, arrondi à 2 décimales (0 si aucun ticket)."""
+    return round((resolved / total) * 100, 2) if total else 0
+
+
+def average_hours(seconds, count):
+    """Durée moyenne en heures arrondie à 2 décimales (0 si aucun ticket)."""
+    return round(seconds / count / 3600, 2) if count else 0
+
+
+def status_aggregates():
+    """
+    Agrégats conditionnels sur le cumul TicketDailyStat : total + une somme
+    filtrée par statut, et la somme des durées de résolution des tickets résolus.
+    """
+    aggregates = {'total': Coalesce(Sum('nombre_tickets'), 0)}
+    for key, statut in STATUT_COUNTS.items():
+        aggregates[key] = Coalesce(Sum('nombre_tickets', filter=Q(statut=statut)), 0)
+    aggregates['secondes_resolution'] = Coalesce(
+        Sum('secondes_resolution', filter=Q(statut='Résolu')), 0.0
+    )
+    return aggregates
+
+
+def ticket_counts_by_month(stats, year):
+    """
+    Calcule en une seule requête GROUP BY sur le cumul TicketDailyStat :
+    - les compteurs globaux (total, en_cours, resolus, rejetes) sur tout le queryset ;
+    - les compteurs par mois de création pour l'année donnée.
+
+    Les jours hors de l'année sont regroupés sous month=NULL : ils comptent
+    dans les totaux mais pas dans la série mensuelle.
+
+    Retourne (totaux, mois) où mois est un dict {1..12: compteurs}.
+    """
+    year = int(year)
+    rows = stats.annotate(
+        month=Case(
+            When(jour__year=year, then=ExtractMonth('jour')),
+            default=None,
+            output_field=IntegerField(),
+        )
+    ).order_by().values('month').annotate(**status_aggregates())
+
+    empty = {key: 0 for key in status_aggregates()}
+    totals = dict(empty)
+    months = {month: dict(empty) for month in range(1, 13)}
+
+    for row in rows:
+        month = row.pop('month')
+        for key, value in row.items():
+            totals[key] += value
+        if month is not None:
+            months[month] = row
+
+    return totals, months
+
+
+def agent_dashboard_data(agent, year):
+    """Données du tableau de bord agent (compteurs + taux de résolution mensuel)."""
+    totals, months = ticket_counts_by_month(agent.daily_stats.all(), year)
+
+    monthly_stats = []
+    for month in range(1, 13):
+        resolved_count = months[month]['resolus']
+        total_count = months[month]['total']
+        monthly_stats.append({
+            'month': month,
+            'resolved': resolved_count,
+            'total': total_count,
+            'resolution_rate': resolution_rate(resolved_count, total_count)
+        })
+
+    return {
+        'total_tickets': totals['total'],
+        'en_cours': totals['en_cours'],
+        'resolus': totals['resolus'],
+        'rejetes': totals['rejetes'],
+        'monthly_resolution_rate': monthly_stats
+    }
+
+
+# Durée de résolution : du passage à 'Résolu' (figé à la transition) à la création
+RESOLUTION_DURATION = ExpressionWrapper(
+    F('date_resolution') - F('date_creation'),
+    output_field=DurationField(),
+)
+
+# Percentiles exposés (clé de réponse -> fraction), lus sur les sketches ResolutionSketch
+RESOLUTION_PERCENTILES = {
+    'median': 0.5,
+    'p90': 0.9,
+    'p99': 0.99,
+}
+
+
+def hours(duration):
+    """Convertit un timedelta en heures arrondies à 2 décimales (0 si vide)."""
+    return round(duration.total_seconds() / 3600, 2) if duration else 0
+
+
+def resolution_time_distribution(tickets, by_month=False):
+    """
+    Durées de résolution minimale et maximale des tickets résolus, calculées
+    côté base. Elles ne se déduisent pas de sommes : elles sont lues sur Ticket,
+    la moyenne vient du cumul TicketDailyStat et les percentiles des sketches.
+
+    Sans by_month : retourne un dict en heures.
+    Avec by_month : retourne {1..12: dict} groupé par mois de création.
+    """
+    resolved = tickets.filter(statut='Résolu')
+    aggregates = {
+        'min': Min(RESOLUTION_DURATION),
+        'max': Max(RESOLUTION_DURATION),
+    }
+
+    def to_hours(row):
+        return {f'{key}_resolution_time': hours(row.get(key)) for key in aggregates}
+
+    if not by_month:
+        return to_hours(resolved.aggregate(**aggregates))
+
+    rows = resolved.annotate(month=ExtractMonth('date_creation')) \
+        .order_by().values('month').annotate(**aggregates)
+
+    months = {month: to_hours({}) for month in range(1, 13)}
+    for row in rows:
+        months[row.pop('month')] = to_hours(row)
+    return months
+
+
+def sketch_percentiles(sketch):
+    """Percentiles (en heures) d'un DDSketch de durées en secondes."""
+    return {
+        f'{key}_resolution_time': round((sketch.quantile(fraction) or 0) / 3600, 2)
+        for key, fraction in RESOLUTION_PERCENTILES.items()
+    }
+
+
+def resolution_percentiles(sketches, by_month=False):
+    """
+    Fusionne les sketches ResolutionSketch du queryset (par exemple tous les
+    agents d'une année) et retourne leurs percentiles en heures.
+    Avec by_month : retourne {1..12: dict} en fusionnant mois par mois.
+    """
+    if not by_month:
+        merged = DDSketch()
+        for row in sketches:
+            merged.merge(row.load())
+        return sketch_percentiles(merged)
+
+    merged = {month: DDSketch() for month in range(1, 13)}
+    for row in sketches:
+        merged[row.mois].merge(row.load())
+    return {month: sketch_percentiles(merged[month]) for month in range(1, 13)}
+
+
+def previous_period(year, month):
+    """Retourne (année, mois) du mois précédent."""
+    return (year, month - 1) if month > 1 else (year - 1, 12)
+
+
+def empty_agent_stats():
+    return {
+        'total': 0,
+        'en_cours': 0,
+        'resolus': 0,
+        'rejetes': 0,
+        'taux_resolution': 0,
+        'temps_moyen_resolution': 0
+    }
+
+
+def agents_period_stats(periods, agent_ids=None):
+    """
+    Statistiques mensuelles de tous les agents pour plusieurs périodes, en une
+    seule requête GROUP BY (agent_id, année, mois) sur le cumul TicketDailyStat.
+
+    periods : liste de (année, mois)
+    Retourne {(année, mois): {agent_id: stats}} ; les agents sans ticket sur
+    une période en sont absents (voir empty_agent_stats()).
+    """
+    period_filter = Q()
+    for year, month in periods:
+        period_filter |= Q(jour__year=year, jour__month=month)
+
+    daily_stats = TicketDailyStat.objects.filter(period_filter, agent__isnull=False)
+    if agent_ids is not None:
+        daily_stats = daily_stats.filter(agent_id__in=agent_ids)
+
+    rows = daily_stats.annotate(
+        year=ExtractYear('jour'),
+        month=ExtractMonth('jour'),
+    ).order_by().values('agent_id', 'year', 'month').annotate(**status_aggregates())
+
+    stats = {period: {} for period in periods}
+    for row in rows:
+        stats[(row['year'], row['month'])][row['agent_id']] = {
+            'total': row['total'],
+            'en_cours': row['en_cours'],
+            'resolus': row['resolus'],
+            'rejetes': row['rejetes'],
+            'taux_resolution': resolution_rate(row['resolus'], row['total']),
+            'temps_moyen_resolution': average_hours(row['secondes_resolution'], row['resolus'])
+        }
+    return stats
+
+
+def top_intents(year, top=None, month=None):
+    """
+    Intentions (titres) les plus fréquentes de l'année, lues sur IntentCounter.
+    Retourne [{'titre': ..., 'count': ...}] trié par fréquence décroissante.
+    """
+    counters = IntentCounter.objects.filter(annee=year, nombre_tickets__gt=0)
+    if month is not None:
+        counters = counters.filter(mois=month)
+    rows = counters.values('titre').annotate(count=Sum('nombre_tickets')).order_by('-count', 'titre')
+    if top:
+        rows = rows[:top]
+    return list(rows)
+
+
+def monthly_top_intents(year, top=None):
+    """Top des intentions pour chaque mois de l'année, en une requête."""
+    rows = IntentCounter.objects.filter(annee=year, nombre_tickets__gt=0) \
+        .order_by('mois', '-nombre_tickets', 'titre') \
+        .values_list('mois', 'titre', 'nombre_tickets')
+
+    months = {month: [] for month in range(1, 13)}
+    for month, titre, count in rows:
+        if not top or len(months[month]) < top:
+            months[month].append({'titre': titre, 'count': count})
+    return [{'month': month, 'intents': months[month]} for month in range(1, 13)]
+
+
+def period_bounds(year, month=None):
+    """Bornes [début, fin[ d'une année ou d'un mois, pour filtrer par plage indexée."""
+    if month is None:
+        return make_aware(datetime(year, 1, 1)), make_aware(datetime(year + 1, 1, 1))
+    end_year, end_month = (year, month + 1) if month < 12 else (year + 1, 1)
+    return make_aware(datetime(year, month, 1)), make_aware(datetime(end_year, end_month, 1))
+
+
+def status_flow_metrics(year, month=None, agent_id=None):
+    """
+    Métriques issues du journal TicketStatusEvent pour les transitions de la
+    période (en heures) :
+    - temps moyen de première réponse (création -> première transition) ;
+    - temps moyen de résolution (création -> passage à 'Résolu') ;
+    - temps moyen passé dans chaque statut avant d'en sortir.
+    """
+    start, end = period_bounds(year, month)
+    events = TicketStatusEvent.objects.filter(date_evenement__gte=start, date_evenement__lt=end)
+    if agent_id is not None:
+        events = events.filter(agent_id=agent_id)
+
+    averages = events.aggregate(
+        first_responses=Count('id', filter=Q(premiere_reponse=True)),
+        first_response_seconds=Coalesce(Sum('duree_depuis_creation', filter=Q(premiere_reponse=True)), 0.0),
+        resolutions=Count('id', filter=Q(statut='Résolu')),
+        resolution_seconds=Coalesce(Sum('duree_depuis_creation', filter=Q(statut='Résolu')), 0.0),
+    )
+
+    time_in_state = events.filter(statut_precedent__isnull=False).order_by() \
+        .values('statut_precedent').annotate(count=Count('id'), seconds=Sum('duree_statut_precedent'))
+
+    return {
+        'average_first_response_time': average_hours(
+            averages['first_response_seconds'], averages['first_responses']
+        ),
+        'average_time_to_resolve': average_hours(averages['resolution_seconds'], averages['resolutions']),
+        'average_time_in_state': {
+            row['statut_precedent']: average_hours(row['seconds'], row['count'])
+            for row in time_in_state
+        },
+    }
@@ -0,0 +1,177 @@
+"""
+Cache versionné des endpoints de statistiques.
+
+Chaque réponse est stockée sous une clé qui inclut le numéro de génération de
+chacun de ses périmètres (agent, mois, année, liste des agents). Une écriture
+sur un ticket incrémente la génération des périmètres touchés : les anciennes
+entrées ne sont plus jamais lues, sans balayage. Toutes les entrées ont une
+durée de vie finie (STATS_CACHE_TIMEOUT, ou STATS_CACHE_PAST_TIMEOUT pour les
+périodes écoulées) : celles rendues orphelines par une génération sont libérées
+à leur expiration.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.timezone import localdate
+from rest_framework.response import Response
+
+from .conditional import conditional_response, make_etag
+from .models import Utilisateur
+
+KEY_PREFIX = 'stats'
+AGENTS_SCOPE = 'agents'
+CACHED_ENDPOINTS = ['agent_dashboard', 'admin_agent_stats', 'admin_global_stats', 'agents_report']
+
+
+def agent_scope(agent_id):
+    return f'agent:{agent_id}'
+
+
+def period_scope(year, month):
+    return f'period:{int(year)}-{int(month)}'
+
+
+def year_scope(year):
+    return f'year:{int(year)}'
+
+
+def _generation_key(scope):
+    return f'{KEY_PREFIX}:gen:{scope}'
+
+
+def _generations(scopes):
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Une génération évincée repart d'une valeur horodatée, jamais d'une valeur déjà utilisée
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def generation(scope):
+    """Génération courante d'un périmètre (change à chaque bump())."""
+    return _generations([scope])[0]
+
+
+def bump(*scopes):
+    """Invalide toutes les entrées des périmètres donnés."""
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+def _count(endpoint, outcome):
+    key = f'{KEY_PREFIX}:{outcome}:{endpoint}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def is_past_period(year, month=None):
+    """Vrai si l'année (ou le mois) est entièrement écoulé(e)."""
+    today = localdate()
+    if month is None:
+        return int(year) < today.year
+    return (int(year), int(month)) < (today.year, today.month)
+
+
+def _data_key(endpoint, params, scopes):
+    generations = _generations(scopes)
+    raw_key = repr((endpoint, sorted(params.items()), list(zip(scopes, generations))))
+    return f'{KEY_PREFIX}:data:{endpoint}:{hashlib.md5(raw_key.encode()).hexdigest()}'
+
+
+def get_or_compute(endpoint, params, scopes, compute, past=False):
+    """
+    Retourne la réponse en cache pour (endpoint, params) ou la calcule.
+
+    Les périodes passées sont conservées settings.STATS_CACHE_PAST_TIMEOUT
+    secondes ; les autres expirent après settings.STATS_CACHE_TIMEOUT secondes.
+    """
+    return _get_or_compute(endpoint, _data_key(endpoint, params, scopes), compute, past)
+
+
+def _get_or_compute(endpoint, key, compute, past):
+    data = cache.get(key)
+    if data is not None:
+        _count(endpoint, 'hits')
+        return data
+
+    _count(endpoint, 'misses')
+    data = compute()
+    if past:
+        timeout = getattr(settings, 'STATS_CACHE_PAST_TIMEOUT', 86400)
+    else:
+        timeout = getattr(settings, 'STATS_CACHE_TIMEOUT', 300)
+    cache.set(key, data, timeout=timeout)
+    return data
+
+
+def cached_response(request, endpoint, params, scopes, compute, past=False):
+    """
+    Réponse DRF mise en cache, avec un ETag dérivé de la clé versionnée : tant
+    qu'aucune génération n'a changé, un If-None-Match identique reçoit un 304
+    sans lecture du cache ni calcul.
+    """
+    key = _data_key(endpoint, params, scopes)
+    return conditional_response(
+        request,
+        make_etag(key),
+        lambda: Response(_get_or_compute(endpoint, key, compute, past)),
+    )
+
+
+def counters():
+    """Compteurs hits / misses par endpoint."""
+    keys = [
+        f'{KEY_PREFIX}:{outcome}:{endpoint}'
+        for endpoint in CACHED_ENDPOINTS for outcome in ('hits', 'misses')
+    ]
+    values = cache.get_many(keys)
+    return {
+        endpoint: {
+            outcome: values.get(f'{KEY_PREFIX}:{outcome}:{endpoint}', 0)
+            for outcome in ('hits', 'misses')
+        }
+        for endpoint in CACHED_ENDPOINTS
+    }
+
+
+def invalidate_ticket(*contributions):
+    """
+    Invalide les périmètres touchés par un ticket, à partir de ses contributions
+    (agent_id, jour, statut, secondes) avant et après écriture.
+    Exécuté après le commit pour ne pas laisser recalculer une version non commitée.
+    """
+    scopes = set()
+    for contribution in contributions:
+        if contribution is None:
+            continue
+        agent_id, jour = contribution[:2]
+        if agent_id is not None:
+            scopes.add(agent_scope(agent_id))
+        scopes.add(period_scope(jour.year, jour.month))
+        scopes.add(year_scope(jour.year))
+    if scopes:
+        transaction.on_commit(lambda: bump(*sorted(scopes)))
+
+
+@receiver(post_save, sender=Utilisateur)
+@receiver(post_delete, sender=Utilisateur)
+def invalidate_agents(sender, instance, raw=False, **kwargs):
+    # Nom, email et nombre d'agents apparaissent dans les statistiques admin
+    if not raw and instance.role == 'agent':
+        scopes = (AGENTS_SCOPE, agent_scope(instance.pk))
+        transaction.on_commit(lambda: bump(*scopes))
@@ -0,0 +1,79 @@
+"""
+Synchronisation différentielle des tickets (/api/tickets/changes/).
+
+Le client conserve un curseur opaque et ne récupère que ce qui a changé
+depuis : les tickets dont date_modification a avancé et les traces de
+suppression ou de réaffectation (TicketTombstone), à retirer de la copie locale. Les deux flux sont lus par keyset sur
+(date, id_ticket), fusionnés dans cet ordre et coupés à `limit` éléments ;
+le curseur renvoyé est la position du dernier élément livré.
+"""
+import base64
+from datetime import datetime, timezone as dt_timezone
+from heapq import merge
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from .serializers import ticket_list_data, ticket_list_values
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+ORIGIN = (datetime(1970, 1, 1, tzinfo=dt_timezone.utc), 0)
+
+
+def encode_cursor(position):
+    date, pk = position
+    return base64.urlsafe_b64encode(f"{date.isoformat()}|{pk}".encode()).decode()
+
+
+def decode_cursor(encoded):
+    """Position (date, id) du curseur, ORIGIN si absent (synchronisation complète)."""
+    if not encoded:
+        return ORIGIN
+    try:
+        date, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+        return datetime.fromisoformat(date), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValidationError({'since': "Curseur invalide."})
+
+
+def _after(date_field, id_field, position):
+    date, pk = position
+    return Q(**{f'{date_field}__gt': date}) | Q(**{date_field: date, f'{id_field}__gt': pk})
+
+
+def ticket_changes(tickets, tombstones, since, limit=DEFAULT_LIMIT):
+    """
+    Changements postérieurs à `since` : tickets modifiés (format des listes)
+    et identifiants des tickets supprimés, au plus `limit` éléments au total.
+    """
+    changed = ticket_list_values(
+        tickets.filter(_after('date_modification', 'id', since)).order_by('date_modification', 'id')
+    )[:limit + 1]
+    deleted = tombstones.filter(_after('date_suppression', 'ticket_id', since)) \
+        .order_by('date_suppression', 'ticket_id') \
+        .values_list('date_suppression', 'ticket_id')[:limit + 1]
+
+    events = merge(
+        (((row['date_modification'], row['id']), row) for row in changed),
+        ((position, None) for position in deleted),
+        key=lambda event: event[0],
+    )
+    rows, deleted_ids, position = [], [], since
+    has_more = False
+    for count, (event_position, row) in enumerate(events):
+        if count == limit:
+            has_more = True
+            break
+        position = event_position
+        if row is None:
+            deleted_ids.append(event_position[1])
+        else:
+            rows.append(row)
+
+    return {
+        'tickets': ticket_list_data(rows),
+        'deleted': deleted_ids,
+        'cursor': encode_cursor(position),
+        'has_more': has_more,
+    }
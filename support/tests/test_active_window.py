@@ -0,0 +1,65 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils.timezone import now
+
+from support.models import ACTIVE_WINDOW_DAYS, Ticket, Utilisateur
+
+
+class ActiveWindowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        cls.agent = Utilisateur.objects.create_user('agent@yafi.test', 'x', nom='Agent', telephone='690000002', role='agent')
+
+    def create(self, statut, days_ago):
+        ticket = Ticket.objects.create(client=self.client_user, agent=self.agent, description='Colis', statut=statut)
+        Ticket.objects.filter(pk=ticket.pk).update(date_modification=now() - timedelta(days=days_ago))
+        return ticket.pk
+
+    def test_open_tickets_and_recently_closed(self):
+        visible = {
+            self.create('Assigné', 0),
+            self.create('En cours', 0),
+            # Ouverts : toujours visibles, même sans modification récente
+            self.create('Assigné', 365),
+            self.create('En cours', ACTIVE_WINDOW_DAYS + 1),
+            self.create('Résolu', ACTIVE_WINDOW_DAYS - 1),
+            self.create('Rejeté', 0),
+        }
+        hidden = {
+            self.create('Résolu', ACTIVE_WINDOW_DAYS + 1),
+            self.create('Rejeté', 30),
+        }
+
+        self.assertEqual(set(Ticket.objects.active_window().values_list('id', flat=True)), visible)
+        self.assertEqual(
+            set(Ticket.objects.active_window(days=60).values_list('id', flat=True)), visible | hidden,
+        )
+
+    def test_indexes_exist(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Ticket._meta.db_table)
+
+        for name in (
+            'ticket_client_statut_modif', 'ticket_agent_statut_creation', 'ticket_client_ouverts',
+            'ticket_agent_ouverts', 'ticket_creation_id', 'ticket_modification_id',
+        ):
+            self.assertIn(name, constraints)
+            self.assertTrue(constraints[name]['index'], name)
+
+    def test_explain_command(self):
+        self.create('Assigné', 0)
+        stdout = StringIO()
+
+        call_command('explain_ticket_queries', stdout=stdout)
+
+        output = stdout.getvalue()
+        for heading in ('mes_tickets (client)', 'tickets_agent (agent)', 'list (tous)', 'agent_dashboard_stats (cumul)'):
+            self.assertIn(f'== {heading}', output)
+        if connection.vendor == 'sqlite':
+            # Liste de tous les tickets : parcours de l'index dans l'ordre de pagination, sans tri
+            self.assertIn('USING INDEX ticket_creation_id', output)
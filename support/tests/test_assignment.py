@@ -0,0 +1,55 @@
+from collections import Counter
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from support.assignment import IntentRoutingStrategy, LeastOpenLoadStrategy, WeightedRoundRobinStrategy
+from support.models import AgentLoad, Utilisateur
+
+
+class AssignmentStrategyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.agents = [
+            Utilisateur.objects.create_user(f'agent{i}@yafi.test', 'x', nom=f'Agent {i}', telephone='', role='agent')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        # Liste des agents et position du tourniquet sont gardées en cache
+        cache.clear()
+        self.set_loads(2, 0, 1)
+
+    def set_loads(self, *loads):
+        for agent, load in zip(self.agents, loads):
+            AgentLoad.objects.filter(agent=agent).update(tickets_ouverts=load)
+
+    def test_least_load_choose(self):
+        a, b, c = self.agents
+        self.assertEqual(LeastOpenLoadStrategy().choose('Paiement'), b)
+
+        b.is_active = False
+        b.save()
+        self.assertEqual(LeastOpenLoadStrategy().choose('Paiement'), c)
+
+    def test_least_load_choose_many_balances_the_batch(self):
+        a, b, c = self.agents
+        chosen = LeastOpenLoadStrategy().choose_many(['Paiement'] * 5)
+        # Charges 2 / 0 / 1 : toujours le moins chargé, l'id le plus petit à égalité
+        self.assertEqual(chosen, [b, b, c, a, b])
+
+    def test_weighted_round_robin_follows_weights(self):
+        a, b, c = self.agents
+        with override_settings(TICKET_ASSIGNMENT_WEIGHTS={a.email: 2}):
+            strategy = WeightedRoundRobinStrategy()
+            self.assertEqual(Counter(strategy.choose_many(['Paiement'] * 8)), {a: 4, b: 2, c: 2})
+            self.assertEqual(Counter(strategy.choose('Paiement') for _ in range(4)), {a: 2, b: 1, c: 1})
+
+    def test_intent_routes_to_skilled_agents(self):
+        a, b, c = self.agents
+        with override_settings(TICKET_ASSIGNMENT_SKILLS={'Paiement': [a.email]}):
+            strategy = IntentRoutingStrategy()
+            self.assertEqual(strategy.choose('Paiement'), a)
+            # Intention sans agent compétent : le moins chargé
+            self.assertEqual(strategy.choose('Livraison'), b)
+            self.assertEqual(strategy.choose_many(['Paiement', 'Livraison', 'Paiement']), [a, b, a])
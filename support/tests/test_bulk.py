@@ -0,0 +1,193 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from support import bulk
+from support.models import AgentLoad, IntentCounter, Ticket, TicketDailyStat, Utilisateur
+
+
+def rollup_state():
+    """Cumuls et charges, comparables à ceux reconstruits par backfill_ticket_stats."""
+    stats = {
+        (row.agent_id, row.jour, row.statut): (row.nombre_tickets, round(row.secondes_resolution, 3))
+        for row in TicketDailyStat.objects.filter(nombre_tickets__gt=0)
+    }
+    loads = dict(AgentLoad.objects.values_list('agent_id', 'tickets_ouverts'))
+    intents = set(IntentCounter.objects.filter(nombre_tickets__gt=0).values_list('titre', 'annee', 'mois', 'nombre_tickets'))
+    return stats, loads, intents
+
+
+class BulkTicketTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_user('admin@yafi.test', 'x', nom='Admin', telephone='690000000', role='admin')
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        cls.agent = Utilisateur.objects.create_user('agent@yafi.test', 'x', nom='Agent', telephone='690000002', role='agent')
+        cls.other = Utilisateur.objects.create_user('autre@yafi.test', 'x', nom='Autre', telephone='690000003', role='agent')
+
+    def create_tickets(self, n, agent=None):
+        return [
+            Ticket.objects.create(client=self.client_user, agent=agent or self.agent, description=f'Colis {i}')
+            for i in range(n)
+        ]
+
+    def post_bulk(self, user, **data):
+        self.client.force_authenticate(user)
+        return self.client.post('/api/tickets/bulk/', data, format='json')
+
+    def assert_matches_backfill(self):
+        live = rollup_state()
+        call_command('backfill_ticket_stats', stdout=StringIO())
+        self.assertEqual(live, rollup_state())
+
+    def test_ids_must_be_a_list(self):
+        ticket = self.create_tickets(1)[0]
+        for ids in (str(ticket.pk), {'id': ticket.pk}, ticket.pk):
+            response = self.post_bulk(self.admin, action='statut', ids=ids, statut='En cours')
+            self.assertEqual(response.status_code, 400, ids)
+            self.assertIn('ids', response.json())
+
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.statut, 'Assigné')
+
+    def test_ticket_cap(self):
+        response = self.post_bulk(
+            self.admin, action='statut', ids=list(range(1, bulk.MAX_BULK_TICKETS + 2)), statut='En cours',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ids', response.json())
+
+    def test_client_cannot_bulk(self):
+        ticket = self.create_tickets(1)[0]
+        for operation in bulk.BULK_ACTIONS:
+            response = self.post_bulk(
+                self.client_user, action=operation, ids=[ticket.pk], agent=self.other.pk, statut='En cours',
+            )
+            self.assertEqual(response.status_code, 403, operation)
+        self.assertTrue(Ticket.objects.filter(pk=ticket.pk, agent=self.agent, statut='Assigné').exists())
+
+    def test_agent_only_changes_status_of_own_tickets(self):
+        own = self.create_tickets(2)
+        foreign = self.create_tickets(1, agent=self.other)
+
+        response = self.post_bulk(self.agent, action='reassign', ids=[own[0].pk], agent=self.other.pk)
+        self.assertEqual(response.status_code, 403)
+        response = self.post_bulk(self.agent, action='delete', ids=[own[0].pk])
+        self.assertEqual(response.status_code, 403)
+        response = self.post_bulk(self.agent, action='statut', ids=[own[0].pk, foreign[0].pk], statut='En cours')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Ticket.objects.filter(statut='En cours').exists())
+
+        response = self.post_bulk(self.agent, action='statut', ids=[t.pk for t in own], statut='En cours')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(Ticket.objects.filter(statut='En cours').count(), 2)
+
+    def test_rollups_after_bulk_operations(self):
+        tickets = self.create_tickets(6)
+
+        response = self.post_bulk(self.admin, action='reassign', ids=[t.pk for t in tickets[:3]], agent=self.other.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AgentLoad.objects.get(agent=self.other).tickets_ouverts, 3)
+        self.assertEqual(AgentLoad.objects.get(agent=self.agent).tickets_ouverts, 3)
+        self.assert_matches_backfill()
+
+        response = self.post_bulk(self.admin, action='statut', ids=[t.pk for t in tickets[2:4]], statut='Résolu')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AgentLoad.objects.get(agent=self.other).tickets_ouverts, 2)
+        self.assertEqual(AgentLoad.objects.get(agent=self.agent).tickets_ouverts, 2)
+        self.assert_matches_backfill()
+
+        response = self.post_bulk(self.admin, action='delete', ids=[tickets[0].pk, tickets[4].pk])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AgentLoad.objects.get(agent=self.other).tickets_ouverts, 1)
+        self.assertEqual(AgentLoad.objects.get(agent=self.agent).tickets_ouverts, 1)
+        self.assert_matches_backfill()
+
+
+class BatchCreateTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        cls.agents = [
+            Utilisateur.objects.create_user(f'agent{i}@yafi.test', 'x', nom=f'Agent {i}', telephone=f'69000001{i}', role='agent')
+            for i in range(2)
+        ]
+
+    def post_batch(self, user, tickets):
+        self.client.force_authenticate(user)
+        return self.client.post('/api/tickets/create/batch/', {'tickets': tickets}, format='json')
+
+    def test_partial_failure_reports_each_item(self):
+        response = self.post_batch(self.client_user, [
+            {'titre': 'Paiement', 'description': 'Colis'},
+            {'titre': 'Livraison'},
+            'pas un ticket',
+            {'titre': 'Retard', 'description': 'Toujours rien'},
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['failed']), (2, 2))
+        results = body['results']
+        self.assertEqual([r['index'] for r in results], [0, 1, 2, 3])
+        self.assertEqual([r['status'] for r in results], ['created', 'error', 'error', 'created'])
+        self.assertIn('description', results[1]['errors'])
+        self.assertIn('titre', results[2]['errors'])
+        self.assertEqual(
+            {(r['id'], r['titre']) for r in results if r['status'] == 'created'},
+            set(Ticket.objects.filter(client=self.client_user).values_list('id', 'titre')),
+        )
+
+    def test_all_invalid_is_bad_request(self):
+        response = self.post_batch(self.client_user, [{'titre': 'Paiement'}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], 0)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_no_agent_available(self):
+        Utilisateur.objects.filter(role='agent').update(is_active=False)
+
+        response = self.post_batch(self.client_user, [{'titre': 'Paiement', 'description': 'Colis'}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('agent', response.json()['results'][0]['errors'])
+
+    def test_batch_cap(self):
+        items = [{'titre': 'Paiement', 'description': 'Colis'}] * (bulk.MAX_BATCH_CREATE + 1)
+
+        response = self.post_batch(self.client_user, items)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tickets', response.json())
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_empty_or_malformed_batch(self):
+        for tickets in ([], {'titre': 'Paiement'}, 'Paiement'):
+            response = self.post_batch(self.client_user, tickets)
+            self.assertEqual(response.status_code, 400, tickets)
+
+    def test_only_clients_can_create(self):
+        admin = Utilisateur.objects.create_user('admin@yafi.test', 'x', nom='Admin', telephone='690000000', role='admin')
+        for user in (self.agents[0], admin):
+            response = self.post_batch(user, [{'titre': 'Paiement', 'description': 'Colis'}])
+            self.assertEqual(response.status_code, 403, user.role)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_rollups_after_batch(self):
+        Ticket.objects.create(client=self.client_user, agent=self.agents[0], titre='Paiement', description='Colis')
+
+        response = self.post_batch(self.client_user, [
+            {'titre': 'Paiement', 'description': f'Colis {i}'} for i in range(5)
+        ] + [{'titre': 'Livraison', 'description': 'Colis'}])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sum(AgentLoad.objects.filter(agent__in=self.agents).values_list('tickets_ouverts', flat=True)), 7,
+        )
+        live = rollup_state()
+        call_command('backfill_ticket_stats', stdout=StringIO())
+        self.assertEqual(live, rollup_state())
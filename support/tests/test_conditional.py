@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.utils.http import http_date
+from rest_framework.test import APITestCase
+
+from support.models import Ticket, Utilisateur
+
+
+class TicketListConditionalTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='')
+        cls.agent = Utilisateur.objects.create_user('agent@yafi.test', 'x', nom='Agent', telephone='', role='agent')
+
+    def setUp(self):
+        cache.clear()
+        self.tickets = [
+            Ticket.objects.create(client=self.client_user, agent=self.agent, description=f'Colis {i}') for i in range(2)
+        ]
+        self.client.force_authenticate(self.client_user)
+
+    def get(self, **headers):
+        return self.client.get('/api/tickets/mes-tickets/', headers=headers)
+
+    def assert_revalidates(self, etag, changed):
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200 if changed else 304)
+        return response['ETag']
+
+    def test_matching_etag_gets_304(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+        self.assert_revalidates(response['ETag'], changed=False)
+
+    def test_if_modified_since_alone_is_ignored(self):
+        response = self.get(if_modified_since=http_date())
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_changes_etag(self):
+        etag = self.get()['ETag']
+        self.tickets[0].description = 'Colis abîmé'
+        self.tickets[0].save()
+        etag = self.assert_revalidates(etag, changed=True)
+        # Deuxième modification dans la même seconde
+        self.tickets[1].description = 'Colis perdu'
+        self.tickets[1].save()
+        self.assert_revalidates(etag, changed=True)
+
+    def test_delete_changes_etag(self):
+        etag = self.get()['ETag']
+        self.tickets[0].delete()
+        self.assert_revalidates(etag, changed=True)
+
+    def test_ticket_leaving_active_window_changes_etag(self):
+        self.tickets[0].statut = 'Résolu'
+        self.tickets[0].save()
+        etag = self.get()['ETag']
+        Ticket.objects.filter(pk=self.tickets[0].pk).update(date_modification='2000-01-01T00:00:00Z')
+        self.assert_revalidates(etag, changed=True)
+
+    def test_agent_rename_changes_etag(self):
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agent.nom = 'Agent renommé'
+            self.agent.save()
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['agent_nom'], 'Agent renommé')
@@ -0,0 +1,94 @@
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.asgi import application
+from support.models import Ticket, Utilisateur
+
+ORIGIN = [(b'origin', b'http://localhost:4200')]
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class TicketConsumerTests(TransactionTestCase):
+    """ws/tickets/ : authentification, origine, diffusion des changements aux groupes."""
+
+    def setUp(self):
+        self.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='')
+        self.agents = [
+            Utilisateur.objects.create_user(f'agent{i}@yafi.test', 'x', nom=f'Agent {i}', telephone='', role='agent')
+            for i in range(2)
+        ]
+        self.admin = Utilisateur.objects.create_superuser('admin@yafi.test', 'x', nom='Admin', telephone='')
+
+    def communicator(self, user=None, token=None, headers=ORIGIN):
+        if user is not None:
+            token = AccessToken.for_user(user)
+        path = f'/ws/tickets/?token={token}' if token else '/ws/tickets/'
+        return WebsocketCommunicator(application, path, headers=headers)
+
+    async def connects(self, communicator):
+        connected, _ = await communicator.connect()
+        if connected:
+            await communicator.disconnect()
+        return connected
+
+    async def test_refused_connections(self):
+        self.assertFalse(await self.connects(self.communicator()))
+        self.assertFalse(await self.connects(self.communicator(token='jeton-invalide')))
+        self.assertFalse(await self.connects(
+            self.communicator(self.client_user, headers=[(b'origin', b'https://evil.example')])
+        ))
+        # Sans Origin (client natif), le jeton reste exigé
+        self.assertFalse(await self.connects(self.communicator(headers=[])))
+
+    async def test_accepted_connections(self):
+        self.assertTrue(await self.connects(self.communicator(self.client_user)))
+        self.assertTrue(await self.connects(self.communicator(self.client_user, headers=[])))
+        # Jeton dans un en-tête Authorization (clients natifs)
+        token = AccessToken.for_user(self.client_user)
+        self.assertTrue(await self.connects(
+            WebsocketCommunicator(application, '/ws/tickets/', headers=[(b'authorization', f'Bearer {token}'.encode())])
+        ))
+
+    async def received(self, communicator):
+        events = []
+        while not await communicator.receive_nothing(timeout=0.2):
+            message = await communicator.receive_json_from()
+            events.extend((event['action'], event['ticket']['id']) for event in message['events'])
+        return events
+
+    def change_tickets(self):
+        agent, other = self.agents
+        ticket = Ticket.objects.create(titre='Paiement', description='Colis', client=self.client_user, agent=agent)
+        api = APIClient()
+        api.force_authenticate(agent)
+        api.patch(f'/api/tickets/{ticket.pk}/changer-statut/', {'statut': 'En cours'}, format='json')
+        api.force_authenticate(self.admin)
+        response = api.post(
+            '/api/tickets/bulk/', {'action': 'reassign', 'ids': [ticket.pk], 'agent': other.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        api.delete(f'/api/tickets/{ticket.pk}/')
+        return ticket.pk
+
+    async def test_events_reach_each_group(self):
+        users = {'client': self.client_user, 'agent': self.agents[0], 'other': self.agents[1], 'admin': self.admin}
+        communicators = {name: self.communicator(user) for name, user in users.items()}
+        for communicator in communicators.values():
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+
+        pk = await sync_to_async(self.change_tickets)()
+
+        received = {name: await self.received(communicator) for name, communicator in communicators.items()}
+        for communicator in communicators.values():
+            await communicator.disconnect()
+
+        followed = [('created', pk), ('updated', pk), ('updated', pk), ('deleted', pk)]
+        self.assertEqual(received['client'], followed)
+        self.assertEqual(received['admin'], followed)
+        # Agent dessaisi par la réaffectation en masse, puis nouvel agent
+        self.assertEqual(received['agent'], [('created', pk), ('updated', pk), ('unassigned', pk)])
+        self.assertEqual(received['other'], [('updated', pk), ('deleted', pk)])
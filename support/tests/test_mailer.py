@@ -0,0 +1,131 @@
+import smtplib
+import socket
+import unittest
+from io import StringIO
+
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from support.mailer import MailDispatcher
+from support.models import NotificationOutbox
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+REFUSED = 'refuse@yafi.test'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class RecordingHandler:
+    """Serveur SMTP de test : compte les sessions (EHLO) et refuse REFUSED au RCPT."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.recipients = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == REFUSED:
+            return '550 Destinataire inconnu'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recipients.extend(envelope.rcpt_tos)
+        return '250 OK'
+
+
+class SmtpServerMixin:
+    def setUp(self):
+        super().setUp()
+        self.handler = RecordingHandler()
+        self.port = free_port()
+        self.start_server()
+        settings = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=self.port,
+            EMAIL_USE_TLS=False, EMAIL_USE_SSL=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def start_server(self):
+        self.server = Controller(self.handler, hostname='127.0.0.1', port=self.port)
+        self.server.start()
+        self.addCleanup(self.stop_server)
+
+    def stop_server(self):
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
+
+
+def message(to):
+    return EmailMessage('Ticket', 'Contenu', 'noreply@yafi.test', [to])
+
+
+@unittest.skipUnless(Controller, "aiosmtpd n'est pas installé")
+class MailDispatcherTests(SmtpServerMixin, SimpleTestCase):
+    def test_one_session_for_many_messages(self):
+        recipients = [f'client{i}@yafi.test' for i in range(30)]
+        with MailDispatcher(batch_size=10) as dispatcher:
+            errors = dispatcher.send(message(to) for to in recipients)
+
+        self.assertEqual(errors, [None] * 30)
+        self.assertEqual(self.handler.recipients, recipients)
+        self.assertEqual(self.handler.sessions, 1)
+        self.assertEqual([report.sent for report in dispatcher.reports], [10, 10, 10])
+
+    def test_reconnects_after_dropped_connection(self):
+        with MailDispatcher() as dispatcher:
+            self.assertEqual(dispatcher.send([message('avant@yafi.test')]), [None])
+            # Le serveur coupe la connexion (redémarrage, timeout d'inactivité)
+            self.stop_server()
+            self.start_server()
+            self.assertEqual(dispatcher.send([message('apres@yafi.test')]), [None])
+
+        self.assertEqual(self.handler.recipients, ['avant@yafi.test', 'apres@yafi.test'])
+        self.assertEqual(self.handler.sessions, 2)
+        self.assertEqual(dispatcher.reports[-1].reconnections, 1)
+
+    def test_refused_recipient_is_reported_for_its_message(self):
+        with MailDispatcher() as dispatcher:
+            errors = dispatcher.send(message(to) for to in ['a@yafi.test', REFUSED, 'b@yafi.test'])
+
+        self.assertIsNone(errors[0])
+        self.assertIsInstance(errors[1], smtplib.SMTPRecipientsRefused)
+        self.assertIsNone(errors[2])
+        self.assertEqual(self.handler.recipients, ['a@yafi.test', 'b@yafi.test'])
+        # Erreur propre au message : la session est conservée
+        self.assertEqual(self.handler.sessions, 1)
+
+
+@unittest.skipUnless(Controller, "aiosmtpd n'est pas installé")
+@override_settings(SMS_BACKEND='support.sms.LocmemSmsBackend')
+class NotificationWorkerSmtpTests(SmtpServerMixin, TestCase):
+    def test_failure_is_recorded_on_its_outbox_row(self):
+        rows = NotificationOutbox.objects.bulk_create(
+            NotificationOutbox(canal='email', destinataire=to, action='updated', sujet='Ticket', contenu='Contenu')
+            for to in ['a@yafi.test', REFUSED, 'b@yafi.test']
+        )
+
+        call_command('run_notification_worker', '--once', stdout=StringIO())
+
+        statuts = dict(NotificationOutbox.objects.values_list('destinataire', 'statut'))
+        self.assertEqual(statuts, {'a@yafi.test': 'envoye', REFUSED: 'en_attente', 'b@yafi.test': 'envoye'})
+        refused = NotificationOutbox.objects.get(pk=rows[1].pk)
+        self.assertEqual(refused.tentatives, 1)
+        self.assertIn('SMTPRecipientsRefused', refused.derniere_erreur)
+        self.assertEqual(self.handler.sessions, 1)
@@ -0,0 +1,216 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from support import outbox
+from support.management.commands import run_notification_worker
+from support.models import NotificationOutbox, Ticket, Utilisateur
+from support.notifications import enqueue_ticket_notification
+from support.sms import BaseSmsBackend, LocmemSmsBackend
+
+
+class RefusedSmsBackend(BaseSmsBackend):
+    """Backend dont chaque envoi échoue (erreur non transitoire : pas de nouvel essai immédiat)."""
+
+    def send(self, to_number, message):
+        raise ValueError(f"Numéro refusé : {to_number}")
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    SMS_BACKEND='support.sms.LocmemSmsBackend',
+    NOTIFICATION_COALESCE_WINDOW=0,
+)
+class NotificationOutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = Utilisateur.objects.create_user(
+            'client@yafi.test', 'x', nom='Client', telephone='690 00 00 01',
+        )
+        cls.agent = Utilisateur.objects.create_user(
+            'agent@yafi.test', 'x', nom='Agent', telephone='690000002', role='agent',
+        )
+
+    def setUp(self):
+        mail.outbox = []
+        LocmemSmsBackend.outbox = []
+
+    def run_worker(self, *args):
+        call_command('run_notification_worker', '--once', *args, stdout=StringIO())
+
+    def create_ticket(self):
+        api = APIClient()
+        api.force_authenticate(self.client_user)
+        response = api.post('/api/tickets/create/', {'titre': 'Paiement', 'description': 'Colis'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return Ticket.objects.get(client=self.client_user)
+
+    def test_ticket_creation_enqueues_notifications(self):
+        ticket = self.create_ticket()
+
+        self.assertEqual(
+            sorted(NotificationOutbox.objects.filter(ticket_id=ticket.pk).values_list('canal', 'destinataire')),
+            [('email', 'agent@yafi.test'), ('email', 'client@yafi.test'), ('sms', '+237690000001')],
+        )
+        # Rien n'est envoyé par la requête elle-même
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(LocmemSmsBackend.outbox, [])
+
+    def test_rollback_drops_notifications(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            ticket = Ticket.objects.create(client=self.client_user, agent=self.agent, description='Colis')
+            enqueue_ticket_notification('created', ticket)
+            self.assertEqual(NotificationOutbox.objects.count(), 3)
+            raise RuntimeError("échec après la mise en file")
+
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_worker_sends_and_marks_sent(self):
+        self.create_ticket()
+        self.run_worker()
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['agent@yafi.test', 'client@yafi.test'])
+        self.assertEqual([number for number, _ in LocmemSmsBackend.outbox], ['+237690000001'])
+        self.assertEqual(set(NotificationOutbox.objects.values_list('statut', 'tentatives')), {('envoye', 1)})
+
+    @override_settings(SMS_BACKEND='support.tests.test_outbox.RefusedSmsBackend')
+    def test_failures_back_off_then_fail(self):
+        self.create_ticket()
+        sms = NotificationOutbox.objects.get(canal='sms')
+
+        delays = []
+        for attempt in range(1, outbox.MAX_ATTEMPTS):
+            before = now()
+            self.run_worker()
+            sms.refresh_from_db()
+            self.assertEqual((sms.statut, sms.tentatives), ('en_attente', attempt))
+            self.assertIn('Numéro refusé', sms.derniere_erreur)
+            delays.append((sms.prochaine_tentative - before).total_seconds())
+            # Relancé tout de suite : la notification n'est pas encore due
+            self.run_worker()
+            sms.refresh_from_db()
+            self.assertEqual(sms.tentatives, attempt)
+            NotificationOutbox.objects.filter(pk=sms.pk).update(prochaine_tentative=now() - timedelta(seconds=1))
+
+        # Délai RETRY_BASE * 2^(n-1) avec jitter dans [50 %, 100 %]
+        for attempt, delay in enumerate(delays, start=1):
+            expected = outbox.RETRY_BASE * 2 ** (attempt - 1)
+            self.assertTrue(expected * 0.5 - 1 <= delay <= expected + 1, (attempt, delay))
+
+        self.run_worker()
+        sms.refresh_from_db()
+        self.assertEqual((sms.statut, sms.tentatives), ('echec', outbox.MAX_ATTEMPTS))
+        # Les emails du même lot sont partis
+        self.assertEqual(set(NotificationOutbox.objects.filter(canal='email').values_list('statut', flat=True)), {'envoye'})
+
+    @override_settings(SMS_BACKEND='support.tests.test_outbox.RefusedSmsBackend')
+    def test_max_attempts_option(self):
+        self.create_ticket()
+        self.run_worker('--max-attempts', '1')
+
+        sms = NotificationOutbox.objects.get(canal='sms')
+        self.assertEqual((sms.statut, sms.tentatives), ('echec', 1))
+
+    def test_worker_releases_stale_claims_while_running(self):
+        self.create_ticket()
+        # Notification réclamée par un worker arrêté, il y a plus de LOCK_TIMEOUT
+        stale = NotificationOutbox.objects.filter(canal='sms').update(
+            statut='en_cours', date_verrou=now() - outbox.LOCK_TIMEOUT - timedelta(minutes=1),
+        )
+        self.assertEqual(stale, 1)
+
+        with mock.patch.object(run_notification_worker, 'RELEASE_INTERVAL', 0), \
+                mock.patch.object(outbox, 'release_stale', wraps=outbox.release_stale) as release_stale:
+            self.run_worker()
+
+        # Au démarrage, puis à chaque tour de boucle (un lot, puis la file vide)
+        self.assertEqual(release_stale.call_count, 3)
+        self.assertEqual(set(NotificationOutbox.objects.values_list('statut', flat=True)), {'envoye'})
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    SMS_BACKEND='support.sms.LocmemSmsBackend',
+    NOTIFICATION_COALESCE_WINDOW=60,
+)
+class NotificationCoalescingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = Utilisateur.objects.create_user(
+            'client@yafi.test', 'x', nom='Client', telephone='690000001',
+        )
+        cls.agent = Utilisateur.objects.create_user(
+            'agent@yafi.test', 'x', nom='Agent', telephone='690000002', role='agent',
+        )
+
+    def setUp(self):
+        self.ticket = Ticket.objects.create(client=self.client_user, agent=self.agent, titre='Paiement', description='Colis')
+        self.api = APIClient()
+        self.api.force_authenticate(self.agent)
+
+    def change_status(self, statut):
+        response = self.api.patch(f'/api/tickets/{self.ticket.pk}/changer-statut/', {'statut': statut}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def updates(self):
+        return NotificationOutbox.objects.filter(ticket_id=self.ticket.pk, action='updated')
+
+    def test_updates_in_window_keep_one_row_per_recipient(self):
+        self.change_status('En cours')
+        first = dict(self.updates().values_list('destinataire', 'pk'))
+        self.change_status('Résolu')
+        self.change_status('Rejeté')
+
+        self.assertEqual(
+            sorted(self.updates().values_list('canal', 'destinataire')),
+            [('email', 'agent@yafi.test'), ('email', 'client@yafi.test'), ('sms', '+237690000001')],
+        )
+        # Mêmes lignes, contenu de la dernière modification
+        self.assertEqual(dict(self.updates().values_list('destinataire', 'pk')), first)
+        for notification in self.updates().filter(canal='email'):
+            self.assertIn('Rejeté', notification.contenu)
+            self.assertNotIn('En cours', notification.contenu)
+        # Différées de la fenêtre : le worker ne les envoie pas encore
+        self.assertTrue(all(
+            notification.prochaine_tentative > now() + timedelta(seconds=50) for notification in self.updates()
+        ))
+        call_command('run_notification_worker', '--once', stdout=StringIO())
+        self.assertEqual(set(self.updates().values_list('statut', flat=True)), {'en_attente'})
+
+    def test_claimed_update_is_not_rewritten(self):
+        self.change_status('En cours')
+        self.updates().update(statut='en_cours', date_verrou=now())
+
+        self.change_status('Résolu')
+
+        self.assertEqual(self.updates().filter(statut='en_cours').count(), 3)
+        self.assertEqual(self.updates().filter(statut='en_attente').count(), 3)
+
+    @override_settings(NOTIFICATION_COALESCE_WINDOW=0)
+    def test_zero_window_disables_coalescing(self):
+        self.change_status('En cours')
+        self.change_status('Résolu')
+
+        self.assertEqual(self.updates().count(), 6)
+        self.assertTrue(all(notification.prochaine_tentative <= now() for notification in self.updates()))
+
+    def test_delete_drops_pending_updates(self):
+        self.change_status('En cours')
+        self.assertEqual(self.updates().count(), 3)
+        admin = Utilisateur.objects.create_user('admin@yafi.test', 'x', nom='Admin', telephone='690000000', role='admin')
+        self.api.force_authenticate(admin)
+
+        response = self.api.delete(f'/api/tickets/{self.ticket.pk}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.updates().exists())
+        self.assertEqual(
+            NotificationOutbox.objects.filter(ticket_id=self.ticket.pk, action='deleted').count(), 2,
+        )
@@ -0,0 +1,81 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APITestCase
+
+from support.models import Ticket, Utilisateur
+from support.pagination import TicketCursorPagination
+
+
+class TicketCursorPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_user('admin@yafi.test', 'x', nom='Admin', telephone='690000000', role='admin')
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        Ticket.objects.bulk_create(
+            Ticket(client=cls.client_user, titre='Paiement', description=f'Colis {i}') for i in range(230)
+        )
+        # Égalités de date_creation : départagées par id
+        tied = Ticket.objects.order_by('id').values_list('id', flat=True)[40:70]
+        Ticket.objects.filter(id__in=list(tied)).update(date_creation=now())
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def get(self, url='/api/tickets/', **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def expected_ids(self):
+        return list(Ticket.objects.order_by('-date_creation', '-id').values_list('id', flat=True))
+
+    def test_walks_all_tickets_in_order(self):
+        ids, sizes = [], []
+        page = self.get()
+        while True:
+            sizes.append(len(page['results']))
+            ids.extend(row['id'] for row in page['results'])
+            if not page['next']:
+                break
+            page = self.get(page['next'])
+
+        self.assertEqual(sizes, [50, 50, 50, 50, 30])
+        self.assertEqual(ids, self.expected_ids())
+
+    def test_previous_link_returns_same_page(self):
+        first = self.get()
+        self.assertIsNone(first['previous'])
+        second = self.get(first['next'])
+
+        back = self.get(second['previous'])
+
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+        self.assertEqual(back['next'], first['next'])
+
+    def test_new_tickets_do_not_shift_next_page(self):
+        first = self.get()
+        expected = self.get(first['next'])['results']
+        Ticket.objects.create(client=self.client_user, titre='Paiement', description='Nouveau')
+
+        self.assertEqual(self.get(first['next'])['results'], expected)
+
+    def test_page_size(self):
+        self.assertEqual(len(self.get(page_size=10)['results']), 10)
+        self.assertEqual(len(self.get(page_size=500)['results']), TicketCursorPagination.max_page_size)
+        self.assertEqual(len(self.get(page_size='abc')['results']), TicketCursorPagination.page_size)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/tickets/', {'cursor': 'pas-un-curseur'})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_keyset_query_without_offset(self):
+        first = self.get()
+        with CaptureQueriesContext(connection) as queries:
+            self.get(first['next'])
+
+        pages = [query['sql'] for query in queries if 'LIMIT 51' in query['sql']]
+        self.assertEqual(len(pages), 1)
+        self.assertNotIn('OFFSET', pages[0])
@@ -0,0 +1,24 @@
+from rest_framework.test import APITestCase
+
+from support.models import Utilisateur
+
+
+class RegistrationPhoneTests(APITestCase):
+    def register(self, telephone):
+        return self.client.post('/api/utilisateurs/', {
+            'email': 'client@yafi.test', 'nom': 'Client', 'password': 'secret123', 'telephone': telephone,
+        }, format='json')
+
+    def test_phone_is_normalized(self):
+        response = self.register('00237 690-00-00-01')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['telephone_e164'], '+237690000001')
+        self.assertEqual(Utilisateur.objects.with_phone('690000001').get().email, 'client@yafi.test')
+
+    def test_unrecognized_phone_is_accepted_as_typed(self):
+        response = self.register('poste 12')
+
+        self.assertEqual(response.status_code, 201)
+        user = Utilisateur.objects.get(email='client@yafi.test')
+        self.assertEqual((user.telephone, user.telephone_e164), ('poste 12', ''))
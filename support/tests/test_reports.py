@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APITestCase
+
+from support.models import Ticket, Utilisateur
+
+
+class AgentsReportQueryTests(APITestCase):
+    """Le rapport des agents s'obtient en un nombre de requêtes indépendant du nombre d'agents."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_superuser('admin@yafi.test', 'x', nom='Admin', telephone='690000000')
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+
+    def add_agent(self, i):
+        agent = Utilisateur.objects.create_user(
+            f'agent{i}@yafi.test', 'x', nom=f'Agent {i}', telephone=f'6900001{i:02d}', role='agent',
+        )
+        for statut in ('Assigné', 'Résolu', 'Rejeté'):
+            ticket = Ticket.objects.create(client=self.client_user, agent=agent, description='Colis')
+            ticket.statut = statut
+            ticket.save()
+
+    def report(self):
+        cache.clear()
+        today = now()
+        response = self.client.get('/api/admin/rapport-agents/', {'year': today.year, 'month': today.month})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_does_not_grow_with_agents(self):
+        self.add_agent(0)
+        with CaptureQueriesContext(connection) as one_agent:
+            self.assertEqual(len(self.report()), 2)
+
+        for i in range(1, 10):
+            self.add_agent(i)
+        with self.assertNumQueries(len(one_agent)):
+            rows = self.report()
+
+        self.assertEqual(len(rows), 11)
+        self.assertEqual(rows[0]['stats']['total'], 3)
+        self.assertEqual(rows[0]['stats']['resolus'], 1)
+
+
+class IntentStatsParamsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_superuser('admin@yafi.test', 'x', nom='Admin', telephone='690000000')
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def test_invalid_top_is_rejected(self):
+        for top in ('abc', '0', '-3', '101'):
+            with self.subTest(top=top):
+                response = self.client.get('/api/admin/intents/', {'top': top})
+                self.assertEqual(response.status_code, 400)
+
+    def test_valid_top(self):
+        response = self.client.get('/api/admin/intents/', {'top': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['monthly']), 12)
+
+
+class ExportAgentsReportParamsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_superuser('admin@yafi.test', 'x', nom='Admin', telephone='690000000')
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def test_invalid_period_is_rejected(self):
+        for params in ({'month': 'mars'}, {'year': '20x5'}, {'month': 13}, {'month': 0}, {'year': 0}):
+            with self.subTest(**params):
+                response = self.client.get('/api/admin/export/rapport-agents/', params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_valid_period(self):
+        response = self.client.get('/api/admin/export/rapport-agents/', {'year': 2025, 'month': 1})
+        self.assertEqual(response.status_code, 200)
+        b''.join(response.streaming_content)
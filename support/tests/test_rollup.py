@@ -0,0 +1,220 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from support import bulk, rollup
+from support.models import AgentLoad, ResolutionSketch, Ticket, TicketDailyStat, Utilisateur
+from support.sketch import DDSketch
+
+
+class ResolutionTimeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        cls.agent = Utilisateur.objects.create_user(
+            'agent@yafi.test', 'x', nom='Agent', telephone='690000002', role='agent',
+        )
+
+    def resolve(self, **kwargs):
+        ticket = Ticket.objects.create(client=self.client_user, agent=self.agent, description='Colis', **kwargs)
+        ticket.statut = 'Résolu'
+        ticket.save(update_fields=['statut'])
+        return Ticket.objects.get(pk=ticket.pk)
+
+    def stat_seconds(self):
+        return TicketDailyStat.objects.get(agent=self.agent, statut='Résolu').secondes_resolution
+
+    def test_resolution_date_set_on_transition(self):
+        ticket = self.resolve()
+        self.assertIsNotNone(ticket.date_resolution)
+        self.assertAlmostEqual(
+            self.stat_seconds(), (ticket.date_resolution - ticket.date_creation).total_seconds(), places=3,
+        )
+
+    def test_later_edit_keeps_resolution_time(self):
+        ticket = self.resolve()
+        secondes = self.stat_seconds()
+        date_resolution = ticket.date_resolution
+
+        ticket.description = 'Colis reçu, merci'
+        ticket.save()
+
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.date_resolution, date_resolution)
+        self.assertGreater(ticket.date_modification, date_resolution)
+        self.assertEqual(self.stat_seconds(), secondes)
+
+    def test_reopen_clears_resolution_date(self):
+        ticket = self.resolve()
+        ticket.statut = 'En cours'
+        ticket.save(update_fields=['statut'])
+
+        ticket.refresh_from_db()
+        self.assertIsNone(ticket.date_resolution)
+        self.assertFalse(TicketDailyStat.objects.filter(statut='Résolu', nombre_tickets__gt=0).exists())
+
+
+class ResolutionSketchTests(TestCase):
+    """Les sketches ne comptent que les tickets résolus, comme après backfill_ticket_stats."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        cls.agents = [
+            Utilisateur.objects.create_user(
+                f'agent{i}@yafi.test', 'x', nom=f'Agent {i}', telephone=f'69000001{i}', role='agent',
+            )
+            for i in range(2)
+        ]
+
+    def sketches(self):
+        return {
+            (row.agent_id, row.annee, row.mois): (row.load().zero_count, row.load().bins)
+            for row in ResolutionSketch.objects.all()
+            if row.load().count
+        }
+
+    def resolved_count(self):
+        return sum(count for _, bins in self.sketches().values() for count in bins.values())
+
+    def create_resolved(self, n):
+        tickets = []
+        for _ in range(n):
+            ticket = Ticket.objects.create(client=self.client_user, agent=self.agents[0], description='Colis')
+            ticket.statut = 'Résolu'
+            ticket.save()
+            tickets.append(ticket)
+        return tickets
+
+    def assert_matches_backfill(self):
+        live = self.sketches()
+        call_command('backfill_ticket_stats', stdout=StringIO())
+        self.assertEqual(live, self.sketches())
+
+    def test_reopen_delete_and_reassign(self):
+        tickets = self.create_resolved(4)
+        self.assertEqual(self.resolved_count(), 4)
+
+        tickets[0].statut = 'En cours'
+        tickets[0].save()
+        tickets[1].delete()
+        tickets[2].agent = self.agents[1]
+        tickets[2].save()
+
+        self.assertEqual(self.resolved_count(), 2)
+        self.assert_matches_backfill()
+
+    def test_bulk_operations(self):
+        tickets = self.create_resolved(4)
+        with rollup.batch():
+            bulk.bulk_reassign(bulk.lock_tickets([t.pk for t in tickets[:2]]), self.agents[1])
+        with rollup.batch():
+            bulk.bulk_change_status(bulk.lock_tickets([tickets[2].pk]), 'Rejeté')
+        with rollup.batch():
+            bulk.bulk_delete(bulk.lock_tickets([tickets[3].pk]))
+
+        self.assertEqual(self.resolved_count(), 2)
+        self.assert_matches_backfill()
+
+    def test_remove_after_collapse(self):
+        sketch = DDSketch(max_bins=2)
+        for value in (1, 10, 100):
+            sketch.add(value)
+        sketch.remove(1)
+        self.assertEqual(sketch.count, 2)
+        sketch.remove(10)
+        sketch.remove(100)
+        self.assertEqual(sketch.count, 0)
+
+
+class AgentLoadTests(TestCase):
+    """AgentLoad.tickets_ouverts suit les tickets ouverts de chaque agent, comme après backfill_ticket_stats."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        cls.agents = [
+            Utilisateur.objects.create_user(
+                f'agent{i}@yafi.test', 'x', nom=f'Agent {i}', telephone=f'69000001{i}', role='agent',
+            )
+            for i in range(2)
+        ]
+
+    def loads(self):
+        return [AgentLoad.objects.get(agent=agent).tickets_ouverts for agent in self.agents]
+
+    def assert_loads(self, expected):
+        self.assertEqual(self.loads(), expected)
+        call_command('backfill_ticket_stats', stdout=StringIO())
+        self.assertEqual(self.loads(), expected)
+
+    def create(self, agent, n=1):
+        return [
+            Ticket.objects.create(client=self.client_user, agent=agent, description='Colis') for _ in range(n)
+        ]
+
+    def test_new_agent_has_a_load(self):
+        self.assert_loads([0, 0])
+
+    def test_single_ticket_changes(self):
+        tickets = self.create(self.agents[0], 3)
+        self.assert_loads([3, 0])
+
+        tickets[0].agent = self.agents[1]
+        tickets[0].save()
+        self.assert_loads([2, 1])
+
+        # En cours reste ouvert ; Résolu et Rejeté ferment le ticket
+        tickets[1].statut = 'En cours'
+        tickets[1].save()
+        self.assert_loads([2, 1])
+        tickets[1].statut = 'Résolu'
+        tickets[1].save()
+        tickets[0].statut = 'Rejeté'
+        tickets[0].save()
+        self.assert_loads([1, 0])
+
+        # Réouverture, puis réaffectation d'un ticket clos : seule la charge du ticket ouvert bouge
+        tickets[1].statut = 'Assigné'
+        tickets[1].save()
+        tickets[0].agent = self.agents[0]
+        tickets[0].save()
+        self.assert_loads([2, 0])
+
+        tickets[2].delete()
+        tickets[0].delete()
+        self.assert_loads([1, 0])
+
+    def test_unassigned_ticket(self):
+        ticket = self.create(self.agents[0])[0]
+        ticket.agent = None
+        ticket.save()
+        self.assert_loads([0, 0])
+
+        ticket.agent = self.agents[1]
+        ticket.save()
+        self.assert_loads([0, 1])
+
+    def test_bulk_operations(self):
+        with rollup.batch():
+            tickets = bulk.bulk_create_tickets([
+                Ticket(client=self.client_user, agent=self.agents[i % 2], description='Colis') for i in range(6)
+            ])
+        self.assert_loads([3, 3])
+
+        with rollup.batch():
+            bulk.bulk_reassign(bulk.lock_tickets([t.pk for t in tickets[:4]]), self.agents[1])
+        self.assert_loads([1, 5])
+
+        with rollup.batch():
+            bulk.bulk_change_status(bulk.lock_tickets([t.pk for t in tickets[:3]]), 'Résolu')
+        self.assert_loads([1, 2])
+
+        with rollup.batch():
+            bulk.bulk_change_status(bulk.lock_tickets([tickets[0].pk]), 'En cours')
+        self.assert_loads([1, 3])
+
+        with rollup.batch():
+            bulk.bulk_delete(bulk.lock_tickets([t.pk for t in tickets[:2]] + [tickets[4].pk]))
+        self.assert_loads([0, 2])
@@ -0,0 +1,132 @@
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from support import search
+from support.models import Message, Ticket, Utilisateur
+
+
+class SearchTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        cls.other_client = Utilisateur.objects.create_user('autre@yafi.test', 'x', nom='Autre', telephone='690000003')
+        cls.agent = Utilisateur.objects.create_user('agent@yafi.test', 'x', nom='Agent', telephone='690000002', role='agent')
+        cls.other_agent = Utilisateur.objects.create_user('agent2@yafi.test', 'x', nom='Agent 2', telephone='690000004', role='agent')
+
+    def create(self, titre, description, client=None, agent=None):
+        return Ticket.objects.create(
+            client=client or self.client_user, agent=agent or self.agent, titre=titre, description=description,
+        )
+
+
+class SearchTicketIdsTests(SearchTestMixin, TestCase):
+    def ids(self, query, tickets=None, offset=0, limit=10):
+        return search.search_ticket_ids(tickets or Ticket.objects.all(), query, offset, limit)
+
+    def test_sqlite_uses_fts5(self):
+        self.assertEqual(search.backend(), 'fts5')
+
+    def test_title_ranks_above_description_and_messages(self):
+        in_message = self.create('Compte', 'Accès impossible')
+        Message.objects.create(ticket=in_message, auteur=self.client_user, contenu='Mon remboursement est bloqué')
+        in_description = self.create('Paiement', 'Remboursement en attente')
+        in_title = self.create('Remboursement', 'Colis retourné')
+        self.create('Livraison', 'Colis en retard')
+
+        self.assertEqual(self.ids('remboursement'), [in_title.pk, in_description.pk, in_message.pk])
+
+    def test_all_terms_required_and_syntax_not_interpreted(self):
+        both = self.create('Paiement', 'Colis livré mais paiement refusé')
+        self.create('Paiement', 'Carte refusée')
+
+        self.assertEqual(self.ids('colis paiement'), [both.pk])
+        # Opérateurs FTS5 traités comme des mots
+        self.assertEqual(self.ids('colis OR carte'), [])
+        self.assertEqual(self.ids('colis*'), [both.pk])
+        self.assertEqual(self.ids('?!'), [])
+
+    def test_offset_and_limit(self):
+        tickets = [self.create('Paiement', f'Demande {i}') for i in range(5)]
+
+        first, second = self.ids('paiement', limit=3), self.ids('paiement', offset=3, limit=3)
+
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertEqual(set(first + second), {t.pk for t in tickets})
+
+    def test_scope_queryset_is_applied(self):
+        own = self.create('Paiement', 'Colis', agent=self.agent)
+        self.create('Paiement', 'Colis', agent=self.other_agent)
+
+        self.assertEqual(self.ids('colis', Ticket.objects.filter(agent=self.agent)), [own.pk])
+
+    def test_message_changes_reindex_ticket(self):
+        ticket = self.create('Paiement', 'Colis')
+        self.assertEqual(self.ids('facture'), [])
+
+        message = Message.objects.create(ticket=ticket, auteur=self.agent, contenu='Voici votre facture')
+        self.assertEqual(self.ids('facture'), [ticket.pk])
+
+        message.delete()
+        self.assertEqual(self.ids('facture'), [])
+
+    def test_ticket_changes_reindex_ticket(self):
+        ticket = self.create('Paiement', 'Colis')
+
+        ticket.description = 'Livraison retardée'
+        ticket.save()
+        self.assertEqual(self.ids('retardée'), [ticket.pk])
+        self.assertEqual(self.ids('colis'), [])
+
+        ticket.delete()
+        self.assertEqual(self.ids('retardée'), [])
+
+    def test_rebuild_index(self):
+        ticket = self.create('Paiement', 'Colis')
+        Message.objects.create(ticket=ticket, auteur=self.agent, contenu='Voici votre facture')
+
+        self.assertEqual(search.rebuild_index(), 1)
+        self.assertEqual(self.ids('facture'), [ticket.pk])
+
+    def test_icontains_fallback(self):
+        older = self.create('Remboursement', 'Colis')
+        newer = self.create('Paiement', 'Demande de remboursement')
+        message = self.create('Compte', 'Accès')
+        Message.objects.create(ticket=message, auteur=self.agent, contenu='Remboursement effectué')
+        self.create('Livraison', 'Colis')
+
+        with mock.patch.object(search, 'backend', return_value='basic'):
+            # Sous-chaînes, sans classement : du plus récent au plus ancien
+            self.assertEqual(self.ids('REMBOURS'), [message.pk, newer.pk, older.pk])
+            self.assertEqual(self.ids('remboursement colis'), [older.pk])
+            self.assertEqual(self.ids('remboursement', limit=1, offset=1), [newer.pk])
+            self.assertEqual(self.ids('remboursement', Ticket.objects.filter(titre='Paiement')), [newer.pk])
+
+
+class SearchViewTests(SearchTestMixin, APITestCase):
+    def search(self, user, query):
+        self.client.force_authenticate(user)
+        return self.client.get('/api/tickets/search/', {'q': query})
+
+    def result_ids(self, user, query):
+        response = self.search(user, query)
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.json()['results']}
+
+    def test_results_are_scoped_by_role(self):
+        mine = self.create('Paiement', 'Colis', client=self.client_user, agent=self.agent)
+        other_client = self.create('Paiement', 'Colis', client=self.other_client, agent=self.agent)
+        other_agent = self.create('Paiement', 'Colis', client=self.client_user, agent=self.other_agent)
+        admin = Utilisateur.objects.create_user('admin@yafi.test', 'x', nom='Admin', telephone='690000000', role='admin')
+
+        self.assertEqual(self.result_ids(self.client_user, 'colis'), {mine.pk, other_agent.pk})
+        self.assertEqual(self.result_ids(self.agent, 'colis'), {mine.pk, other_client.pk})
+        self.assertEqual(self.result_ids(admin, 'colis'), {mine.pk, other_client.pk, other_agent.pk})
+
+    def test_query_is_required(self):
+        response = self.search(self.client_user, '  ')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('q', response.json())
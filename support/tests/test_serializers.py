@@ -0,0 +1,37 @@
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from support.models import Ticket, Utilisateur
+from support.serializers import TicketSerializer, ticket_list_data, ticket_list_values
+
+
+class TicketListDataTests(TestCase):
+    """Le chemin de lecture rapide doit produire exactement le JSON de TicketSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        agent = Utilisateur.objects.create_user('agent@yafi.test', 'x', nom='Agent Éloïse', telephone='690000002', role='agent')
+        Ticket.objects.create(client=client_user, agent=agent, titre='Paiement', description='Reçu « non » envoyé')
+        Ticket.objects.create(client=client_user, agent=None, titre='', description='Sans agent')
+        resolved = Ticket.objects.create(client=client_user, agent=agent, titre='Livraison', description='Colis')
+        resolved.statut = 'Résolu'
+        resolved.save()
+
+    def assert_same_json(self):
+        tickets = Ticket.objects.select_related('agent').order_by('-date_creation', '-id')
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(ticket_list_data(ticket_list_values(tickets))),
+            renderer.render(TicketSerializer(tickets, many=True).data),
+        )
+
+    def test_same_json_as_serializer(self):
+        self.assert_same_json()
+
+    @override_settings(USE_TZ=True, TIME_ZONE='Africa/Douala')
+    def test_same_json_in_local_time_zone(self):
+        self.assert_same_json()
+
+    def test_empty_list(self):
+        self.assertEqual(ticket_list_data(ticket_list_values(Ticket.objects.none())), [])
@@ -0,0 +1,122 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+from twilio.base.exceptions import TwilioRestException
+
+from support import sms
+
+
+class ProviderError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class FlakySmsBackend(sms.BaseSmsBackend):
+    """Échoue avec les statuts HTTP donnés, dans l'ordre, puis envoie."""
+
+    def __init__(self, *statuses, rate_limit=None):
+        self.statuses = list(statuses)
+        self.rate_limit = rate_limit
+        self.attempts = []
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, to_number, message):
+        with self._lock:
+            self.attempts.append(to_number)
+            if self.statuses:
+                raise ProviderError(self.statuses.pop(0))
+            self.sent.append((to_number, message))
+
+    def is_retryable(self, error):
+        return isinstance(error, ProviderError) and (error.status == 429 or error.status >= 500)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_slots_are_spaced_by_interval(self):
+        limiter = sms.RateLimiter(10)
+        with mock.patch.object(sms.time, 'sleep') as sleep:
+            for _ in range(5):
+                limiter.acquire()
+
+        delays = [call.args[0] for call in sleep.call_args_list]
+        for index, delay in enumerate(delays):
+            self.assertAlmostEqual(delay, index * 0.1, delta=0.05)
+
+    def test_no_rate_does_not_wait(self):
+        limiter = sms.RateLimiter(None)
+        with mock.patch.object(sms.time, 'sleep') as sleep:
+            for _ in range(5):
+                limiter.acquire()
+        sleep.assert_not_called()
+
+    def test_rate_is_shared_between_threads(self):
+        backend = FlakySmsBackend(rate_limit=20)
+        start = time.monotonic()
+        with sms.SmsDispatcher(backend, concurrency=4) as dispatcher:
+            results = dispatcher.send([(f'+23769000000{i}', 'Bonjour') for i in range(10)])
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(results, [None] * 10)
+        # 10 envois à 20/s, malgré 4 threads : au moins 9 intervalles de 50 ms
+        self.assertGreaterEqual(elapsed, 9 / 20 - 0.01)
+
+
+@mock.patch.object(sms, 'RETRY_DELAY', 0.001)
+class SmsDispatcherTests(SimpleTestCase):
+    def send(self, backend, max_retries=sms.MAX_RETRIES):
+        with sms.SmsDispatcher(backend, max_retries=max_retries) as dispatcher:
+            return dispatcher.send([('+237690000001', 'Bonjour')])[0]
+
+    def test_transient_errors_are_retried(self):
+        backend = FlakySmsBackend(429, 503)
+
+        with self.assertLogs('support.sms', 'WARNING') as logs:
+            self.assertIsNone(self.send(backend))
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(len(backend.attempts), 3)
+        self.assertEqual(backend.sent, [('+237690000001', 'Bonjour')])
+
+    def test_backoff_doubles_the_delay(self):
+        backend = FlakySmsBackend(500, 500)
+        with mock.patch.object(sms.time, 'sleep') as sleep:
+            self.send(backend)
+
+        self.assertEqual([call.args[0] for call in sleep.call_args_list if call.args[0]], [0.001, 0.002])
+
+    def test_retries_exhausted_returns_last_error(self):
+        backend = FlakySmsBackend(429, 429, 502)
+
+        error = self.send(backend)
+
+        self.assertIsInstance(error, ProviderError)
+        self.assertEqual(error.status, 502)
+        self.assertEqual(len(backend.attempts), sms.MAX_RETRIES + 1)
+        self.assertEqual(backend.sent, [])
+
+    def test_permanent_error_is_returned_without_retry(self):
+        backend = FlakySmsBackend(400)
+
+        error = self.send(backend)
+
+        self.assertIsInstance(error, ProviderError)
+        self.assertEqual(error.status, 400)
+        self.assertEqual(len(backend.attempts), 1)
+
+    def test_results_keep_message_order(self):
+        backend = FlakySmsBackend(400)
+        with sms.SmsDispatcher(backend, concurrency=1) as dispatcher:
+            results = dispatcher.send([('+237690000001', 'A'), ('+237690000002', 'B')])
+
+        self.assertIsInstance(results[0], ProviderError)
+        self.assertIsNone(results[1])
+
+    def test_twilio_transient_statuses(self):
+        backend = sms.TwilioSmsBackend()
+        for status, retryable in ((429, True), (500, True), (503, True), (400, False), (404, False)):
+            self.assertEqual(backend.is_retryable(TwilioRestException(status, '/Messages')), retryable, status)
+        self.assertTrue(backend.is_retryable(ConnectionError()))
+        self.assertFalse(backend.is_retryable(ValueError()))
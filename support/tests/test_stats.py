@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import localdate, make_aware
+from rest_framework.test import APITestCase
+
+from support.models import Ticket, Utilisateur
+
+
+def ticket_queries(queries):
+    """Requêtes lisant la table des tickets (et non les cumuls)."""
+    table = connection.ops.quote_name(Ticket._meta.db_table)
+    return [query['sql'] for query in queries if table in query['sql']]
+
+
+def daily_stat_queries(queries):
+    return [query['sql'] for query in queries if 'support_ticketdailystat' in query['sql']]
+
+
+class AgentDashboardTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        cls.agent = Utilisateur.objects.create_user('agent@yafi.test', 'x', nom='Agent', telephone='690000002', role='agent')
+        cls.today = localdate()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.agent)
+
+    def create(self, statut, date_creation=None):
+        ticket = Ticket.objects.create(client=self.client_user, agent=self.agent, description='Colis')
+        if statut != 'Assigné':
+            ticket.statut = statut
+            ticket.save()
+        if date_creation:
+            Ticket.objects.filter(pk=ticket.pk).update(date_creation=date_creation)
+        return ticket
+
+    def dashboard(self, year):
+        response = self.client.get('/api/agent/dashboard/', {'year': year})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counts_and_monthly_rates(self):
+        for statut in ('Assigné', 'En cours', 'Résolu', 'Résolu', 'Rejeté'):
+            self.create(statut)
+        last_year = make_aware(datetime(self.today.year - 1, 6, 15, 12))
+        self.create('Résolu', last_year)
+        call_command('backfill_ticket_stats', stdout=StringIO())
+
+        data = self.dashboard(self.today.year)
+
+        # Totaux : toutes années ; série mensuelle : l'année demandée seulement
+        self.assertEqual(
+            (data['total_tickets'], data['en_cours'], data['resolus'], data['rejetes']), (6, 1, 3, 1),
+        )
+        months = {row['month']: row for row in data['monthly_resolution_rate']}
+        self.assertEqual(sorted(months), list(range(1, 13)))
+        self.assertEqual(
+            months[self.today.month], {'month': self.today.month, 'resolved': 2, 'total': 5, 'resolution_rate': 40.0},
+        )
+        self.assertEqual(sum(row['total'] for row in months.values()), 5)
+
+        cache.clear()
+        previous = {row['month']: row for row in self.dashboard(self.today.year - 1)['monthly_resolution_rate']}
+        self.assertEqual((previous[6]['resolved'], previous[6]['total']), (1, 1))
+
+    def test_single_grouped_query_on_daily_stats(self):
+        for statut in ('Assigné', 'Résolu', 'Rejeté'):
+            self.create(statut)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.dashboard(self.today.year)
+
+        self.assertEqual(len(daily_stat_queries(queries)), 1)
+        self.assertIn('GROUP BY', daily_stat_queries(queries)[0])
+        self.assertEqual(ticket_queries(queries), [])
+
+    def test_empty_dashboard(self):
+        data = self.dashboard(self.today.year)
+
+        self.assertEqual(data['total_tickets'], 0)
+        self.assertEqual({row['resolution_rate'] for row in data['monthly_resolution_rate']}, {0})
+
+
+class ResolutionTimeStatsTests(APITestCase):
+    """Durées de résolution agrégées en base : moyenne (cumul), min / max (Ticket), percentiles (sketches)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_superuser('admin@yafi.test', 'x', nom='Admin', telephone='690000000')
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        cls.agent = Utilisateur.objects.create_user('agent@yafi.test', 'x', nom='Agent', telephone='690000002', role='agent')
+        cls.other = Utilisateur.objects.create_user('autre@yafi.test', 'x', nom='Autre', telephone='690000003', role='agent')
+        cls.today = localdate()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+
+    def resolve(self, agent, hours):
+        ticket = Ticket.objects.create(client=self.client_user, agent=agent, description='Colis')
+        ticket.statut = 'Résolu'
+        ticket.save()
+        Ticket.objects.filter(pk=ticket.pk).update(date_resolution=ticket.date_creation + timedelta(hours=hours))
+
+    def setup_tickets(self):
+        self.resolve(self.agent, 1)
+        self.resolve(self.agent, 3)
+        self.resolve(self.other, 8)
+        Ticket.objects.create(client=self.client_user, agent=self.agent, description='Colis')
+        call_command('backfill_ticket_stats', stdout=StringIO())
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        # Les tickets ne sont lus que par des agrégats MIN / MAX : aucune ligne chargée en Python
+        for sql in ticket_queries(queries):
+            self.assertIn('MIN(', sql)
+            self.assertIn('MAX(', sql)
+        return response.json()
+
+    def test_agent_stats(self):
+        self.setup_tickets()
+
+        data = self.get(f'/api/admin/agent-stats/{self.agent.pk}/', year=self.today.year, month=self.today.month)
+
+        self.assertEqual((data['total_tickets'], data['resolus'], data['resolution_rate']), (3, 2, 66.67))
+        self.assertEqual(data['average_resolution_time'], 2.0)
+        self.assertEqual((data['min_resolution_time'], data['max_resolution_time']), (1.0, 3.0))
+        self.assertAlmostEqual(data['median_resolution_time'], 1.0, delta=0.05)
+
+    def test_agent_without_resolved_tickets(self):
+        Ticket.objects.create(client=self.client_user, agent=self.agent, description='Colis')
+
+        data = self.get(f'/api/admin/agent-stats/{self.agent.pk}/', year=self.today.year)
+
+        self.assertEqual(data['total_tickets'], 1)
+        self.assertEqual(
+            (data['average_resolution_time'], data['min_resolution_time'], data['max_resolution_time']), (0, 0, 0),
+        )
+
+    def test_global_stats(self):
+        self.setup_tickets()
+
+        data = self.get('/api/admin/global-stats/', year=self.today.year)
+
+        self.assertEqual((data['total_tickets'], data['resolus'], data['total_agents']), (4, 3, 2))
+        self.assertEqual(data['average_resolution_time'], 4.0)
+        self.assertEqual((data['min_resolution_time'], data['max_resolution_time']), (1.0, 8.0))
+        month = {row['month']: row for row in data['monthly_resolution_time']}[self.today.month]
+        self.assertEqual(
+            (month['average_resolution_time'], month['min_resolution_time'], month['max_resolution_time']),
+            (4.0, 1.0, 8.0),
+        )
+        self.assertAlmostEqual(month['median_resolution_time'], 3.0, delta=0.1)
+        other_month = self.today.month % 12 + 1
+        self.assertEqual(
+            {row['month']: row for row in data['monthly_resolution_time']}[other_month]['max_resolution_time'], 0,
+        )
@@ -0,0 +1,34 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from support import stats_cache
+
+
+@override_settings(STATS_CACHE_TIMEOUT=300, STATS_CACHE_PAST_TIMEOUT=86400)
+class StatsCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def stored_timeout(self, past):
+        with mock.patch.object(stats_cache.cache, 'set', wraps=cache.set) as cache_set:
+            stats_cache.get_or_compute('agent_dashboard', {'past': past}, ['year:2020'], lambda: {'total': 1}, past=past)
+        (key, data), kwargs = cache_set.call_args
+        return kwargs['timeout']
+
+    def test_every_entry_expires(self):
+        self.assertEqual(self.stored_timeout(past=False), 300)
+        self.assertEqual(self.stored_timeout(past=True), 86400)
+
+    def test_bump_invalidates_entries(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {'total': len(calls)}
+
+        first = stats_cache.get_or_compute('agent_dashboard', {}, ['agent:1'], compute, past=True)
+        self.assertEqual(stats_cache.get_or_compute('agent_dashboard', {}, ['agent:1'], compute, past=True), first)
+        stats_cache.bump('agent:1')
+        self.assertEqual(stats_cache.get_or_compute('agent_dashboard', {}, ['agent:1'], compute, past=True), {'total': 2})
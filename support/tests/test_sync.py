@@ -0,0 +1,95 @@
+from rest_framework.test import APITestCase
+
+from support.models import Ticket, TicketTombstone, Utilisateur
+
+
+class ClientDeletionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_user('admin@yafi.test', 'x', nom='Admin', telephone='690000000', role='admin')
+        cls.agent = Utilisateur.objects.create_user('agent@yafi.test', 'x', nom='Agent', telephone='690000002', role='agent')
+
+    def test_admin_deletes_client_with_tickets(self):
+        client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        tickets = [
+            Ticket.objects.create(client=client_user, agent=self.agent, description=f'Colis {i}') for i in range(2)
+        ]
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.delete(f'/api/utilisateurs/{client_user.pk}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Utilisateur.objects.filter(pk=client_user.pk).exists())
+        self.assertEqual(
+            set(TicketTombstone.objects.values_list('ticket_id', 'client_id', 'agent_id')),
+            {(ticket.pk, client_user.pk, self.agent.pk) for ticket in tickets},
+        )
+
+    def test_agent_sees_deleted_ticket_in_changes(self):
+        client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        ticket = Ticket.objects.create(client=client_user, agent=self.agent, description='Colis')
+        client_user.delete()
+        self.client.force_authenticate(self.agent)
+
+        response = self.client.get('/api/tickets/changes/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(ticket.pk, response.json()['deleted'])
+
+
+class ReassignmentSyncTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_user('admin@yafi.test', 'x', nom='Admin', telephone='690000000', role='admin')
+        cls.client_user = Utilisateur.objects.create_user('client@yafi.test', 'x', nom='Client', telephone='690000001')
+        cls.agent = Utilisateur.objects.create_user('agent@yafi.test', 'x', nom='Agent', telephone='690000002', role='agent')
+        cls.other = Utilisateur.objects.create_user('autre@yafi.test', 'x', nom='Autre', telephone='690000003', role='agent')
+
+    def changes(self, user, since=None):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/tickets/changes/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assert_moved_to_other(self, ticket, cursor):
+        # L'ancien agent retire le ticket de sa copie, le nouveau le reçoit
+        feed = self.changes(self.agent, cursor)
+        self.assertIn(ticket.pk, feed['deleted'])
+        self.assertNotIn(ticket.pk, [t['id'] for t in feed['tickets']])
+        self.assertIn(ticket.pk, [t['id'] for t in self.changes(self.other)['tickets']])
+
+        # Le ticket existe toujours : ni le client ni l'admin ne doivent le retirer
+        self.assertNotIn(ticket.pk, self.changes(self.client_user)['deleted'])
+        self.assertNotIn(ticket.pk, self.changes(self.admin)['deleted'])
+
+    def test_reassignment_through_save(self):
+        ticket = Ticket.objects.create(client=self.client_user, agent=self.agent, description='Colis')
+        cursor = self.changes(self.agent)['cursor']
+
+        ticket.agent = self.other
+        ticket.save()
+
+        self.assert_moved_to_other(ticket, cursor)
+
+    def test_reassignment_through_bulk(self):
+        ticket = Ticket.objects.create(client=self.client_user, agent=self.agent, description='Colis')
+        cursor = self.changes(self.agent)['cursor']
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.post('/api/tickets/bulk/', {
+            'action': 'reassign', 'ids': [ticket.pk], 'agent': self.other.pk,
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assert_moved_to_other(ticket, cursor)
+
+    def test_ticket_reassigned_back_reappears(self):
+        ticket = Ticket.objects.create(client=self.client_user, agent=self.agent, description='Colis')
+        ticket.agent = self.other
+        ticket.save()
+        ticket.agent = self.agent
+        ticket.save()
+
+        feed = self.changes(self.agent)
+
+        self.assertIn(ticket.pk, [t['id'] for t in feed['tickets']])
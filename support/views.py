@@ -1,27 +1,39 @@
 import logging
-from collections import Counter
 import random
 
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import F
 from django.utils.timezone import now
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
-from .models import Ticket, Message, ResetPasswordCode
+from .models import Ticket, TicketDailyStat, TicketTombstone, ResolutionSketch, Message, ResetPasswordCode
 from .serializers import TicketSerializer, MessageSerializer, UtilisateurSerializer, ResetPasswordCodeSerializer
+from .serializers import TicketBatchItemSerializer, ticket_list_data, ticket_list_values
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .serializers import CustomTokenObtainPairSerializer
 from rest_framework import generics, permissions
 from support.models import Utilisateur
+from .conditional import conditional_response, ticket_list_etag
+from .assignment import assign_agent, assign_agents
+from .pagination import TicketCursorPagination
+from . import bulk, export, rollup, search, sync
 from .permissions import IsAdmin, IsAgent, IsClient, IsAdminOrSelf
-from .notifications import send_ticket_email  # à importer en haut du fichier
-from .notifications import envoyer_code_reinit
+from .notifications import enqueue_bulk_ticket_notification, enqueue_ticket_notification, envoyer_code_reinit
+from . import stats_cache
+from .stats_cache import AGENTS_SCOPE, agent_scope, is_past_period, period_scope, year_scope
+from .stats import (
+    agent_dashboard_data, agents_period_stats, average_hours, empty_agent_stats, monthly_top_intents, period_bounds,
+    previous_period, resolution_percentiles, resolution_rate, resolution_time_distribution, status_aggregates,
+    status_flow_metrics, ticket_counts_by_month, top_intents,
+)
 
 # Ajout de la permission personnalisée pour gérer les modifications
 class IsOwnerOrAdmin(permissions.BasePermission):
@@ -133,8 +145,9 @@ from django.db.models import Q
 
 
 class TicketViewSet(viewsets.ModelViewSet):
-    queryset = Ticket.objects.all()
+    queryset = Ticket.objects.select_related('agent')
     serializer_class = TicketSerializer
+    pagination_class = TicketCursorPagination
 
     def get_permissions(self):
         if self.action in ['create_ticket_chatbot']:
@@ -145,20 +158,25 @@ class TicketViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated()]
         return [IsAuthenticated()]
 
+    # Notifications écrites dans l'outbox avec la modification (même transaction),
+    # envoyées ensuite par la commande run_notification_worker
     def perform_create(self, serializer):
-        ticket = serializer.save()
+        with transaction.atomic():
+            ticket = serializer.save()
+            enqueue_ticket_notification("created", ticket)
         logger.warning("[perform_create] Ticket créé via perform_create() pour : %s", ticket)
-        send_ticket_email("created", ticket)
 
     def perform_update(self, serializer):
-        ticket = serializer.save()
+        with transaction.atomic():
+            ticket = serializer.save()
+            enqueue_ticket_notification("updated", ticket)
         logger.info("[perform_update] Ticket mis à jour : %s", ticket)
-        send_ticket_email("updated", ticket)
 
     def perform_destroy(self, instance):
         logger.info("[perform_destroy] Ticket supprimé : %s", instance)
-        send_ticket_email("deleted", instance)
-        instance.delete()
+        with transaction.atomic():
+            enqueue_ticket_notification("deleted", instance)
+            instance.delete()
 
     @action(detail=False, methods=['post'], url_path='create', permission_classes=[IsAuthenticated])
     def create_ticket_chatbot(self, request):
@@ -174,23 +192,20 @@ class TicketViewSet(viewsets.ModelViewSet):
         if not titre or not description:
             raise ValidationError("Le titre et la description sont obligatoires.")
 
-        agent_le_moins_charge = Utilisateur.objects.filter(role='agent') \
-            .annotate(nb_tickets=Count('tickets_agent')) \
-            .order_by('nb_tickets') \
-            .first()
+        with transaction.atomic():
+            agent_le_moins_charge = assign_agent(titre)
 
-        if not agent_le_moins_charge:
-            raise ValidationError("Aucun agent disponible pour assignation.")
+            if not agent_le_moins_charge:
+                raise ValidationError("Aucun agent disponible pour assignation.")
 
-        ticket = Ticket.objects.create(
-            titre=titre,
-            description=description,
-            statut="Assigné",
-            client=user,
-            agent=agent_le_moins_charge
-        )
-
-        send_ticket_email("created", ticket)
+            ticket = Ticket.objects.create(
+                titre=titre,
+                description=description,
+                statut="Assigné",
+                client=user,
+                agent=agent_le_moins_charge
+            )
+            enqueue_ticket_notification("created", ticket)
 
         return Response({
             "titre": ticket.titre,
@@ -201,22 +216,88 @@ class TicketViewSet(viewsets.ModelViewSet):
             "date_modification": ticket.date_modification,
         })
 
+    @action(detail=False, methods=['post'], url_path='create/batch', permission_classes=[IsAuthenticated])
+    def create_tickets_batch(self, request):
+        """
+        Création d'un lot de tickets par le chatbot : {"tickets": [{"titre", "description"}, ...]}.
+        Les tickets valides sont assignés en une passe, insérés en une requête et
+        notifiés une fois (un email par destinataire) ; chaque élément a son résultat.
+        """
+        user = request.user
+        if user.role != 'client':
+            raise PermissionDenied("Seuls les clients peuvent créer un ticket.")
+
+        items = request.data.get('tickets') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'tickets': "Une liste non vide de tickets est attendue."})
+        if len(items) > bulk.MAX_BATCH_CREATE:
+            raise ValidationError({'tickets': f"Au plus {bulk.MAX_BATCH_CREATE} tickets par lot."})
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = TicketBatchItemSerializer(data=item if isinstance(item, dict) else {})
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+
+        created = []
+        with rollup.batch():
+            agents = assign_agents([data['titre'] for _, data in valid])
+            tickets = []
+            for (index, data), agent in zip(valid, agents):
+                if agent is None:
+                    results[index] = {
+                        'index': index, 'status': 'error',
+                        'errors': {'agent': ["Aucun agent disponible pour assignation."]},
+                    }
+                    continue
+                tickets.append((index, Ticket(
+                    titre=data['titre'],
+                    description=data['description'],
+                    statut="Assigné",
+                    client=user,
+                    agent=agent,
+                )))
+            created = bulk.bulk_create_tickets([ticket for _, ticket in tickets])
+            for (index, _), ticket in zip(tickets, created):
+                results[index] = {
+                    'index': index,
+                    'status': 'created',
+                    'id': ticket.pk,
+                    'titre': ticket.titre,
+                    'statut': ticket.statut,
+                    'agent': ticket.agent.nom,
+                    'date_creation': ticket.date_creation,
+                }
+            enqueue_bulk_ticket_notification('created', created)
+
+        logger.info("[create_tickets_batch] %d/%d tickets créés pour %s", len(created), len(items), user)
+        return Response({
+            'created': len(created),
+            'failed': len(items) - len(created),
+            'results': results,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+    def ticket_list_response(self, request, tickets):
+        """Liste paginée (lecture rapide) avec ETag : 304 si rien n'a changé."""
+        def build():
+            page = self.paginate_queryset(ticket_list_values(tickets))
+            return self.get_paginated_response(ticket_list_data(page))
+
+        etag = ticket_list_etag(request, tickets, stats_cache.generation(AGENTS_SCOPE))
+        return conditional_response(request, etag, build)
+
     @action(detail=False, methods=['get'], url_path='mes-tickets', permission_classes=[IsAuthenticated])
     def mes_tickets(self, request):
         user = request.user
         if user.role != 'client':
             raise PermissionDenied("Seuls les clients peuvent accéder à leurs tickets.")
 
-        seuil = timezone.now() - timedelta(days=10)
-        tickets = Ticket.objects.filter(
-            client=user
-        ).filter(
-            Q(statut__in=["Assigné", "En cours"]) |
-            Q(statut__in=["Résolu", "Rejeté"], date_modification__gte=seuil)
-        ).order_by('-date_creation')
+        tickets = Ticket.objects.filter(client=user).active_window().order_by('-date_creation', '-id')
 
-        serializer = self.get_serializer(tickets, many=True)
-        return Response(serializer.data)
+        return self.ticket_list_response(request, tickets)
 
     @action(detail=False, methods=['get'], url_path='agent', permission_classes=[IsAuthenticated])
     def tickets_agent(self, request):
@@ -224,28 +305,145 @@ class TicketViewSet(viewsets.ModelViewSet):
         if user.role != 'agent':
             raise PermissionDenied("Seuls les agents peuvent accéder à leurs tickets.")
 
-        seuil = timezone.now() - timedelta(days=10)
-        tickets = Ticket.objects.filter(
-            agent=user
-        ).filter(
-            Q(statut__in=["Assigné", "En cours"]) |
-            Q(statut__in=["Résolu", "Rejeté"], date_modification__gte=seuil)
-        ).order_by('-date_creation')
+        tickets = Ticket.objects.filter(agent=user).active_window().order_by('-date_creation', '-id')
 
-        serializer = self.get_serializer(tickets, many=True)
-        return Response(serializer.data)
+        return self.ticket_list_response(request, tickets)
 
     def list(self, request, *args, **kwargs):
+        queryset = Ticket.objects.active_window().order_by('-date_creation', '-id')
+
+        return self.ticket_list_response(request, queryset)
+
+    @action(detail=False, methods=['get'], url_path='changes', permission_classes=[IsAuthenticated])
+    def changes(self, request):
+        """
+        Synchronisation différentielle : tickets modifiés et tickets supprimés
+        (ou, pour un agent, réaffectés à un autre) depuis le curseur `since`
+        (tout l'historique s'il est absent), dans le périmètre de l'utilisateur. Rappeler avec le curseur renvoyé tant que
+        has_more est vrai.
+        """
         user = request.user
-        seuil = timezone.now() - timedelta(days=10)
+        tickets = Ticket.objects.all()
+        tombstones = TicketTombstone.objects.all()
+        if user.role == 'client':
+            tickets = tickets.filter(client=user)
+            tombstones = tombstones.filter(client_id=user.pk, motif='suppression')
+        elif user.role == 'agent':
+            # Tickets supprimés, et tickets réaffectés à un autre agent
+            tickets, tombstones = tickets.filter(agent=user), tombstones.filter(agent_id=user.pk)
+        elif user.role in ['admin', 'superadmin']:
+            tombstones = tombstones.filter(motif='suppression')
+        else:
+            raise PermissionDenied("Accès refusé.")
 
-        queryset = Ticket.objects.filter(
-            Q(statut__in=["Assigné", "En cours"]) |
-            Q(statut__in=["Résolu", "Rejeté"], date_modification__gte=seuil)
-        ).order_by('-date_creation')
+        try:
+            limit = int(request.query_params.get('limit', sync.DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': "Doit être un entier."})
+        limit = max(1, min(limit, sync.MAX_LIMIT))
+
+        since = sync.decode_cursor(request.query_params.get('since'))
+        return Response(sync.ticket_changes(tickets, tombstones, since, limit))
+
+    @action(detail=False, methods=['get'], url_path='search', permission_classes=[IsAuthenticated])
+    def search(self, request):
+        """
+        Recherche plein texte (titre, description, messages) dans le périmètre
+        de l'utilisateur, résultats classés par pertinence et paginés par page.
+        """
+        user = request.user
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': "Le texte recherché est obligatoire."})
+
+        tickets = Ticket.objects.all()
+        if user.role == 'client':
+            tickets = tickets.filter(client=user)
+        elif user.role == 'agent':
+            tickets = tickets.filter(agent=user)
+        elif user.role not in ['admin', 'superadmin']:
+            raise PermissionDenied("Accès refusé.")
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        try:
+            page = max(1, int(request.query_params.get('page', 1)))
+        except ValueError:
+            raise ValidationError({'page': "Doit être un entier."})
+        page_size = self.paginator.get_page_size(request)
+
+        ids = search.search_ticket_ids(tickets, query, (page - 1) * page_size, page_size + 1)
+        has_next = len(ids) > page_size
+        ids = ids[:page_size]
+
+        rows = {row['id']: row for row in ticket_list_values(Ticket.objects.filter(id__in=ids))}
+        url = request.build_absolute_uri()
+        return Response({
+            'next': replace_query_param(url, 'page', page + 1) if has_next else None,
+            'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+            'results': ticket_list_data(rows[pk] for pk in ids if pk in rows),
+        })
+
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[IsAuthenticated])
+    def bulk(self, request):
+        """
+        Réaffectation, changement de statut ou suppression d'un lot de tickets,
+        en une transaction. Corps : {"action": "reassign" | "statut" | "delete",
+        "ids": [...], "agent": id (reassign), "statut": "..." (statut)}.
+        Les admins agissent sur tous les tickets, les agents ne peuvent changer
+        que le statut de leurs propres tickets. Un email est envoyé par destinataire.
+        """
+        user = request.user
+        operation = request.data.get('action')
+        if operation not in bulk.BULK_ACTIONS:
+            raise ValidationError({'action': f"Action invalide (attendu : {', '.join(bulk.BULK_ACTIONS)})."})
+
+        is_admin = user.role in ['admin', 'superadmin']
+        if not is_admin and not (user.role == 'agent' and operation == 'statut'):
+            raise PermissionDenied("Vous n'avez pas la permission d'effectuer cette opération en masse.")
+
+        raw_ids = request.data.get('ids') or []
+        if not isinstance(raw_ids, list):
+            raise ValidationError({'ids': "Liste d'identifiants invalide."})
+        try:
+            ids = {int(pk) for pk in raw_ids}
+        except (TypeError, ValueError):
+            raise ValidationError({'ids': "Liste d'identifiants invalide."})
+        if not ids:
+            raise ValidationError({'ids': "Au moins un ticket est requis."})
+        if len(ids) > bulk.MAX_BULK_TICKETS:
+            raise ValidationError({'ids': f"Au plus {bulk.MAX_BULK_TICKETS} tickets par opération."})
+
+        agent = None
+        if operation == 'reassign':
+            agent = Utilisateur.objects.filter(pk=request.data.get('agent'), role='agent').first()
+            if agent is None:
+                raise ValidationError({'agent': "Agent introuvable."})
+        statut = request.data.get('statut')
+        if operation == 'statut' and statut not in ['Assigné', 'En cours', 'Résolu', 'Rejeté']:
+            raise ValidationError({'statut': "Statut invalide."})
+
+        with rollup.batch():
+            tickets = bulk.lock_tickets(ids)
+            missing = ids - {ticket.pk for ticket in tickets}
+            if missing:
+                raise ValidationError({'ids': f"Tickets introuvables : {sorted(missing)}"})
+            if not is_admin and any(ticket.agent_id != user.pk for ticket in tickets):
+                raise PermissionDenied("Vous ne pouvez modifier que vos propres tickets.")
+
+            if operation == 'reassign':
+                changed = bulk.bulk_reassign(tickets, agent)
+            elif operation == 'statut':
+                changed = bulk.bulk_change_status(tickets, statut)
+            else:
+                changed = bulk.bulk_delete(tickets)
+
+            enqueue_bulk_ticket_notification('deleted' if operation == 'delete' else 'updated', changed)
+
+        logger.info("[bulk] %s sur %d tickets (%d modifiés) par %s", operation, len(ids), len(changed), user)
+        return Response({
+            'action': operation,
+            'count': len(changed),
+            'ids': sorted(ticket.pk for ticket in changed),
+        })
 
     @action(detail=True, methods=['patch'], url_path='changer-statut', permission_classes=[IsAuthenticated])
     def changer_statut(self, request, pk=None):
@@ -263,8 +461,9 @@ class TicketViewSet(viewsets.ModelViewSet):
             return Response({"error": "Statut invalide."}, status=400)
 
         ticket.statut = nouveau_statut
-        ticket.save()
-        send_ticket_email("updated", ticket)
+        with transaction.atomic():
+            ticket.save()
+            enqueue_ticket_notification("updated", ticket)
 
         serializer = self.get_serializer(ticket)
         return Response(serializer.data)
@@ -275,80 +474,67 @@ class TicketViewSet(viewsets.ModelViewSet):
 @permission_classes([IsAuthenticated])
 def agent_dashboard_stats(request):
     agent = request.user
-    year = request.GET.get('year', str(now().year))
-
-    # Filtrage des tickets assignés à l’agent
-    tickets = Ticket.objects.filter(agent=agent)
-
-    total = tickets.count()
-    en_cours = tickets.filter(statut='En cours').count()
-    resolus = tickets.filter(statut='Résolu').count()
-    rejetes = tickets.filter(statut='Rejeté').count()
-
-    # Graphe : taux de résolution par mois (résolus / total du mois)
-    monthly_stats = []
-    for month in range(1, 13):
-        month_tickets = tickets.filter(date_creation__year=year, date_creation__month=month)
-        resolved_tickets = month_tickets.filter(statut='Résolu')
-        total_count = month_tickets.count()
-        resolved_count = resolved_tickets.count()
-        resolution_rate = round((resolved_count / total_count) * 100, 2) if total_count else 0
-
-        monthly_stats.append({
-            'month': month,
-            'resolved': resolved_count,
-            'total': total_count,
-            'resolution_rate': resolution_rate
-        })
+    year = int(request.GET.get('year', now().year))
 
-    return Response({
-        'total_tickets': total,
-        'en_cours': en_cours,
-        'resolus': resolus,
-        'rejetes': rejetes,
-        'monthly_resolution_rate': monthly_stats
-    })
+    # Compteurs globaux + graphe mensuel (résolus / total du mois) en une requête, mis en cache
+    return stats_cache.cached_response(
+        request, 'agent_dashboard', {'agent_id': agent.id, 'year': year},
+        [agent_scope(agent.id)],
+        lambda: agent_dashboard_data(agent, year),
+    )
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def admin_agent_stats(request, agent_id):
     year = int(request.GET.get('year', now().year))
     month = request.GET.get('month')  # optionnel
+    if month is not None:
+        month = int(month)
+
+    return stats_cache.cached_response(
+        request, 'admin_agent_stats', {'agent_id': agent_id, 'year': year, 'month': month},
+        [agent_scope(agent_id)],
+        lambda: admin_agent_stats_data(agent_id, year, month),
+        past=is_past_period(year, month),
+    )
+
 
+def admin_agent_stats_data(agent_id, year, month=None):
     tickets = Ticket.objects.filter(agent_id=agent_id)
+    daily_stats = TicketDailyStat.objects.filter(agent_id=agent_id)
+    sketches = ResolutionSketch.objects.filter(agent_id=agent_id, annee=year)
 
     if month is not None:
-        month = int(month)
         tickets = tickets.filter(date_creation__year=year, date_creation__month=month)
+        daily_stats = daily_stats.filter(jour__year=year, jour__month=month)
+        sketches = sketches.filter(mois=month)
     else:
         tickets = tickets.filter(date_creation__year=year)
+        daily_stats = daily_stats.filter(jour__year=year)
 
-    total = tickets.count()
-    en_cours = tickets.filter(statut='En cours').count()
-    resolus_qs = tickets.filter(statut='Résolu')
-    resolus = resolus_qs.count()
-    rejetes = tickets.filter(statut='Rejeté').count()
+    # Compteurs et temps moyen lus sur le cumul journalier
+    counts = daily_stats.aggregate(**status_aggregates())
+    total = counts['total']
+    resolus = counts['resolus']
 
     # Taux de résolution
-    resolution_rate = round((resolus / total) * 100, 2) if total else 0
-
-    # Calcul du temps moyen de résolution en heures
-    durations = []
-    for ticket in resolus_qs:
-        if ticket.date_creation and ticket.date_modification:
-            delta = ticket.date_modification - ticket.date_creation
-            durations.append(delta.total_seconds())
+    rate = resolution_rate(resolus, total)
 
-    average_resolution_time = round(sum(durations) / len(durations) / 3600, 2) if durations else 0
+    # Temps moyen (cumul), min / max (calculés en base) et percentiles (sketches) en heures
+    resolution_times = {
+        'average_resolution_time': average_hours(counts['secondes_resolution'], resolus),
+        **resolution_time_distribution(tickets),
+        **resolution_percentiles(sketches),
+    }
 
-    return Response({
+    return {
         'total_tickets': total,
-        'en_cours': en_cours,
+        'en_cours': counts['en_cours'],
         'resolus': resolus,
-        'rejetes': rejetes,
-        'resolution_rate': resolution_rate,
-        'average_resolution_time': average_resolution_time  # en heures
-    })
+        'rejetes': counts['rejetes'],
+        'resolution_rate': rate,
+        **resolution_times,  # en heures
+    }
 from django.contrib.auth import get_user_model
 
 # ...
@@ -358,65 +544,72 @@ from django.contrib.auth import get_user_model
 def admin_global_stats(request):
     year = int(request.GET.get('year', now().year))
 
+    return stats_cache.cached_response(
+        request, 'admin_global_stats', {'year': year},
+        [year_scope(year), AGENTS_SCOPE],
+        lambda: admin_global_stats_data(year),
+        past=is_past_period(year),
+    )
+
+
+def admin_global_stats_data(year):
     tickets = Ticket.objects.filter(date_creation__year=year)
 
-    total = tickets.count()
-    en_cours = tickets.filter(statut='En cours').count()
-    resolus = tickets.filter(statut='Résolu').count()
-    rejetes = tickets.filter(statut='Rejeté').count()
+    counts, months = ticket_counts_by_month(TicketDailyStat.objects.filter(jour__year=year), year)
+    total = counts['total']
+    en_cours = counts['en_cours']
+    resolus = counts['resolus']
+    rejetes = counts['rejetes']
 
-    resolution_rate = round((resolus / total) * 100, 2) if total else 0
+    global_resolution_rate = resolution_rate(resolus, total)
+
+    # Min / max des durées de résolution groupés par mois (en base) et percentiles de l'équipe (sketches fusionnés)
+    sketches = ResolutionSketch.objects.filter(annee=year)
+    monthly_times = resolution_time_distribution(tickets, by_month=True)
+    monthly_percentiles = resolution_percentiles(sketches, by_month=True)
 
     monthly_resolution_rate = []
     monthly_resolution_time = []
 
     for month in range(1, 13):
-        month_tickets = tickets.filter(date_creation__month=month)
-        total_count = month_tickets.count()
-        resolved_tickets = month_tickets.filter(statut='Résolu')
-        resolved_count = resolved_tickets.count()
-
-        rate = round((resolved_count / total_count) * 100, 2) if total_count else 0
         monthly_resolution_rate.append({
             'month': month,
-            'resolution_rate': rate
+            'resolution_rate': resolution_rate(months[month]['resolus'], months[month]['total'])
         })
-
-        durations = []
-        for ticket in resolved_tickets:
-            if ticket.date_creation and ticket.date_modification:
-                delta = ticket.date_modification - ticket.date_creation
-                durations.append(delta.total_seconds())
-        avg_hours = round(sum(durations) / len(durations) / 3600, 2) if durations else 0
         monthly_resolution_time.append({
             'month': month,
-            'average_resolution_time': avg_hours
+            'average_resolution_time': average_hours(months[month]['secondes_resolution'], months[month]['resolus']),
+            **monthly_times[month],
+            **monthly_percentiles[month]
         })
 
-    intents = list(tickets.values_list('titre', flat=True))
-    most_common_intent = Counter(intents).most_common(1)
-    most_frequent_intent = most_common_intent[0][0] if most_common_intent else None
+    # Intention la plus fréquente, lue sur le compteur IntentCounter
+    most_common_intent = top_intents(year, top=1)
+    most_frequent_intent = most_common_intent[0]['titre'] if most_common_intent else None
 
     # Ajout du nombre total d'agents
     User = get_user_model()
     total_agents = User.objects.filter(role='agent').count()  # Modifie selon ta logique
 
-    return Response({
+    return {
         'total_tickets': total,
         'en_cours': en_cours,
         'resolus': resolus,
         'rejetes': rejetes,
-        'resolution_rate': resolution_rate,
+        'resolution_rate': global_resolution_rate,
+        'average_resolution_time': average_hours(counts['secondes_resolution'], resolus),
+        **resolution_time_distribution(tickets),
+        **resolution_percentiles(sketches),
         'monthly_resolution_rate': monthly_resolution_rate,
         'monthly_resolution_time': monthly_resolution_time,
         'most_frequent_intent': most_frequent_intent,
         'total_agents': total_agents  # <- Ajouté ici
-    })
+    }
 
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-from datetime import datetime
+from datetime import MAXYEAR, MINYEAR, datetime
 from collections import defaultdict
 from django.db.models import Q
 from .models import Ticket
@@ -434,8 +627,22 @@ def generate_agents_report_data(request):
     year = int(request.GET.get('year', now().year))
     month = int(request.GET.get('month', now().month))
 
-    agents = Utilisateur.objects.filter(role='agent')
-    report = []
+    return stats_cache.cached_response(
+        request, 'agents_report', {'year': year, 'month': month},
+        [period_scope(year, month), period_scope(*previous_period(year, month)), AGENTS_SCOPE],
+        lambda: agents_report_data(year, month),
+        past=is_past_period(year, month),
+    )
+
+
+def agents_report_data(year, month):
+    return list(agents_report_rows(year, month))
+
+
+def agents_report_rows(year, month):
+    """Lignes du rapport des agents, produites une à une (export en flux), moyenne globale en dernier."""
+    agents = Utilisateur.objects.filter(role='agent').order_by('id').only('id', 'nom', 'email', 'telephone')
+    total_agents = 0
 
     global_current = {
         'total': 0, 'en_cours': 0, 'resolus': 0, 'rejetes': 0,
@@ -446,24 +653,27 @@ def generate_agents_report_data(request):
         'taux_resolution': 0.0, 'temps_moyen_resolution': 0.0
     }
 
-    for agent in agents:
-        current_stats = compute_agent_stats(agent.id, year, month)
-        prev_month = month - 1 or 12
-        prev_year = year if month > 1 else year - 1
-        previous_stats = compute_agent_stats(agent.id, prev_year, prev_month)
+    # Statistiques du mois courant et du mois précédent pour tous les agents en une requête
+    previous = previous_period(year, month)
+    period_stats = agents_period_stats([(year, month), previous])
+
+    for agent in agents.iterator(chunk_size=export.CHUNK_SIZE):
+        total_agents += 1
+        current_stats = period_stats[(year, month)].get(agent.id, empty_agent_stats())
+        previous_stats = period_stats[previous].get(agent.id, empty_agent_stats())
 
         delta_stats = compute_delta(current_stats, previous_stats)
         comment = generate_comment(delta_stats)
 
         # Ajout au report
-        report.append({
+        yield {
             'nom': agent.nom,
             'email': agent.email,
             'telephone': agent.telephone,
             'stats': current_stats,
             'evolution': delta_stats,
             'commentaire': comment
-        })
+        }
 
         # Cumul pour moyennes globales
         for key in global_current:
@@ -471,7 +681,6 @@ def generate_agents_report_data(request):
             global_previous[key] += previous_stats.get(key, 0)
 
     # Moyennes globales
-    total_agents = agents.count()
     if total_agents > 0:
         avg_current = {
             k: round(global_current[k] / total_agents, 2) for k in global_current
@@ -482,47 +691,135 @@ def generate_agents_report_data(request):
         avg_delta = compute_delta(avg_current, avg_previous)
         avg_comment = generate_comment(avg_delta)
 
-        report.append({
+        yield {
             'nom': 'MOYENNE GLOBALE',
             'email': '',
             'telephone': '',
             'stats': avg_current,
             'evolution': avg_delta,
             'commentaire': avg_comment
-        })
+        }
 
-    return Response(report)
 
+AGENT_REPORT_STATS = list(empty_agent_stats())
+AGENT_REPORT_COLUMNS = (
+    ['nom', 'email', 'telephone'] + AGENT_REPORT_STATS
+    + [f'evolution_{key}' for key in AGENT_REPORT_STATS] + ['commentaire']
+)
 
-def compute_agent_stats(agent_id, year, month):
-    tickets = Ticket.objects.filter(
-        agent_id=agent_id,
-        date_creation__year=year,
-        date_creation__month=month
-    )
 
-    total = tickets.count()
-    en_cours = tickets.filter(statut='En cours').count()
-    resolus = tickets.filter(statut='Résolu').count()
-    rejetes = tickets.filter(statut='Rejeté').count()
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_agents_report(request):
+    """Rapport des agents (?year=&month=) en CSV ou NDJSON, une ligne par agent."""
+    output = export.export_format(request)
+    try:
+        year = int(request.GET.get('year', now().year))
+        month = int(request.GET.get('month', now().month))
+    except ValueError:
+        raise ValidationError("Les paramètres year et month doivent être des entiers.")
+    if not 1 <= month <= 12:
+        raise ValidationError({'month': "Mois invalide."})
+    if not MINYEAR < year < MAXYEAR:
+        raise ValidationError({'year': "Année invalide."})
+
+    def rows():
+        for entry in agents_report_rows(year, month):
+            row = {'nom': entry['nom'], 'email': entry['email'], 'telephone': entry['telephone'],
+                   'commentaire': entry['commentaire']}
+            for key in AGENT_REPORT_STATS:
+                row[key] = entry['stats'].get(key)
+                row[f'evolution_{key}'] = entry['evolution'].get(key)
+            yield row
+
+    return export.streaming_export(output, AGENT_REPORT_COLUMNS, rows(), f'rapport-agents-{year}-{month:02d}')
+
+
+TICKET_EXPORT_COLUMNS = [
+    'id', 'titre', 'description', 'statut', 'client_email', 'agent_nom', 'date_creation', 'date_modification',
+]
 
-    taux_resolution = round((resolus / total) * 100, 2) if total else 0
 
-    durations = [
-        (t.date_modification - t.date_creation).total_seconds()
-        for t in tickets.filter(statut='Résolu')
-        if t.date_creation and t.date_modification
-    ]
-    temps_moyen = round(sum(durations) / len(durations) / 3600, 2) if durations else 0
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_tickets(request):
+    """
+    Tickets en CSV ou NDJSON (?output=), filtrés par année / mois de création,
+    agent et statut, dans l'ordre de création.
+    """
+    output = export.export_format(request)
+    try:
+        year = int(request.GET.get('year', now().year))
+        month = int(request.GET['month']) if request.GET.get('month') else None
+        agent_id = int(request.GET['agent']) if request.GET.get('agent') else None
+    except ValueError:
+        raise ValidationError("Les paramètres year, month et agent doivent être des entiers.")
+    if month is not None and not 1 <= month <= 12:
+        raise ValidationError({'month': "Mois invalide."})
 
-    return {
-        'total': total,
-        'en_cours': en_cours,
-        'resolus': resolus,
-        'rejetes': rejetes,
-        'taux_resolution': taux_resolution,
-        'temps_moyen_resolution': temps_moyen
-    }
+    start, end = period_bounds(year, month)
+    tickets = Ticket.objects.filter(date_creation__gte=start, date_creation__lt=end)
+    if agent_id is not None:
+        tickets = tickets.filter(agent_id=agent_id)
+    if request.GET.get('statut'):
+        tickets = tickets.filter(statut=request.GET['statut'])
+
+    rows = tickets.order_by('date_creation', 'id').values(
+        'id', 'titre', 'description', 'statut', 'date_creation', 'date_modification',
+        client_email=F('client__email'), agent_nom=F('agent__nom'),
+    ).iterator(chunk_size=export.CHUNK_SIZE)
+
+    filename = f'tickets-{year}' + (f'-{month:02d}' if month else '')
+    return export.streaming_export(output, TICKET_EXPORT_COLUMNS, rows, filename)
+
+
+MAX_TOP_INTENTS = 100
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_intent_stats(request):
+    """Top N des intentions (titres de tickets) de l'année, global et par mois (?top=10)."""
+    try:
+        year = int(request.GET.get('year', now().year))
+        top = int(request.GET.get('top', 10))
+    except ValueError:
+        raise ValidationError("Les paramètres year et top doivent être des entiers.")
+    if not 1 <= top <= MAX_TOP_INTENTS:
+        raise ValidationError({'top': f"Doit être compris entre 1 et {MAX_TOP_INTENTS}."})
+
+    return Response({
+        'year': year,
+        'top': top_intents(year, top=top),
+        'monthly': monthly_top_intents(year, top=top),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_status_flow_stats(request):
+    """Temps de première réponse, de résolution et par statut (journal des transitions)."""
+    year = int(request.GET.get('year', now().year))
+    month = request.GET.get('month')  # optionnel
+    agent_id = request.GET.get('agent_id')  # optionnel
+
+    return Response(status_flow_metrics(
+        year,
+        month=int(month) if month is not None else None,
+        agent_id=int(agent_id) if agent_id is not None else None,
+    ))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_cache_stats(request):
+    """Compteurs hits / misses du cache des statistiques, par endpoint."""
+    return Response(stats_cache.counters())
+
+
+def compute_agent_stats(agent_id, year, month):
+    stats = agents_period_stats([(year, month)], agent_ids=[agent_id])
+    return stats[(year, month)].get(agent_id, empty_agent_stats())
 
 
 def compute_delta(current, previous):